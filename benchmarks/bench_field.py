@@ -0,0 +1,48 @@
+"""Benchmark the evaluation modes of the TPMS field for every surface.
+
+Usage: python benchmarks/bench_field.py [--resolution 100] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from inspect import getmembers, isfunction
+
+import numpy as np
+
+from blender_tpms.tpms import surfaces
+from blender_tpms.tpms.field import EVALUATIONS, evaluate
+from blender_tpms.tpms.symmetry import maps_grid, symmetry_group
+
+
+def main() -> None:
+    """Print the evaluation time of each surface for each evaluation mode."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resolution", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    axes = [np.linspace(-np.pi, np.pi, args.resolution)] * 3
+    print(f"{'surface':<20} {'symmetries':>10}", *(f"{e:>10}" for e in EVALUATIONS))
+    for name, function in getmembers(surfaces, isfunction):
+        n_symmetries = sum(
+            maps_grid(operation, axes) for operation in symmetry_group(function)
+        )
+        timings = [
+            min(
+                timeit.repeat(
+                    lambda function=function, evaluation=evaluation: (
+                        np.ascontiguousarray(evaluate(function, axes, evaluation))
+                    ),
+                    number=1,
+                    repeat=args.repeat,
+                ),
+            )
+            for evaluation in EVALUATIONS
+        ]
+        print(f"{name:<20} {n_symmetries:>10}", *(f"{t:>9.3f}s" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Benchmark the generation of the TPMS geometries stage by stage.
+
+Every surface and part is generated for each resolution and cell repetition
+with ``Tpms``, and with the cylindrical and spherical classes for the mapped
+surfaces. Each case runs in a fresh process, which reports the wall time of
+each stage (grid, field, offset surfaces, extraction and density estimate),
+its peak resident set size and the growth of the latter during the
+generation. With ``--samples``, each case is run as many times and the
+shortest timings are kept.
+
+The results are written as JSON with ``--output``. With ``--baseline``, the
+results are compared to a previous output and the script exits with status 1
+if a stage got slower than ``--tolerance`` (relative) or the memory used by
+the generation grew by more than ``--tolerance``.
+
+Usage: python benchmarks/bench_generation.py [--resolutions 10 20]
+    [--repeat-cells 1 2] [--surfaces gyroid ...] [--parts sheet ...]
+    [--samples 3] [--output results.json] [--baseline baseline.json]
+    [--tolerance 0.2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from inspect import getmembers, isfunction
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pyvista as pv
+
+from blender_tpms.tpms import CylindricalTpms, SphericalTpms, Tpms, surfaces
+from blender_tpms.tpms.cache import library_version
+
+try:
+    import resource
+except ImportError:  # pragma: no cover (windows)
+    resource = None
+
+CLASSES = {
+    "Tpms": Tpms,
+    "CylindricalTpms": CylindricalTpms,
+    "SphericalTpms": SphericalTpms,
+}
+PARTS = ("sheet", "lower_skeletal", "upper_skeletal", "skeletals", "surface")
+STAGES = ("grid", "field", "offset", "extraction", "density")
+# timings shorter than this are too noisy to be compared
+_MIN_SECONDS = 5e-3
+_MIN_MB = 1.0
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of the current process in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(case: dict[str, Any]) -> dict[str, Any]:
+    """Generate a geometry and measure each of its stages."""
+    start_rss = peak_rss_mb()
+    tpms = CLASSES[case["class"]](
+        part=case["part"],
+        surface=case["surface"],
+        resolution=case["resolution"],
+        repeat_cell=case["repeat_cell"],
+        offset=case["offset"],
+    )
+    stages = {
+        "grid": lambda: tpms._cached("grid", tpms._compute_grid),  # noqa: SLF001
+        "field": lambda: tpms._cached("field", tpms._compute_tpms_field),  # noqa: SLF001
+        "offset": lambda: tpms._cached("offset", tpms._update_offset_surfaces),  # noqa: SLF001
+        "extraction": lambda: tpms.vtk_mesh,
+        "density": tpms.estimate_relative_density,
+    }
+    timings = {}
+    for stage, compute in stages.items():
+        start = time.perf_counter()
+        compute()
+        timings[stage] = time.perf_counter() - start
+
+    return {
+        "case": case,
+        "seconds": timings,
+        "total_seconds": sum(timings.values()),
+        "peak_rss_mb": peak_rss_mb(),
+        "start_rss_mb": start_rss,
+        "n_points": tpms.vtk_mesh.n_points,
+        "n_cells": tpms.vtk_mesh.n_cells,
+    }
+
+
+def best_result(samples: list[dict[str, Any]]) -> dict[str, Any]:
+    """Shortest timings and largest memory growth of several runs of a case."""
+    result = dict(samples[0])
+    if result["peak_rss_mb"] is not None:
+        largest = max(samples, key=memory_growth)
+        result["peak_rss_mb"] = largest["peak_rss_mb"]
+        result["start_rss_mb"] = largest["start_rss_mb"]
+    result["seconds"] = {
+        stage: min(sample["seconds"][stage] for sample in samples) for stage in STAGES
+    }
+    result["total_seconds"] = sum(result["seconds"].values())
+    return result
+
+
+def memory_growth(result: dict[str, Any]) -> float | None:
+    """Growth of the peak memory during the generation in MB."""
+    if result["peak_rss_mb"] is None:
+        return None
+    return result["peak_rss_mb"] - result["start_rss_mb"]
+
+
+def case_name(case: dict[str, Any]) -> str:
+    """Identifier of a case, used to match the results with the baseline."""
+    return (
+        f"{case['class']}/{case['surface']}/{case['part']}"
+        f"/res{case['resolution']}/x{case['repeat_cell']}"
+    )
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    tolerance: float,
+) -> list[str]:
+    """Describe the stages and peak memory exceeding the baseline."""
+    reference = {case_name(result["case"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        name = case_name(result["case"])
+        if name not in reference:
+            continue
+        for stage, seconds in result["seconds"].items():
+            before = reference[name]["seconds"].get(stage)
+            if (
+                before is not None
+                and seconds > _MIN_SECONDS
+                and seconds > (1 + tolerance) * before
+            ):
+                regressions.append(
+                    f"{name} {stage}: {before:.4f}s -> {seconds:.4f}s",
+                )
+        growth, before = memory_growth(result), memory_growth(reference[name])
+        if (
+            growth is not None
+            and before is not None
+            and growth > _MIN_MB
+            and growth > (1 + tolerance) * before
+        ):
+            regressions.append(f"{name} memory: {before:.1f}MB -> {growth:.1f}MB")
+    return regressions
+
+
+def main() -> None:
+    """Run the benchmark cases, save and compare the results."""
+    surface_names = [name for name, _ in getmembers(surfaces, isfunction)]
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[10, 20])
+    parser.add_argument("--repeat-cells", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--surfaces", nargs="+", default=surface_names)
+    parser.add_argument("--mapped-surfaces", nargs="+", default=["gyroid"])
+    parser.add_argument("--parts", nargs="+", default=list(PARTS))
+    parser.add_argument("--offset", type=float, default=0.3)
+    parser.add_argument("--samples", type=int, default=1)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    cases = [
+        {
+            "class": class_name,
+            "surface": surface,
+            "part": part,
+            "resolution": resolution,
+            "repeat_cell": repeat_cell,
+            "offset": args.offset,
+        }
+        for class_name in CLASSES
+        for surface in (args.surfaces if class_name == "Tpms" else args.mapped_surfaces)
+        for part in args.parts
+        for resolution in args.resolutions
+        for repeat_cell in args.repeat_cells
+    ]
+
+    results = []
+    print(f"{'case':<50}", *(f"{stage:>9}" for stage in STAGES), f"{'peak':>9}")
+    # a fresh process per run, for its peak memory and a cold cache
+    with multiprocessing.Pool(args.jobs, maxtasksperchild=1) as pool:
+        samples = pool.imap(
+            run_case, [case for case in cases for _ in range(args.samples)]
+        )
+        for case in cases:
+            result = best_result([next(samples) for _ in range(args.samples)])
+            results.append(result)
+            print(
+                f"{case_name(case):<50}",
+                *(f"{s:>8.3f}s" for s in result["seconds"].values()),
+                f"{result['peak_rss_mb'] or 0:>7.0f}MB",
+            )
+
+    if args.output is not None:
+        metadata = {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "version": library_version(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pyvista": pv.__version__,
+            "machine": platform.platform(),
+        }
+        args.output.write_text(
+            json.dumps({"metadata": metadata, "results": results}, indent=2),
+        )
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"{len(regressions)} regression(s) against {args.baseline}")
+        print(*regressions, sep="\n")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
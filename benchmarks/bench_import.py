@@ -0,0 +1,75 @@
+"""Benchmark the registration of the add-on in a fresh interpreter.
+
+The registration must not import the heavy dependencies, loaded on the first
+generation. The script exits with an error when they are imported or when the
+registration takes longer than the budget.
+
+Usage: python benchmarks/bench_import.py [--budget 200] [--top 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+
+HEAVY_MODULES = ("pyvista", "matplotlib", "blender_tpms.tpms.tpms")
+
+_SCRIPT = """
+import sys, time
+import bpy
+start = time.perf_counter()
+import blender_tpms
+blender_tpms.register()
+print(f"register {(time.perf_counter() - start) * 1000:.1f}")
+print("loaded", *sorted(sys.modules))
+blender_tpms.unregister()
+"""
+
+
+def main() -> None:
+    """Print the registration time and the slowest imports it triggers."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=float, default=200.0, help="milliseconds")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    lines = process.stdout.splitlines()
+    elapsed = float(next(line for line in lines if line.startswith("register "))[9:])
+    loaded = set(next(line for line in lines if line.startswith("loaded ")).split())
+
+    # the imports of blender_tpms follow the ones of bpy
+    importtime = process.stderr.splitlines()
+    first = next(
+        index for index, line in enumerate(importtime) if "blender_tpms" in line
+    )
+    imports = []
+    prefix = "import time:"
+    for line in importtime[first:]:
+        fields = line[len(prefix) :].split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():  # noqa: PLR2004
+            imports.append((int(fields[1]), fields[2].strip()))
+
+    print(f"{'cumulative (ms)':>15} module")
+    for cumulative, module in sorted(imports, reverse=True)[: args.top]:
+        print(f"{cumulative / 1000:>15.1f} {module}")
+    heavy = [
+        module
+        for module in HEAVY_MODULES
+        if module in loaded or any(name.startswith(f"{module}.") for name in loaded)
+    ]
+    print(f"registration: {elapsed:.1f} ms (budget {args.budget:g} ms)")
+    if heavy:
+        print("heavy modules imported:", ", ".join(heavy))
+    if heavy or elapsed > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark the transfer of TPMS meshes to Blender.
+
+Compares ``polydata_to_mesh`` with the former ``Mesh.from_pydata`` path.
+
+Usage: python benchmarks/bench_interface.py [--resolution 30] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+
+import bpy
+import numpy as np
+import pyvista as pv
+
+from blender_tpms.interface import polydata_to_mesh
+from blender_tpms.tpms import Tpms
+
+
+def from_pydata(polydata: pv.PolyData) -> bpy.types.Mesh:
+    """Transfer the mesh through ``Mesh.from_pydata``."""
+    faces = np.reshape(polydata.faces, (polydata.n_cells, 4))[:, :0:-1]
+    mesh = bpy.data.meshes.new("Tpms")
+    mesh.from_pydata(vertices=polydata.points, edges=[], faces=faces)
+    mesh.update()
+    return mesh
+
+
+def main() -> None:
+    """Print the transfer time of lattices of increasing size."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resolution", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'cells':>6} {'triangles':>10} {'from_pydata':>12} {'bulk':>10}")
+    for repeat_cell in (1, 2, 4):
+        polydata = Tpms(
+            part="sheet",
+            repeat_cell=repeat_cell,
+            resolution=args.resolution,
+            extraction="contour",
+        ).vtk_mesh
+        timings = []
+        for transfer in (from_pydata, polydata_to_mesh):
+            timings.append(
+                min(
+                    timeit.repeat(
+                        lambda transfer=transfer, polydata=polydata: (
+                            bpy.data.meshes.remove(transfer(polydata))
+                        ),
+                        number=1,
+                        repeat=args.repeat,
+                    ),
+                ),
+            )
+        print(
+            f"{repeat_cell**3:>6} {polydata.n_cells:>10}",
+            *(f"{t:>11.3f}s" for t in timings),
+        )
+
+
+if __name__ == "__main__":
+    main()
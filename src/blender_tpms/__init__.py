@@ -1,5 +1,20 @@
 """Blender TPMS package for the TPMS addon."""
 
-from .ui import register, unregister
+
+def register() -> None:
+    """Register the add-on."""
+    # the blender modules are only imported by the add-on, so that the worker
+    # processes can import the package
+    from .ui import register
+
+    register()
+
+
+def unregister() -> None:
+    """Unregister the add-on."""
+    from .ui import unregister
+
+    unregister()
+
 
 __all__ = ["register", "unregister"]
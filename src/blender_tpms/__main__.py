@@ -0,0 +1,5 @@
+"""Entry point of ``python -m blender_tpms``, see ``blender_tpms.cli``."""
+
+from blender_tpms.cli import main
+
+raise SystemExit(main())
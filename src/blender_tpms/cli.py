@@ -0,0 +1,290 @@
+"""Command line generating a catalog of TPMS meshes without Blender.
+
+A sweep is described by a JSON file listing the surfaces, offsets, cell sizes
+and cell repetitions to combine, for example::
+
+    {
+        "surfaces": ["gyroid", "schwarzP", "cos(x) + cos(y) + 0.5 * cos(z)"],
+        "offsets": [0.3, 0.5],
+        "cell_sizes": [1.0, [1.0, 1.0, 2.0]],
+        "repeats": [1, [2, 2, 1]],
+        "part": "sheet",
+        "resolution": 20
+    }
+
+Every variant is written to the output directory as a binary STL or PLY file
+named after its parameters, slab by slab, and its relative density estimated
+on the field is appended to ``densities.csv``. The variants already listed in
+the CSV with their mesh in the directory are skipped, so that an interrupted
+or extended sweep only generates the missing variants.
+
+Usage: python -m blender_tpms sweep.json --output catalog [--format ply]
+    [--workers 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple, Sequence, Tuple
+
+from blender_tpms.tpms import Tpms
+from blender_tpms.tpms.expression import surface_function
+
+logger = logging.getLogger(__name__)
+
+Triple = Tuple[float, float, float]
+
+DENSITIES = "densities.csv"
+FORMATS = ("stl", "ply")
+PARTS = ("sheet", "lower_skeletal", "upper_skeletal", "skeletals", "surface")
+_COLUMNS = (
+    "file",
+    "surface",
+    "part",
+    "offset",
+    "cell_size",
+    "repeat_cell",
+    "resolution",
+    "relative_density",
+)
+_3D = 3
+_SPEC_KEYS = {"surfaces", "offsets", "cell_sizes", "repeats", "part", "resolution"}
+
+
+class Variant(NamedTuple):
+    """Parameters of a geometry of a sweep."""
+
+    surface: str
+    offset: float
+    cell_size: Triple
+    repeat_cell: tuple[int, int, int]
+    part: str = "sheet"
+    resolution: int = 20
+
+    @property
+    def name(self) -> str:
+        """Name of the variant, usable as a file name.
+
+        The name holds all the parameters, so that the mesh of a variant is
+        only reused by the sweeps generating the same geometry.
+        """
+        surface = self.surface
+        if not surface.isidentifier():
+            digest = hashlib.sha256(surface.encode()).hexdigest()[:8]
+            surface = f"expression_{digest}"
+        cell_size = "x".join(f"{size:g}" for size in self.cell_size)
+        repeat_cell = "x".join(map(str, self.repeat_cell))
+        return (
+            f"{surface}_{self.part}_o{self.offset:g}_c{cell_size}_r{repeat_cell}"
+            f"_n{self.resolution}"
+        )
+
+
+@dataclass(frozen=True)
+class Sweep:
+    """Variants combining every surface, offset, cell size and repetition."""
+
+    surfaces: tuple[str, ...]
+    offsets: tuple[float, ...]
+    cell_sizes: tuple[Triple, ...] = ((1.0, 1.0, 1.0),)
+    repeats: tuple[tuple[int, int, int], ...] = ((1, 1, 1),)
+    part: str = "sheet"
+    resolution: int = 20
+
+    @classmethod
+    def from_dict(cls, spec: dict[str, Any]) -> Sweep:
+        """Sweep of a JSON specification, the scalars standing for triples."""
+        unknown = set(spec) - _SPEC_KEYS
+        if unknown:
+            err_msg = f"unknown keys {sorted(unknown)}, expected {sorted(_SPEC_KEYS)}"
+            raise ValueError(err_msg)
+        for key in ("surfaces", "offsets"):
+            if not spec.get(key):
+                err_msg = f"the sweep needs a non-empty list of {key}"
+                raise ValueError(err_msg)
+        part = spec.get("part", "sheet")
+        if part not in PARTS:
+            err_msg = f"part must be one of {list(PARTS)}"
+            raise ValueError(err_msg)
+        for surface in spec["surfaces"]:
+            surface_function(surface)  # raises on invalid expressions
+
+        return cls(
+            surfaces=tuple(spec["surfaces"]),
+            offsets=tuple(float(offset) for offset in spec["offsets"]),
+            cell_sizes=tuple(
+                _triple(cell_size, float) for cell_size in spec.get("cell_sizes", [1])
+            ),
+            repeats=tuple(_triple(repeat, int) for repeat in spec.get("repeats", [1])),
+            part=part,
+            resolution=int(spec.get("resolution", 20)),
+        )
+
+    def variants(self) -> Iterator[Variant]:
+        """Every combination of the parameters."""
+        for parameters in itertools.product(
+            self.surfaces,
+            self.offsets,
+            self.cell_sizes,
+            self.repeats,
+        ):
+            yield Variant(*parameters, part=self.part, resolution=self.resolution)
+
+
+def run_sweep(
+    sweep: Sweep,
+    output: Path,
+    file_format: str = "stl",
+    workers: int | None = None,
+) -> tuple[int, int, int]:
+    """Generate the missing variants of a sweep in a process pool.
+
+    Returns the numbers of generated, skipped and failed variants.
+    """
+    if file_format not in FORMATS:
+        err_msg = f"file_format must be one of {list(FORMATS)}"
+        raise ValueError(err_msg)
+    output.mkdir(parents=True, exist_ok=True)
+    done = _read_densities(output)
+    variants = list(sweep.variants())
+    missing = [
+        variant for variant in variants if f"{variant.name}.{file_format}" not in done
+    ]
+
+    generated = failed = 0
+    with ProcessPoolExecutor(workers) as executor, _densities_writer(output) as write:
+        futures = {
+            executor.submit(_generate, variant, output, file_format): variant
+            for variant in missing
+        }
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception:
+                logger.exception("%s failed", futures[future].name)
+                failed += 1
+                continue
+            write(row)
+            generated += 1
+            logger.info("%s: %s", row["file"], row["relative_density"])
+    return generated, len(variants) - len(missing), failed
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the command line, returning the exit status."""
+    parser = argparse.ArgumentParser(
+        prog="python -m blender_tpms",
+        description="Generate the meshes of a sweep of TPMS parameters.",
+    )
+    parser.add_argument("spec", type=Path, help="JSON file describing the sweep")
+    parser.add_argument("--output", "-o", type=Path, default=Path("tpms_catalog"))
+    parser.add_argument("--format", choices=FORMATS, default="stl")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of processes, all the processors by default",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    try:
+        sweep = Sweep.from_dict(json.loads(args.spec.read_text()))
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    generated, skipped, failed = run_sweep(
+        sweep,
+        args.output,
+        args.format,
+        args.workers,
+    )
+    logger.info("%d generated, %d skipped, %d failed", generated, skipped, failed)
+    return 1 if failed else 0
+
+
+def _triple(value: float | Sequence[float], kind: type) -> tuple:
+    """Triple of a scalar or a sequence of three values."""
+    values = [value] * _3D if isinstance(value, (int, float)) else list(value)
+    if len(values) != _3D:
+        err_msg = f"expected a number or three numbers, got {value!r}"
+        raise ValueError(err_msg)
+    return tuple(kind(item) for item in values)
+
+
+def _generate(
+    variant: Variant,
+    output: Path,
+    file_format: str,
+) -> dict[str, str]:
+    """Write the mesh of a variant and return its row of densities."""
+    tpms = Tpms(
+        part=variant.part,
+        surface=variant.surface,
+        offset=variant.offset,
+        cell_size=variant.cell_size,
+        repeat_cell=variant.repeat_cell,
+        resolution=variant.resolution,
+    )
+    path = output / f"{variant.name}.{file_format}"
+    # the mesh only gets its name once it is complete
+    partial = output / f"{variant.name}.partial.{file_format}"
+    tpms.save(partial)
+    partial.replace(path)
+    return {
+        "file": path.name,
+        "surface": variant.surface,
+        "part": variant.part,
+        "offset": f"{variant.offset:g}",
+        "cell_size": " ".join(f"{size:g}" for size in variant.cell_size),
+        "repeat_cell": " ".join(map(str, variant.repeat_cell)),
+        "resolution": str(variant.resolution),
+        # the surface has no volume, the density of the parts was integrated
+        # on the slabs written by `save` and is read from the cache
+        "relative_density": (
+            ""
+            if variant.part == "surface"
+            else f"{tpms.estimate_relative_density()[0]:.6f}"
+        ),
+    }
+
+
+def _read_densities(output: Path) -> set[str]:
+    """Files listed in the densities with their mesh in the output directory.
+
+    The rows of the missing meshes are dropped from the densities.
+    """
+    path = output / DENSITIES
+    if not path.exists():
+        return set()
+    with path.open(newline="") as file:
+        rows = [row for row in csv.DictReader(file) if (output / row["file"]).exists()]
+    with path.open("w", newline="") as file:
+        writer = csv.DictWriter(file, _COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return {row["file"] for row in rows}
+
+
+@contextmanager
+def _densities_writer(output: Path) -> Iterator[Callable[[dict[str, str]], None]]:
+    """Append rows to the densities, each one written as soon as it is added."""
+    path = output / DENSITIES
+    with path.open("a", newline="") as file:
+        writer = csv.DictWriter(file, _COLUMNS)
+        if not file.tell():
+            writer.writeheader()
+
+        def write(row: dict[str, str]) -> None:
+            writer.writerow(row)
+            file.flush()
+
+        yield write
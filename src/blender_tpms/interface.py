@@ -2,34 +2,61 @@
 
 from __future__ import annotations
 
-from inspect import getmembers, isfunction
 from typing import TYPE_CHECKING
 
 import bpy
 import numpy as np
 
+from blender_tpms.tpms.registry import SURFACE_NAMES
+
 if TYPE_CHECKING:
     import pyvista as pv  # pragma: no cover
 
 
 def polydata_to_mesh(polydata: pv.PolyData, mesh_name: str = "Tpms") -> bpy.types.Mesh:
-    """Convert a vtkPolyData to a mesh."""
-    faces = []
+    """Convert a vtkPolyData to a mesh.
+
+    The vertices and triangles are copied in bulk from contiguous buffers, the
+    winding is reversed so that the normals of the parts face outwards. The
+    polydata is left unchanged.
+    """
     if not polydata.is_all_triangles:
         polydata = polydata.triangulate()
-    polydata.flip_normals()
-    faces = np.reshape(polydata.faces, (polydata.n_cells, 4))[:, 1:]
+    return triangles_to_mesh(
+        polydata.points,
+        np.reshape(polydata.faces, (polydata.n_cells, 4))[:, 1:],
+        mesh_name=mesh_name,
+    )
+
+
+def triangles_to_mesh(
+    points: np.ndarray,
+    triangles: np.ndarray,
+    mesh_name: str = "Tpms",
+) -> bpy.types.Mesh:
+    """Convert vertices and triangles with the winding of the polydata to a mesh."""
+    points = np.ascontiguousarray(points, dtype=np.float32)
+    # reversed winding of the triangles
+    faces = np.ascontiguousarray(triangles[:, ::-1], dtype=np.int32)
 
     mesh = bpy.data.meshes.new(mesh_name)
-    mesh.from_pydata(vertices=polydata.points, edges=[], faces=faces)
-    mesh.update()
+    mesh.vertices.add(len(points))
+    mesh.loops.add(faces.size)
+    mesh.polygons.add(len(faces))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, faces.size, 3, dtype=np.int32))
+    if bpy.app.version < (4, 0):
+        mesh.vertices.foreach_set("co", points.ravel())
+        mesh.loops.foreach_set("vertex_index", faces.ravel())
+        mesh.polygons.foreach_set("loop_total", np.full(len(faces), 3, dtype=np.int32))
+    else:
+        # the generic attributes are copied without iterating over the items
+        mesh.attributes["position"].data.foreach_set("vector", points.ravel())
+        mesh.attributes[".corner_vert"].data.foreach_set("value", faces.ravel())
+    mesh.update(calc_edges=True)
 
     return mesh
 
 
 def get_all_surfaces() -> list[tuple[str, str, str]]:
-    """Get all TPMS surfaces."""
-    from .tpms import surfaces
-
-    functions = getmembers(surfaces, isfunction)
-    return [(func[0], func[0], func[0]) for func in functions]
+    """Get all TPMS surfaces, from the static registry of their names."""
+    return [(name, name, name) for name in SURFACE_NAMES]
@@ -0,0 +1,67 @@
+"""Level of detail of the TPMS objects.
+
+The objects generated with a viewport resolution hold a proxy mesh displayed
+in the viewport and the full resolution mesh, swapped in during the renders.
+"""
+
+from __future__ import annotations
+
+import bpy
+from bpy.app.handlers import persistent
+
+from blender_tpms.properties import TpmsLodProperties
+
+_RENDER_START = ("render_init", "render_pre")
+_RENDER_END = ("render_complete", "render_cancel")
+
+
+def set_lod_meshes(obj: bpy.types.Object, proxy_mesh: bpy.types.Mesh) -> None:
+    """Display a proxy mesh in place of the mesh of an object.
+
+    The mesh of the object is kept as the full mesh and shares its materials
+    with the proxy mesh.
+    """
+    full_mesh = obj.data
+    for material in full_mesh.materials:
+        proxy_mesh.materials.append(material)
+    obj.tpms_lod.full_mesh = full_mesh
+    obj.tpms_lod.proxy_mesh = proxy_mesh
+    obj.tpms_lod.display = "proxy"
+
+
+@persistent
+def use_full_meshes(scene: bpy.types.Scene, _: object = None) -> None:
+    """Swap the full meshes in the TPMS objects of a scene."""
+    for obj in scene.objects:
+        full_mesh = obj.tpms_lod.full_mesh
+        if full_mesh is not None and obj.data != full_mesh:
+            obj.data = full_mesh
+
+
+@persistent
+def restore_meshes(scene: bpy.types.Scene, _: object = None) -> None:
+    """Swap back the meshes displayed in the TPMS objects of a scene."""
+    for obj in scene.objects:
+        lod = obj.tpms_lod
+        if lod.display == "proxy" and lod.proxy_mesh is not None:
+            obj.data = lod.proxy_mesh
+
+
+def register() -> None:
+    """Register the meshes of the objects and the render handlers."""
+    bpy.utils.register_class(TpmsLodProperties)
+    bpy.types.Object.tpms_lod = bpy.props.PointerProperty(type=TpmsLodProperties)
+    for name in _RENDER_START:
+        getattr(bpy.app.handlers, name).append(use_full_meshes)
+    for name in _RENDER_END:
+        getattr(bpy.app.handlers, name).append(restore_meshes)
+
+
+def unregister() -> None:
+    """Unregister the meshes of the objects and the render handlers."""
+    for name in _RENDER_START:
+        getattr(bpy.app.handlers, name).remove(use_full_meshes)
+    for name in _RENDER_END:
+        getattr(bpy.app.handlers, name).remove(restore_meshes)
+    del bpy.types.Object.tpms_lod
+    bpy.utils.unregister_class(TpmsLodProperties)
@@ -5,7 +5,6 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 import bpy
-import matplotlib.pyplot as plt
 import numpy as np
 
 if TYPE_CHECKING:
@@ -28,15 +27,23 @@ def shader_node_attribute(
 def shader_node_map_range(
     material: bpy.types.Material,
     attr_name: str,
-    tpms: Tpms,
+    tpms: Tpms | None,
+    *,
+    value_range: tuple[float, float] | None = None,
 ) -> bpy.types.ShaderNodeMapRange:
-    """Create a map range node to map the attribute values to the color ramp."""
+    """Create a map range node to map the attribute values to the color ramp.
+
+    The mapped range is ``value_range``, or the one of the mesh of ``tpms``.
+    """
     map_range_node = material.node_tree.nodes.new("ShaderNodeMapRange")
     if not isinstance(map_range_node, bpy.types.ShaderNodeMapRange):
         raise TypeError("Shader node is not ShaderNodeMapRange")  # pragma: no cover
 
-    map_range_node.inputs["From Min"].default_value = np.min(tpms.vtk_mesh[attr_name])
-    map_range_node.inputs["From Max"].default_value = np.max(tpms.vtk_mesh[attr_name])
+    if value_range is None:
+        values = tpms.vtk_mesh[attr_name]
+        value_range = np.min(values), np.max(values)
+    map_range_node.inputs["From Min"].default_value = value_range[0]
+    map_range_node.inputs["From Max"].default_value = value_range[1]
     return map_range_node
 
 
@@ -55,7 +62,10 @@ def shader_node_val_to_rgb(
     last_elem = color_ramp_node.color_ramp.elements[-1]
     color_ramp_node.color_ramp.elements.remove(last_elem)
 
-    cmap = plt.get_cmap(colormap)
+    # matplotlib is only loaded once a material is applied
+    from matplotlib import colormaps
+
+    cmap = colormaps[colormap]
     for i in range(n_colors):
         location = i / (n_colors - 1)
         if i != 0:
@@ -147,19 +157,29 @@ def create_material(attr_name: str) -> bpy.types.Material:
 
 def apply_material(
     mesh: bpy.types.Mesh,
-    tpms: Tpms,
+    tpms: Tpms | None,
     attr_name: str,
     colormap: str,
     n_colors: int,
+    *,
+    value_range: tuple[float, float] | None = None,
 ) -> None:
-    """Apply a material to the mesh based on the TPMS field."""
+    """Apply a material to the mesh based on the TPMS field.
+
+    The colormap spans ``value_range``, or the values of the mesh of ``tpms``.
+    """
     switch_to_material_shading()
 
     material = create_material(attr_name)
 
     bsdf = material.node_tree.nodes["Principled BSDF"]
     attribute_node = shader_node_attribute(material, attr_name)
-    map_range_node = shader_node_map_range(material, attr_name, tpms)
+    map_range_node = shader_node_map_range(
+        material,
+        attr_name,
+        tpms,
+        value_range=value_range,
+    )
     color_ramp_node = shader_node_val_to_rgb(material, colormap, n_colors)
     material_output_node = material.node_tree.nodes["Material Output"]
 
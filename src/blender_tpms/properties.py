@@ -10,6 +10,7 @@ from bpy.props import (
     FloatVectorProperty,
     IntProperty,
     IntVectorProperty,
+    PointerProperty,
     StringProperty,
 )
 
@@ -33,6 +34,77 @@ class OperatorProperties(bpy.types.PropertyGroup):
         options={"SKIP_SAVE"},
     )
 
+    disk_cache: BoolProperty(
+        name="Disk Cache",
+        description="Reuse the meshes generated with the same parameters in "
+        "previous sessions, stored in the user cache directory",
+        default=False,
+        options={"SKIP_SAVE"},
+    )
+
+    profile: BoolProperty(
+        name="Profile",
+        description="Report the time and memory used by each stage of the generation",
+        default=False,
+        options={"SKIP_SAVE"},
+    )
+
+    background: BoolProperty(
+        name="Background",
+        description="Generate the mesh in a background process without blocking "
+        "the interface, the object is added once it is done",
+        default=False,
+        options={"SKIP_SAVE"},
+    )
+
+    viewport_resolution: IntProperty(
+        name="Viewport resolution",
+        description="Resolution of one unit cell of the mesh displayed in the "
+        "viewport, subsampled from the full resolution used for the render, "
+        "0 displays the full resolution",
+        default=0,
+        min=0,
+        soft_max=20,
+        options={"SKIP_SAVE"},
+    )
+
+
+def _update_display(self: "TpmsLodProperties", _: bpy.types.Context) -> None:
+    mesh = self.full_mesh if self.display == "full" else self.proxy_mesh
+    if mesh is not None:
+        self.id_data.data = mesh
+
+
+class TpmsLodProperties(bpy.types.PropertyGroup):
+    """Meshes of a TPMS object at the viewport and the render resolutions."""
+
+    full_mesh: PointerProperty(
+        name="Full mesh",
+        description="Mesh at the full resolution, used for the render",
+        type=bpy.types.Mesh,
+    )
+
+    proxy_mesh: PointerProperty(
+        name="Proxy mesh",
+        description="Mesh at the viewport resolution",
+        type=bpy.types.Mesh,
+    )
+
+    display: EnumProperty(
+        items=[
+            ("proxy", "Proxy", "Display the mesh at the viewport resolution"),
+            (
+                "full",
+                "Full",
+                "Display the mesh at the full resolution, to edit or export it",
+            ),
+        ],
+        name="Display",
+        description="Mesh of the object outside of the renders",
+        default="proxy",
+        update=_update_display,
+    )
+
 
 class TpmsProperties(bpy.types.PropertyGroup):
     """Properties for the TPMS mesh."""
@@ -76,6 +148,14 @@ class TpmsProperties(bpy.types.PropertyGroup):
         options={"SKIP_SAVE"},
     )
 
+    expression: StringProperty(
+        name="Expression",
+        description="Custom surface replacing the surface, as an expression of "
+        "x, y and z such as cos(x) + cos(y) + 0.5 * cos(z)",
+        default="",
+        options={"SKIP_SAVE"},
+    )
+
     swap: EnumProperty(
         name="Swap axes",
         description="Swap axes",
@@ -92,6 +172,16 @@ class TpmsProperties(bpy.types.PropertyGroup):
         options={"ANIMATABLE", "SKIP_SAVE"},
     )
 
+    target_density: FloatProperty(
+        name="Target density",
+        description="Relative density reached by adjusting the offset, 0 keeps it",
+        default=0.0,
+        min=0.0,
+        max=0.99,
+        subtype="FACTOR",
+        options={"ANIMATABLE", "SKIP_SAVE"},
+    )
+
     phase_shift: FloatVectorProperty(
         name="Phase shift",
         subtype="XYZ",
@@ -109,6 +199,17 @@ class TpmsProperties(bpy.types.PropertyGroup):
         options={"ANIMATABLE", "SKIP_SAVE"},
     )
 
+    dtype: EnumProperty(
+        items=[
+            ("float64", "Double", "Double precision (64 bits)"),
+            ("float32", "Single", "Single precision (32 bits), halves the memory"),
+        ],
+        name="Precision",
+        description="Floating point precision of the grid and the mesh",
+        default="float64",
+        options={"SKIP_SAVE"},
+    )
+
     density: StringProperty(
         name="Relative density",
         description="Relative density of the geometry",
@@ -139,24 +240,46 @@ class SphericalTpmsProperties(bpy.types.PropertyGroup):
     )
 
 
-# class TpmsGradingProperties(bpy.types.PropertyGroup):
-#     surface_grading: StringProperty(
-#         name="Surface grading",
-#         description="Surface grading",
-#         default="sin(x) * cos(y) + sin(y) * cos(z) + sin(z) * cos(x)",
-#     )
-
-#     offset_grading: StringProperty(
-#         name="Offset grading",
-#         description="Offset grading",
-#         default="(b - a) * x + (a + b) / 2",
-#     )
-
-#     edges: FloatVectorProperty(
-#         name="Edges (a, b)",
-#         description="Min (a) and max (b) offset values",
-#         size=2,
-#         default=(0.3, 1.5),
-#         min=0.01,
-#         options={'ANIMATABLE'},
-#     )
+class TpmsGradingProperties(bpy.types.PropertyGroup):
+    """Properties for the graded TPMS mesh."""
+
+    offset_grading: StringProperty(
+        name="Offset grading",
+        description="Expression of x, y and z added to the offset, evaluated on "
+        "the control points",
+        default="0.4 * x",
+        options={"SKIP_SAVE"},
+    )
+
+    cell_size_grading: StringProperty(
+        name="Cell size grading",
+        description="Positive expression of x, y and z scaling the cell size, "
+        "empty for a uniform cell size",
+        default="",
+        options={"SKIP_SAVE"},
+    )
+
+    blend_surface: EnumProperty(
+        items=get_all_surfaces(),
+        name="Blend surface",
+        description="Surface blended with the surface",
+        default="schwarzP",
+        options={"SKIP_SAVE"},
+    )
+
+    surface_blend: StringProperty(
+        name="Surface blend",
+        description="Expression of x, y and z weighting the blend surface, from 0 "
+        "(surface) to 1 (blend surface), empty for no blend",
+        default="",
+        options={"SKIP_SAVE"},
+    )
+
+    control_points: IntProperty(
+        name="Control points",
+        description="Number of control points of the gradings along each axis",
+        default=5,
+        min=1,
+        soft_max=20,
+        options={"SKIP_SAVE"},
+    )
@@ -1,6 +1,64 @@
-"""Tpms subpackage to generate TPMS geometries using PyVista."""
+"""Tpms subpackage to generate TPMS geometries using PyVista.
 
-from . import surfaces
-from .tpms import CylindricalTpms, SphericalTpms, Tpms
+The public names are imported on first access, so that importing the
+subpackage, or one of its light modules such as ``registry``, does not load
+PyVista.
+"""
 
-__all__ = ["CylindricalTpms", "SphericalTpms", "Tpms", "surfaces"]
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from . import surfaces  # pragma: no cover
+    from .cache import GeometryCache  # pragma: no cover
+    from .jobs import TpmsJob  # pragma: no cover
+    from .profiling import Profiler  # pragma: no cover
+    from .series import TrigSeries  # pragma: no cover
+    from .tpms import (  # pragma: no cover
+        CylindricalTpms,
+        GradedTpms,
+        SphericalTpms,
+        Tpms,
+    )
+
+# module defining each public name
+_MODULES = {
+    "CylindricalTpms": "tpms",
+    "GeometryCache": "cache",
+    "GradedTpms": "tpms",
+    "Profiler": "profiling",
+    "SphericalTpms": "tpms",
+    "Tpms": "tpms",
+    "TpmsJob": "jobs",
+    "TrigSeries": "series",
+    "surfaces": "surfaces",
+}
+
+__all__ = [
+    "CylindricalTpms",
+    "GeometryCache",
+    "GradedTpms",
+    "Profiler",
+    "SphericalTpms",
+    "Tpms",
+    "TpmsJob",
+    "TrigSeries",
+    "surfaces",
+]
+
+
+def __getattr__(name: str) -> Any:  # noqa: ANN401
+    """Import a public name on first access."""
+    if name not in _MODULES:
+        err_msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(err_msg)
+    module = importlib.import_module(f".{_MODULES[name]}", __name__)
+    value = module if name == _MODULES[name] else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,192 @@
+"""On-disk cache of precomputed arrays.
+
+The arrays are stored in ``$BLENDER_TPMS_CACHE`` or in the user cache
+directory, under a folder named after ``CACHE_VERSION``. The version must be
+bumped whenever the content of the cached arrays changes, the stale entries
+are then ignored. The cache is best effort: unreadable entries are treated as
+missing and failing writes are ignored.
+
+``GeometryCache`` stores extracted meshes under a hash of the parameters they
+were generated with, see ``geometry_key``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+import pyvista as pv
+
+from blender_tpms.tpms.expression import Expression
+
+CACHE_VERSION = 1
+_DEFAULT_MAX_BYTES = 4 * 1024**3
+
+
+def cache_directory() -> Path:
+    """Directory holding the cache entries of the current version."""
+    if "BLENDER_TPMS_CACHE" in os.environ:
+        root = Path(os.environ["BLENDER_TPMS_CACHE"])
+    elif sys.platform == "win32" and "LOCALAPPDATA" in os.environ:
+        root = Path(os.environ["LOCALAPPDATA"]) / "blender_tpms"
+    else:
+        root = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        root = root / "blender_tpms"
+    return root / f"v{CACHE_VERSION}"
+
+
+def load_arrays(name: str) -> dict[str, np.ndarray] | None:
+    """Arrays stored under the name, None if they are not cached."""
+    path = cache_directory() / f"{name}.npz"
+    try:
+        with np.load(path) as arrays:
+            return dict(arrays)
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def save_arrays(name: str, arrays: dict[str, np.ndarray]) -> None:
+    """Store arrays under the name, replacing the previous entry atomically."""
+    directory = cache_directory()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        file = tempfile.NamedTemporaryFile(  # noqa: SIM115
+            dir=directory,
+            suffix=".npz",
+            delete=False,
+        )
+    except OSError:
+        return
+    path = Path(file.name)
+    try:
+        with file:
+            np.savez(file, **arrays)
+        path.replace(directory / f"{name}.npz")
+    except OSError:
+        path.unlink(missing_ok=True)
+
+
+def library_version() -> str:
+    """Installed version of the library."""
+    try:
+        return metadata.version("blender_tpms")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def geometry_key(parameters: Mapping[str, Any]) -> str:
+    """Stable hash of the parameters of a geometry and of the library version."""
+    payload = json.dumps(
+        {"version": library_version(), **parameters},
+        sort_keys=True,
+        default=_jsonable,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _jsonable(value: Any) -> Any:  # noqa: ANN401
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.dtype):
+        return value.name
+    if isinstance(value, Expression):
+        return f"expression:{value.text}"
+    if callable(value) and hasattr(value, "__qualname__"):
+        return f"{value.__module__}.{value.__qualname__}"
+    err_msg = f"cannot hash the parameter {value!r}"
+    raise TypeError(err_msg)
+
+
+class GeometryCache:
+    """Content-addressed cache of meshes, bounded in size.
+
+    Each mesh is stored as raw ``.npy`` files (points, faces and point arrays)
+    in a folder named after its key and loaded memory-mapped, so that only the
+    pages actually read are loaded. The least recently used meshes are evicted
+    once the cache exceeds ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        max_bytes: int = _DEFAULT_MAX_BYTES,
+    ) -> None:
+        """Create a cache in ``directory``, by default in the user cache."""
+        if directory is None:
+            directory = cache_directory() / "geometry"
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def load(self, key: str) -> pv.PolyData | None:
+        """Mesh stored under the key, None if it is not cached."""
+        path = self.directory / key
+        try:
+            points = np.load(path / "points.npy", mmap_mode="r")
+            faces = np.load(path / "faces.npy", mmap_mode="r")
+            point_data = {
+                file.stem: np.load(file, mmap_mode="r")
+                for file in sorted((path / "point_data").glob("*.npy"))
+            }
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        # a mesh without points is built without its (empty) faces
+        mesh = (
+            pv.PolyData(points, faces=faces)
+            if len(points)
+            else pv.PolyData(np.empty((0, 3), dtype=points.dtype))
+        )
+        for name, values in point_data.items():
+            mesh.point_data[name] = values
+        return mesh
+
+    def store(self, key: str, mesh: pv.PolyData) -> None:
+        """Store a mesh under the key and evict the least recently used ones."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temporary = Path(tempfile.mkdtemp(dir=self.directory, prefix=".tmp-"))
+        except OSError:
+            return
+        try:
+            np.save(temporary / "points.npy", np.asarray(mesh.points))
+            np.save(temporary / "faces.npy", np.asarray(mesh.faces))
+            (temporary / "point_data").mkdir()
+            for name in mesh.point_data:
+                np.save(
+                    temporary / "point_data" / f"{name}.npy",
+                    np.asarray(mesh.point_data[name]),
+                )
+            temporary.rename(self.directory / key)
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)
+            return
+        with contextlib.suppress(OSError):  # entries removed concurrently
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used meshes beyond the size bound."""
+        entries = []
+        for path in self.directory.iterdir():
+            if path.name.startswith(".") or not path.is_dir():
+                continue
+            size = sum(file.stat().st_size for file in path.rglob("*.npy"))
+            entries.append((path.stat().st_mtime, size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
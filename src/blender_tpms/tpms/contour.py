@@ -0,0 +1,365 @@
+"""Extraction of the parts as isosurfaces capped on the sides of the grid.
+
+The boundary of a part is made of the offset isosurfaces bounding it and of
+the regions of the grid sides lying inside it. Both are computed from the
+scalar fields without building the volume mesh of the part.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pyvista as pv
+from vtkmodules.vtkCommonDataModel import vtkDataObject, vtkStaticPointLocator
+from vtkmodules.vtkFiltersCore import vtkFlyingEdges3D
+
+from blender_tpms.tpms.profiling import stage
+
+_3D = 3
+# relative distance under which the vertices of the pieces are merged, above
+# the rounding errors of the single precision flying edges points
+_MERGE_TOLERANCE = 1e-6
+
+# scalars bounding each part and the sign of the scalars inside it, the
+# constraints keeping the positive side come first (see `_clip_face`)
+REGIONS: dict[str, tuple[tuple[str, int], ...]] = {
+    "lower_skeletal": (("lower_surface", -1),),
+    "upper_skeletal": (("upper_surface", 1),),
+    "sheet": (("lower_surface", 1), ("upper_surface", -1)),
+}
+
+
+def isosurface(grid: pv.DataSet, scalars: str) -> pv.PolyData:
+    """Zero isosurface of the scalars, carrying all the point arrays."""
+    if not isinstance(grid, pv.ImageData):
+        return grid.contour(isosurfaces=[0.0], scalars=scalars).extract_surface()
+
+    contour = vtkFlyingEdges3D()
+    contour.SetInputData(grid)
+    contour.SetValue(0, 0.0)
+    contour.SetInputArrayToProcess(
+        0,
+        0,
+        0,
+        vtkDataObject.FIELD_ASSOCIATION_POINTS,
+        scalars,
+    )
+    contour.InterpolateAttributesOn()
+    contour.ComputeNormalsOff()
+    contour.ComputeGradientsOff()
+    contour.Update()
+    surface = pv.wrap(contour.GetOutput())
+    # flying edges always outputs single precision points
+    surface.points = surface.points.astype(grid[scalars].dtype)
+    return surface
+
+
+def contour_part(grid: pv.DataSet, part: str) -> pv.PolyData:
+    """Triangulated boundary of a part, facing inwards like the clipped ones."""
+    constraints = REGIONS[part]
+    tolerance = _MERGE_TOLERANCE * grid.length
+    pieces = []
+    with stage("isosurfaces"):
+        for scalars, sign in constraints:
+            piece = _iso_piece(grid, scalars, sign, constraints)
+            if piece.n_cells:
+                pieces.append((piece, _on_sides(grid, piece.points, tolerance)))
+
+    dimensions = grid.dimensions
+    with stage("caps"):
+        for axis in range(_3D):
+            if dimensions[axis] < 2:  # noqa: PLR2004
+                continue
+            for side, neighbor in (
+                (0, 1),
+                (dimensions[axis] - 1, dimensions[axis] - 2),
+            ):
+                cap = _clip_face(grid, axis, side, neighbor, constraints)
+                if cap.n_cells:
+                    pieces.append((cap, np.ones(cap.n_points, dtype=bool)))
+
+    if not pieces:
+        return pv.PolyData()
+    with stage("weld"):
+        boundary = _weld(pieces, tolerance)
+    boundary.points = boundary.points.astype(grid["surface"].dtype)
+    return boundary
+
+
+def _iso_piece(
+    grid: pv.DataSet,
+    scalars: str,
+    sign: int,
+    constraints: tuple[tuple[str, int], ...],
+) -> pv.PolyData:
+    """Part of an isosurface satisfying the other constraints, facing inwards."""
+    piece = isosurface(grid, scalars)
+    for other, other_sign in constraints:
+        if (
+            other != scalars
+            and piece.n_points
+            and np.any(other_sign * piece[other] < 0)
+        ):
+            piece = piece.clip_scalar(scalars=other, invert=other_sign < 0)
+    if not piece.n_cells:
+        return piece
+    # the contour triangles face the decreasing values in right-handed
+    # grids, the part is on the side of the increasing `sign * scalars`
+    piece = piece.triangulate()
+    return _flipped(piece) if sign == _handedness(grid) else piece
+
+
+def _on_sides(grid: pv.DataSet, points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Mask of the points which may lie on the sides of the grid."""
+    if not isinstance(grid, pv.ImageData):
+        return np.ones(len(points), dtype=bool)
+    bounds = np.reshape(grid.bounds, (_3D, 2))
+    return np.any(
+        (np.abs(points - bounds[:, 0]) < tolerance)
+        | (np.abs(points - bounds[:, 1]) < tolerance),
+        axis=1,
+    )
+
+
+def _weld(
+    pieces: list[tuple[pv.PolyData, np.ndarray]],
+    tolerance: float,
+) -> pv.PolyData:
+    """Assemble triangle meshes, merging their close seam vertices.
+
+    Only the vertices flagged as seam candidates of each piece are merged,
+    the pieces are already welded internally.
+    """
+    meshes = [mesh for mesh, _ in pieces]
+    offsets = np.cumsum([0] + [mesh.n_points for mesh in meshes])
+    points = np.concatenate([mesh.points for mesh in meshes])
+    faces = np.concatenate(
+        [
+            mesh.faces.reshape(-1, 4)[:, 1:] + offset
+            for mesh, offset in zip(meshes, offsets)
+        ],
+    )
+
+    candidates = np.flatnonzero(np.concatenate([seams for _, seams in pieces]))
+    locator = vtkStaticPointLocator()
+    locator.SetDataSet(pv.PolyData(points[candidates].astype(float)))
+    locator.BuildLocator()
+    merge_map = np.empty(len(candidates), dtype=np.int64)
+    locator.MergePoints(tolerance, merge_map)
+    merged = np.arange(len(points))
+    merged[candidates] = candidates[merge_map]
+
+    faces = merged[faces]
+    faces = faces[
+        (faces[:, 0] != faces[:, 1])
+        & (faces[:, 1] != faces[:, 2])
+        & (faces[:, 2] != faces[:, 0])
+    ]
+    used, faces = np.unique(faces, return_inverse=True)
+    mesh = pv.PolyData(
+        points[used],
+        faces=np.column_stack(
+            [np.full(len(faces) // _3D, _3D), faces.reshape(-1, _3D)],
+        ).ravel(),
+    )
+    for name in meshes[0].point_data:
+        if any(name not in piece.point_data for piece in meshes):
+            continue
+        mesh.point_data[name] = np.concatenate(
+            [piece.point_data[name] for piece in meshes],
+        )[used]
+    return mesh
+
+
+def _handedness(grid: pv.DataSet) -> int:
+    """Orientation of the cells of a grid, 1 for right-handed cells."""
+    if isinstance(grid, pv.ImageData):
+        return 1
+    points = grid.points.reshape((*grid.dimensions, _3D), order="F")[:, :, :2]
+    origin = points[:-1, :-1, 0]
+    determinant = np.linalg.det(
+        np.stack(
+            [
+                points[1:, :-1, 0] - origin,
+                points[:-1, 1:, 0] - origin,
+                points[:-1, :-1, 1] - origin,
+            ],
+            axis=-1,
+        ),
+    )
+    return 1 if np.sum(determinant) > 0 else -1
+
+
+def _flipped(mesh: pv.PolyData) -> pv.PolyData:
+    """Reverse the orientation of a triangle mesh."""
+    mesh.faces = mesh.faces.reshape(-1, 4)[:, [0, 3, 2, 1]].ravel()
+    return mesh
+
+
+def _face_nodes(grid: pv.DataSet, axis: int, layer: int) -> pv.DataSet:
+    """Layer of the grid normal to an axis."""
+    voi = [0, grid.dimensions[0] - 1, 0, grid.dimensions[1] - 1]
+    voi += [0, grid.dimensions[2] - 1]
+    voi[2 * axis] = voi[2 * axis + 1] = layer
+    return grid.extract_subset(voi)
+
+
+def _clip_face(
+    grid: pv.DataSet,
+    axis: int,
+    side: int,
+    neighbor: int,
+    constraints: tuple[tuple[str, int], ...],
+) -> pv.PolyData:
+    """Region of a side of the grid inside the part, facing inwards.
+
+    The pixels of the side are clipped by each constraint along their edges,
+    as the isosurfaces cut the faces of the grid cells. A pixel with two
+    diagonal corners on the positive side of a constraint keeps them apart,
+    as the flying edges do, this is only handled for the first constraint.
+    """
+    face = _face_nodes(grid, axis, side)
+    shape = [n for dimension, n in enumerate(grid.dimensions) if dimension != axis]
+    arrays = {
+        name: np.asarray(face.point_data[name]).reshape(face.n_points, -1)
+        for name in face.point_data
+        if name in grid.point_data
+    }
+    nodes = np.column_stack(
+        [
+            face.points,
+            _face_nodes(grid, axis, neighbor).points - face.points,
+            *arrays.values(),
+        ],
+    ).astype(float)
+    # columns of the point arrays in the nodes attributes
+    ends = 2 * _3D + np.cumsum([array.shape[1] for array in arrays.values()])
+    columns = {
+        name: slice(end - array.shape[1], end)
+        for (name, array), end in zip(arrays.items(), ends)
+    }
+    inside = np.all(
+        [sign * nodes[:, columns[scalars]][:, 0] >= 0 for scalars, sign in constraints],
+        axis=0,
+    )
+
+    # corners of the pixels, counterclockwise in the face
+    node_index = np.arange(len(nodes)).reshape(shape, order="F")
+    corners = np.stack(
+        [
+            node_index[:-1, :-1],
+            node_index[1:, :-1],
+            node_index[1:, 1:],
+            node_index[:-1, 1:],
+        ],
+        axis=-1,
+    ).reshape(-1, 4)
+    outside = np.zeros(len(corners), dtype=bool)
+    for scalars, sign in constraints:
+        outside |= np.all(sign * nodes[corners, columns[scalars]][..., 0] < 0, axis=1)
+    full = np.all(inside[corners], axis=1)
+    crossed = ~full & ~outside
+
+    polygons = nodes[corners[crossed]]
+    counts = np.full(len(polygons), 4)
+    for index, (scalars, sign) in enumerate(constraints):
+        polygons, counts = _clip_polygons(
+            polygons,
+            counts,
+            sign * polygons[:, :, columns[scalars]][..., 0],
+            separate=index == 0 and sign > 0,
+        )
+
+    # the whole pixels are split in two triangles, the clipped ones in fans
+    fan = np.arange(1, max(polygons.shape[1] - 1, 1))
+    fan = np.stack([np.zeros_like(fan), fan, fan + 1], axis=-1)
+    fans = np.arange(len(polygons))[:, None, None] * polygons.shape[1] + fan
+    fans = fans[fan[:, 1] < counts[:, None] - 1]
+    triangles = np.concatenate(
+        [
+            corners[full][:, [0, 1, 2, 0, 2, 3]].reshape(-1, 3),
+            len(nodes) + fans.reshape(-1, 3),
+        ],
+    )
+    vertices = np.concatenate([nodes, polygons.reshape(-1, nodes.shape[1])])
+
+    cap = pv.PolyData(
+        vertices[:, :_3D],
+        faces=np.column_stack([np.full(len(triangles), _3D), triangles]).ravel(),
+    )
+    for name, array in arrays.items():
+        cap.point_data[name] = vertices[:, columns[name]].reshape(
+            -1,
+            *array.shape[1:] if array.shape[1] > 1 else (),
+        )
+    corners_xyz = vertices[triangles, :_3D]
+    normals = np.cross(
+        corners_xyz[:, 1] - corners_xyz[:, 0],
+        corners_xyz[:, 2] - corners_xyz[:, 0],
+    )
+    inward = vertices[triangles, _3D : 2 * _3D].sum(axis=1)
+    if np.sum(normals * inward) < 0:
+        cap = _flipped(cap)
+    return cap.clean(point_merging=False)
+
+
+def _clip_polygons(
+    polygons: np.ndarray,
+    counts: np.ndarray,
+    values: np.ndarray,
+    *,
+    separate: bool,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Keep the part of convex polygons where the values are positive.
+
+    ``polygons`` holds the attributes of the vertices of each polygon, padded
+    up to the largest polygon, and ``counts`` their number of vertices. The
+    values are interpolated linearly along the polygon edges.
+    """
+    n_polygons, n_vertices, n_attributes = polygons.shape
+    vertex = np.arange(n_vertices)
+    valid = vertex < counts[:, None]
+    following = (vertex + 1) % np.maximum(counts[:, None], 1)
+    next_values = np.take_along_axis(values, following, axis=1)
+    next_polygons = np.take_along_axis(polygons, following[:, :, None], axis=1)
+
+    inside = values >= 0
+    crossing = valid & (inside != (next_values >= 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = np.where(crossing, values / (values - next_values), 0.0)
+    intersections = polygons + weight[:, :, None] * (next_polygons - polygons)
+
+    clipped = np.stack([polygons, intersections], axis=2).reshape(
+        n_polygons,
+        2 * n_vertices,
+        n_attributes,
+    )
+    kept = np.stack([valid & inside, crossing], axis=2).reshape(
+        n_polygons,
+        2 * n_vertices,
+    )
+    order = np.argsort(~kept, axis=1, kind="stable")
+    clipped = np.take_along_axis(clipped, order[:, :, None], axis=1)
+    counts = kept.sum(axis=1)
+
+    if separate and n_vertices == 4:  # noqa: PLR2004
+        # saddle pixels, their clipped hexagon is split around both corners
+        saddle = (counts == 6) & (  # noqa: PLR2004
+            np.all(inside == [True, False, True, False], axis=1)
+            | np.all(inside == [False, True, False, True], axis=1)
+        )
+        first = np.where(inside[saddle, 0], 0, 1)[:, None, None]
+        around = (first + np.array([[-1, 0, 1], [2, 3, 4]])) % 6
+        hexagons = clipped[saddle]
+        triangles = np.take_along_axis(
+            hexagons[:, None],
+            around[:, :, :, None],
+            axis=2,
+        ).reshape(-1, 3, n_attributes)
+        padding = np.zeros((len(triangles), clipped.shape[1] - 3, n_attributes))
+        clipped = np.concatenate(
+            [clipped[~saddle], np.concatenate([triangles, padding], axis=1)],
+        )
+        counts = np.concatenate([counts[~saddle], np.full(len(triangles), 3)])
+
+    n_kept = max(counts.max(initial=0), 1)
+    return clipped[:, :n_kept], counts
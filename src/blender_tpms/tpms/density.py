@@ -0,0 +1,216 @@
+"""Relative density of the parts integrated on the sampled fields.
+
+The fields are taken as linear along the lines of the grid parallel to its
+last axis, the length of each line lying inside the part is then exact. The
+lengths are integrated over the two other axes with the trapezoidal rule,
+weighted by the Jacobian of the grid mapping, which must not depend on the
+last axis.
+
+The offset reaching a target density is interpolated in tables of the
+density of a unit cell versus the offset, computed once per surface and
+stored in the on-disk cache.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Mapping, Sequence
+
+import numpy as np
+
+from blender_tpms.tpms.cache import load_arrays, save_arrays
+from blender_tpms.tpms.contour import REGIONS
+from blender_tpms.tpms.expression import Function, surface_function
+from blender_tpms.tpms.field import evaluate
+from blender_tpms.tpms.registry import SURFACE_NAMES
+
+Weights = Callable[[np.ndarray, np.ndarray], "float | np.ndarray"]
+
+PARTS = ("sheet", "lower_skeletal", "upper_skeletal", "skeletals")
+# the tables change with these parameters, bump `CACHE_VERSION` accordingly
+_TABLE_RESOLUTION = 48
+_TABLE_SIZE = 65
+
+
+def estimate_part_density(
+    part: str,
+    fields: Mapping[str, np.ndarray],
+    axes: Sequence[np.ndarray],
+    weights: Weights,
+) -> tuple[float, float]:
+    """Volume fraction of a part bounded by the offset fields (see REGIONS)."""
+    if part == "skeletals":
+        lower = estimate_part_density("lower_skeletal", fields, axes, weights)
+        upper = estimate_part_density("upper_skeletal", fields, axes, weights)
+        return lower[0] + upper[0], lower[1] + upper[1]
+    if part not in REGIONS:
+        return 0.0, 0.0
+    return estimate_density(
+        [(fields[scalars], sign) for scalars, sign in REGIONS[part]],
+        axes,
+        weights,
+    )
+
+
+def estimate_density(
+    fields: Sequence[tuple[np.ndarray, int]],
+    axes: Sequence[np.ndarray],
+    weights: Weights,
+) -> tuple[float, float]:
+    """Volume fraction where all the ``sign * field`` are positive.
+
+    The fields are indexed along the three axes. The error is estimated as the
+    difference with the fraction computed on every other node, which is
+    larger than the error of the second order estimate on resolved fields.
+    """
+    density = _volume_fraction(fields, axes, weights)
+    coarse = [_coarse_indices(len(axis)) for axis in axes]
+    coarse_density = _volume_fraction(
+        [(field[np.ix_(*coarse)], sign) for field, sign in fields],
+        [axis[indices] for axis, indices in zip(axes, coarse)],
+        weights,
+    )
+    return density, abs(density - coarse_density)
+
+
+def _volume_fraction(
+    fields: Sequence[tuple[np.ndarray, int]],
+    axes: Sequence[np.ndarray],
+    weights: Weights,
+) -> float:
+    x, y, z = axes
+    lengths = _inside_fractions(fields) @ np.diff(z).astype(float)
+    line_weights = np.outer(_trapezoid(x), _trapezoid(y)) * weights(
+        x[:, None],
+        y[None, :],
+    )
+    volume = np.sum(line_weights) * (z[-1] - z[0])
+    return float(np.sum(line_weights * lengths) / volume)
+
+
+def _inside_fractions(fields: Sequence[tuple[np.ndarray, int]]) -> np.ndarray:
+    """Fraction of each segment along the last axis inside all the constraints."""
+    start = 0.0
+    stop = 1.0
+    for field, sign in fields:
+        before = sign * field[..., :-1]
+        after = sign * field[..., 1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = np.clip(
+                np.where(before != after, before / (before - after), 0.0),
+                0.0,
+                1.0,
+            )
+        start = np.maximum(start, np.where(before >= 0, 0.0, crossing))
+        stop = np.minimum(stop, np.where(after >= 0, 1.0, crossing))
+    return np.clip(stop - start, 0.0, None)
+
+
+def _trapezoid(axis: np.ndarray) -> np.ndarray:
+    """Weights of the trapezoidal rule on the nodes of an axis."""
+    steps = np.diff(axis).astype(float)
+    weights = np.zeros(len(axis))
+    weights[:-1] += 0.5 * steps
+    weights[1:] += 0.5 * steps
+    return weights
+
+
+def _coarse_indices(size: int) -> np.ndarray:
+    """Every other index of an axis, keeping the last one."""
+    return np.unique(np.r_[0:size:2, size - 1])
+
+
+def density_tables(surface: str | Function) -> dict[str, np.ndarray]:
+    """Density of a unit cell of each part versus the offset (``"offset"``).
+
+    The surface is a surface function, a built-in surface name or an
+    expression, the tables are cached under the name of its function.
+    """
+    function = surface if callable(surface) else surface_function(surface)
+    name = f"density-{function.__name__}"
+    tables = load_arrays(name)
+    if tables is None or set(tables) != {"offset", *PARTS}:
+        tables = _compute_density_tables(function)
+        save_arrays(name, tables)
+    return tables
+
+
+def build_density_tables(
+    surface_names: Iterable[str] | None = None,
+    workers: int | None = None,
+) -> None:
+    """Compute the missing density tables with a pool of processes."""
+    if surface_names is None:
+        surface_names = SURFACE_NAMES
+    functions = [surface_function(surface) for surface in surface_names]
+    missing = [
+        function
+        for function in functions
+        if load_arrays(f"density-{function.__name__}") is None
+    ]
+    if not missing:
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for function, tables in zip(
+            missing,
+            executor.map(_compute_density_tables, missing),
+        ):
+            save_arrays(f"density-{function.__name__}", tables)
+
+
+def offset_for_density(
+    surface: str | Function,
+    part: str,
+    density: float,
+) -> float:
+    """Offset of a part of a surface reaching a relative density."""
+    if part not in PARTS:
+        err_msg = f"part must be one of {list(PARTS)}"
+        raise ValueError(err_msg)
+    if not 0 < density < 1:
+        err_msg = "density must be between 0 and 1"
+        raise ValueError(err_msg)
+    offsets, densities = offset_table(surface, part)
+    return float(np.interp(density, densities, offsets))
+
+
+def offset_table(surface: str | Function, part: str) -> tuple[np.ndarray, np.ndarray]:
+    """Offsets and densities of a part, sorted by increasing density."""
+    tables = density_tables(surface)
+    offsets = tables["offset"]
+    densities = tables[part]
+    if part != "sheet":  # the skeletals thin out as the offset increases
+        offsets = offsets[::-1]
+        densities = densities[::-1]
+    return offsets, np.maximum.accumulate(densities)
+
+
+def _compute_density_tables(function: Function) -> dict[str, np.ndarray]:
+    axis = np.linspace(-np.pi, np.pi, _TABLE_RESOLUTION)
+    axes = [axis, axis, axis]
+    field = evaluate(function, axes)
+    amplitude = np.max(np.abs(field))
+
+    offsets = np.linspace(-2 * amplitude, 2 * amplitude, _TABLE_SIZE)
+    tables = {
+        part: np.empty(_TABLE_SIZE)
+        for part in ("sheet", "lower_skeletal", "upper_skeletal")
+    }
+    for index, offset in enumerate(offsets):
+        fields = {
+            "lower_surface": field + 0.5 * offset,
+            "upper_surface": field - 0.5 * offset,
+        }
+        for part, table in tables.items():
+            table[index] = _volume_fraction(
+                [(fields[scalars], sign) for scalars, sign in REGIONS[part]],
+                axes,
+                _uniform_weights,
+            )
+    tables["skeletals"] = tables["lower_skeletal"] + tables["upper_skeletal"]
+    tables["offset"] = offsets
+    return tables
+
+
+def _uniform_weights(x: np.ndarray, y: np.ndarray) -> float:  # noqa: ARG001
+    return 1.0
@@ -0,0 +1,547 @@
+"""Surfaces typed in as expressions of x, y and z.
+
+An expression such as ``"sin(x) * cos(y) + 0.5 * cos(2 * z)"`` is parsed with
+``ast`` and validated against a restricted grammar: numbers, the coordinates,
+``pi`` and ``e``, the arithmetic operators and the functions of ``FUNCTIONS``.
+Anything else is rejected, nothing of the expression is evaluated as Python.
+
+Expressions expanding to sums of products of sines and cosines of integer
+multiples of the coordinates are evaluated as a ``TrigSeries``, like the
+built-in surfaces. The others are compiled to a NumPy kernel computing each
+distinct subterm once. The compiled expressions are cached by their text.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import math
+import re
+from functools import lru_cache
+from inspect import isfunction
+from typing import Callable, Dict, Sequence, Tuple
+
+import numpy as np
+
+from blender_tpms.tpms import surfaces
+from blender_tpms.tpms.series import Harmonic, Term, TrigSeries
+
+Function = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+Interval = Tuple[np.ndarray, np.ndarray]
+Bounds = Callable[[Sequence[np.ndarray], Sequence[np.ndarray]], Interval]
+
+# name in the expressions: NumPy function and number of arguments
+FUNCTIONS: dict[str, tuple[str, int]] = {
+    "sin": ("sin", 1),
+    "cos": ("cos", 1),
+    "tan": ("tan", 1),
+    "arcsin": ("arcsin", 1),
+    "arccos": ("arccos", 1),
+    "arctan": ("arctan", 1),
+    "arctan2": ("arctan2", 2),
+    "sinh": ("sinh", 1),
+    "cosh": ("cosh", 1),
+    "tanh": ("tanh", 1),
+    "exp": ("exp", 1),
+    "log": ("log", 1),
+    "sqrt": ("sqrt", 1),
+    "abs": ("abs", 1),
+    "min": ("minimum", 2),
+    "max": ("maximum", 2),
+}
+CONSTANTS = {"pi": math.pi, "e": math.e}
+COORDINATES = ("x", "y", "z")
+MAX_LENGTH = 2000
+
+_OPERATORS = {
+    ast.Add: "+",
+    ast.Sub: "-",
+    ast.Mult: "*",
+    ast.Div: "/",
+    ast.Pow: "**",
+}
+_COMMUTATIVE = (ast.Add, ast.Mult)
+_UNARY = {ast.UAdd: "+", ast.USub: "-"}
+# largest integer power expanded as a product of series
+_MAX_POWER = 4
+# frequencies of the series harmonics, larger ones are left to the kernel
+_MAX_FREQUENCY = np.iinfo(np.int64).max
+_TEMPORARY = re.compile(r"\bt\d+\b")
+
+# coefficients of a series indexed by the harmonics along x, y and z
+Coefficients = Dict[Tuple[Harmonic, Harmonic, Harmonic], float]
+_ONE: Harmonic = ("cos", 0)
+
+
+class Expression:
+    """Surface function compiled from an expression of x, y and z."""
+
+    def __init__(self, text: str, tree: ast.Expression) -> None:
+        """Compile a validated expression."""
+        self.text = text
+        # named after a hash of the text, it names the cached density tables
+        digest = hashlib.sha256(text.encode()).hexdigest()[:16]
+        self.__name__ = f"expression-{digest}"
+        self._tree = tree
+        coefficients = _series(tree.body)
+        self.series = None if coefficients is None else _to_series(coefficients)
+        self._kernel = self.series if self.series is not None else _kernel(tree)
+
+    def __call__(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Evaluate the expression on broadcastable coordinate arrays."""
+        field = np.asarray(self._kernel(x, y, z))
+        shape = np.broadcast_shapes(np.shape(x), np.shape(y), np.shape(z))
+        if field.shape != shape:  # the expression ignores some coordinates
+            field = field + np.zeros(shape, dtype=field.dtype)
+        return field
+
+    def bounds(
+        self,
+        lower: Sequence[np.ndarray],
+        upper: Sequence[np.ndarray],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Bounds of the expression over boxes, by interval arithmetic.
+
+        The boxes span ``lower[i] <= u_i <= upper[i]`` along each axis, the
+        arrays being broadcast together as the coordinates of ``__call__``.
+        The bounds are NaN where the expression may be undefined.
+        """
+        coordinates = {
+            name: (np.asarray(low, dtype=float), np.asarray(high, dtype=float))
+            for name, low, high in zip(COORDINATES, lower, upper)
+        }
+        with np.errstate(all="ignore"):
+            low, high = _interval(self._tree.body, coordinates)
+        shape = np.broadcast_shapes(*(np.shape(bound) for bound in (*lower, *upper)))
+        return (
+            np.broadcast_to(low, shape).astype(float),
+            np.broadcast_to(high, shape).astype(float),
+        )
+
+    def __repr__(self) -> str:
+        """Representation with the text of the expression."""
+        return f"Expression({self.text!r})"
+
+    def __reduce__(self) -> tuple[Callable, tuple[str]]:
+        """Pickle the text, the kernel is compiled again when unpickled."""
+        return compile_expression, (self.text,)
+
+
+@lru_cache(maxsize=128)
+def compile_expression(text: str) -> Expression:
+    """Compile an expression of x, y and z, raising ValueError if invalid."""
+    if len(text) > MAX_LENGTH:
+        err_msg = f"expression longer than {MAX_LENGTH} characters"
+        raise ValueError(err_msg)
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as error:
+        err_msg = f"invalid expression {text!r}: {error.msg}"
+        raise ValueError(err_msg) from error
+    _validate(tree.body)
+    expression = Expression(text, tree)
+    try:
+        expression(*np.zeros((3, 1)))
+    except Exception as error:  # overflowing constants or frequencies
+        err_msg = f"invalid expression {text!r}: {error}"
+        raise ValueError(err_msg) from error
+    return expression
+
+
+def surface_function(surface: str) -> Function:
+    """Built-in surface of the name, or the surface of an expression."""
+    function = getattr(surfaces, surface, None)
+    if isfunction(function):
+        return function
+    return compile_expression(surface)
+
+
+def surface_series(function: Function) -> TrigSeries | None:
+    """Series of a surface function, None if it is not a series."""
+    if isinstance(function, TrigSeries):
+        return function
+    if isinstance(function, Expression):
+        return function.series
+    name = getattr(function, "__name__", "")
+    if getattr(surfaces, name, None) is function:
+        return surfaces.SERIES.get(name)
+    return None
+
+
+def surface_bounds(function: Function) -> Bounds | None:
+    """Interval bounds of a surface evaluated point by point, see ``bounds``.
+
+    None for the series, evaluated separably at a lower cost than the bounds
+    save, and for the functions which are not expressions.
+    """
+    if isinstance(function, Expression) and function.series is None:
+        return function.bounds
+    return None
+
+
+def is_builtin(surface: str) -> bool:
+    """Check that a surface is one of the built-in ones."""
+    return isfunction(getattr(surfaces, surface, None))
+
+
+def _validate(node: ast.AST) -> None:
+    """Check that the node and its children belong to the grammar."""
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        _validate(node.left)
+        _validate(node.right)
+    elif isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+        _validate(node.operand)
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            err_msg = f"unknown function, use one of {list(FUNCTIONS)}"
+            raise ValueError(err_msg)
+        _, n_arguments = FUNCTIONS[node.func.id]
+        if node.keywords or len(node.args) != n_arguments:
+            err_msg = f"{node.func.id} takes {n_arguments} positional argument(s)"
+            raise ValueError(err_msg)
+        for argument in node.args:
+            _validate(argument)
+    elif isinstance(node, ast.Name):
+        if node.id not in COORDINATES and node.id not in CONSTANTS:
+            err_msg = f"unknown name {node.id!r}, use x, y, z, pi or e"
+            raise ValueError(err_msg)
+    elif isinstance(node, ast.Constant):
+        _validate_constant(node.value)
+    else:
+        syntax = getattr(node, "op", node)
+        err_msg = f"unsupported syntax {type(syntax).__name__}"
+        raise ValueError(err_msg)
+
+
+def _validate_constant(value: object) -> None:
+    """Check that a constant is a finite number, representable as a float."""
+    if type(value) not in (int, float):
+        err_msg = f"unsupported constant {value!r}"
+        raise ValueError(err_msg)
+    try:
+        finite = math.isfinite(float(value))
+    except OverflowError as error:
+        err_msg = "unsupported constant, too large for a float"
+        raise ValueError(err_msg) from error
+    if not finite:
+        err_msg = f"unsupported constant {value!r}"
+        raise ValueError(err_msg)
+
+
+def _kernel(tree: ast.Expression) -> Function:
+    """NumPy function computing each distinct subterm of the expression once."""
+    lines: list[tuple[str, str]] = []
+    names: dict[object, str] = {}
+
+    def emit(node: ast.AST) -> tuple[object, str]:
+        """Key identifying the value of a node and the code computing it."""
+        if isinstance(node, ast.Constant):
+            return float(node.value), repr(float(node.value))
+        if isinstance(node, ast.Name):
+            if node.id in CONSTANTS:
+                return CONSTANTS[node.id], repr(CONSTANTS[node.id])
+            return node.id, node.id
+        if isinstance(node, ast.UnaryOp):
+            key, code = emit(node.operand)
+            key, code = (type(node.op), key), f"{_UNARY[type(node.op)]}{code}"
+        elif isinstance(node, ast.BinOp):
+            operands = [emit(node.left), emit(node.right)]
+            if isinstance(node.op, _COMMUTATIVE):
+                operands.sort(key=lambda operand: repr(operand[0]))
+            (left_key, left), (right_key, right) = operands
+            key = (type(node.op), left_key, right_key)
+            code = f"{left} {_OPERATORS[type(node.op)]} {right}"
+        else:  # call
+            function, _ = FUNCTIONS[node.func.id]
+            arguments = [emit(argument) for argument in node.args]
+            key = (function, *(argument_key for argument_key, _ in arguments))
+            code = f"np.{function}({', '.join(code for _, code in arguments)})"
+        if key not in names:
+            names[key] = f"t{len(names)}"
+            lines.append((names[key], code))
+        return key, names[key]
+
+    _, result = emit(tree.body)
+    body = _release_temporaries(lines)
+    source = "\n".join(["def kernel(x, y, z):", *body, f"    return {result}"])
+    # the source is generated from the validated nodes only
+    namespace: dict[str, object] = {"np": np, "__builtins__": {}}
+    exec(compile(source, "<expression>", "exec"), namespace)
+    return namespace["kernel"]
+
+
+def _release_temporaries(lines: list[tuple[str, str]]) -> list[str]:
+    """Statements assigning the temporaries, deleted after their last use."""
+    last_uses = {}
+    for index, (_, code) in enumerate(lines):
+        for name in _TEMPORARY.findall(code):
+            last_uses[name] = index
+    body = []
+    for index, (name, code) in enumerate(lines):
+        body.append(f"    {name} = {code}")
+        released = [used for used, last in last_uses.items() if last == index]
+        if released:
+            body.append(f"    del {', '.join(released)}")
+    return body
+
+
+def _series(node: ast.AST) -> Coefficients | None:
+    """Coefficients of the series of the node, None if it is not one."""
+    if isinstance(node, ast.Constant):
+        return {(_ONE, _ONE, _ONE): float(node.value)}
+    if isinstance(node, ast.Name):
+        if node.id in CONSTANTS:
+            return {(_ONE, _ONE, _ONE): CONSTANTS[node.id]}
+        return None
+    if isinstance(node, ast.UnaryOp):
+        operand = _series(node.operand)
+        if operand is None or isinstance(node.op, ast.UAdd):
+            return operand
+        return _scale(operand, -1.0)
+    if isinstance(node, ast.Call):
+        return _harmonic_series(node)
+    left, right = _series(node.left), _series(node.right)
+    if left is None or right is None:
+        return None
+    if isinstance(node.op, ast.Add):
+        return _add(left, right)
+    if isinstance(node.op, ast.Sub):
+        return _add(left, _scale(right, -1.0))
+    if isinstance(node.op, ast.Mult):
+        return _multiply(left, right)
+    constant = _constant(right)
+    if constant is None:
+        return None
+    if isinstance(node.op, ast.Div):
+        return _scale(left, 1 / constant) if constant != 0 else None
+    # power
+    if not constant.is_integer() or not 0 <= constant <= _MAX_POWER:
+        return None
+    product: Coefficients | None = {(_ONE, _ONE, _ONE): 1.0}
+    for _ in range(int(constant)):
+        product = _multiply(product, left) if product is not None else None
+    return product
+
+
+def _harmonic_series(node: ast.Call) -> Coefficients | None:
+    """Series of ``sin(n * u)`` or ``cos(n * u)``, n being an integer."""
+    if node.func.id not in ("sin", "cos"):
+        return None
+    argument = _series_argument(node.args[0])
+    if argument is None:
+        return None
+    axis, frequency = argument
+    sign = 1.0
+    if frequency < 0:
+        frequency = -frequency
+        sign = -1.0 if node.func.id == "sin" else 1.0
+    if frequency == 0:
+        return {} if node.func.id == "sin" else {(_ONE, _ONE, _ONE): 1.0}
+    harmonics = [_ONE, _ONE, _ONE]
+    harmonics[axis] = (node.func.id, frequency)
+    return {tuple(harmonics): sign}
+
+
+def _series_argument(node: ast.AST) -> tuple[int, int] | None:
+    """Axis and integer frequency of an argument ``n * u``, ``u * n`` or ``u``."""
+    if isinstance(node, ast.Name) and node.id in COORDINATES:
+        return COORDINATES.index(node.id), 1
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        argument = _series_argument(node.operand)
+        if argument is None or isinstance(node.op, ast.UAdd):
+            return argument
+        return argument[0], -argument[1]
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult):
+        for factor, coordinate in ((node.left, node.right), (node.right, node.left)):
+            series = _series(factor)
+            constant = None if series is None else _constant(series)
+            argument = _series_argument(coordinate)
+            if constant is not None and constant.is_integer() and argument:
+                frequency = int(constant) * argument[1]
+                if abs(frequency) > _MAX_FREQUENCY:
+                    return None
+                return argument[0], frequency
+    return None
+
+
+def _constant(series: Coefficients) -> float | None:
+    """Value of a constant series, None if it is not constant."""
+    if set(series) - {(_ONE, _ONE, _ONE)}:
+        return None
+    return series.get((_ONE, _ONE, _ONE), 0.0)
+
+
+def _add(left: Coefficients, right: Coefficients) -> Coefficients:
+    total = dict(left)
+    for harmonics, coefficient in right.items():
+        total[harmonics] = total.get(harmonics, 0.0) + coefficient
+    return total
+
+
+def _scale(series: Coefficients, factor: float) -> Coefficients:
+    return {
+        harmonics: factor * coefficient for harmonics, coefficient in series.items()
+    }
+
+
+def _multiply(left: Coefficients, right: Coefficients) -> Coefficients | None:
+    """Product of two series, None if two harmonics of an axis multiply."""
+    product: Coefficients = {}
+    for left_harmonics, left_coefficient in left.items():
+        for right_harmonics, right_coefficient in right.items():
+            harmonics = []
+            for left_harmonic, right_harmonic in zip(left_harmonics, right_harmonics):
+                if _ONE not in (left_harmonic, right_harmonic):
+                    return None
+                harmonics.append(
+                    right_harmonic if left_harmonic == _ONE else left_harmonic,
+                )
+            key = tuple(harmonics)
+            product[key] = product.get(key, 0.0) + left_coefficient * right_coefficient
+    return product
+
+
+def _to_series(coefficients: Coefficients) -> TrigSeries:
+    return TrigSeries(
+        tuple(
+            Term(coefficient, harmonics)
+            for harmonics, coefficient in coefficients.items()
+            if coefficient != 0
+        ),
+    )
+
+
+def _interval(
+    node: ast.AST,
+    coordinates: dict[str, Interval],
+) -> Interval:
+    """Bounds of the value of a node over the intervals of the coordinates.
+
+    The bounds are infinite where the value is unbounded and NaN where it may
+    be undefined, which both prevent the culling of a block.
+    """
+    if isinstance(node, ast.Constant):
+        return float(node.value), float(node.value)
+    if isinstance(node, ast.Name):
+        if node.id in CONSTANTS:
+            return CONSTANTS[node.id], CONSTANTS[node.id]
+        return coordinates[node.id]
+    if isinstance(node, ast.UnaryOp):
+        low, high = _interval(node.operand, coordinates)
+        return (low, high) if isinstance(node.op, ast.UAdd) else (-high, -low)
+    if isinstance(node, ast.Call):
+        function, _ = FUNCTIONS[node.func.id]
+        arguments = [_interval(argument, coordinates) for argument in node.args]
+        return _function_interval(function, arguments)
+    left = _interval(node.left, coordinates)
+    right = _interval(node.right, coordinates)
+    if isinstance(node.op, ast.Add):
+        return left[0] + right[0], left[1] + right[1]
+    if isinstance(node.op, ast.Sub):
+        return left[0] - right[1], left[1] - right[0]
+    if isinstance(node.op, ast.Mult):
+        return _interval_product(left, right)
+    if isinstance(node.op, ast.Div):
+        return _interval_quotient(left, right)
+    return _interval_power(left, right)
+
+
+def _interval_product(left: Interval, right: Interval) -> Interval:
+    products = [low * high for low in left for high in right]
+    return np.minimum.reduce(products), np.maximum.reduce(products)
+
+
+def _interval_quotient(left: Interval, right: Interval) -> Interval:
+    low, high = right
+    low, high = _interval_product(left, (1 / high, 1 / low))
+    spans_zero = (right[0] <= 0) & (right[1] >= 0)
+    return np.where(spans_zero, -np.inf, low), np.where(spans_zero, np.inf, high)
+
+
+def _interval_power(base: Interval, exponent: Interval) -> Interval:
+    low, high = base
+    exponent_low, exponent_high = exponent
+    if np.ndim(exponent_low) or exponent_low != exponent_high:
+        # variable exponents are not bounded
+        nan = np.full(np.shape(low), np.nan)
+        return nan, nan
+    power = exponent_low
+    if power < 0:
+        return _interval_quotient((1.0, 1.0), _interval_power(base, (-power, -power)))
+    if power.is_integer() and power % 2 == 0:
+        magnitude = _function_interval("abs", [base])
+        return magnitude[0] ** power, magnitude[1] ** power
+    if power.is_integer():
+        return low**power, high**power
+    # fractional powers are undefined for negative bases
+    defined = low >= 0
+    return np.where(defined, low**power, np.nan), np.where(defined, high**power, np.nan)
+
+
+# functions monotonic over their domain: increasing, domain bounds
+_MONOTONIC = {
+    "arcsin": (True, -1.0, 1.0),
+    "arccos": (False, -1.0, 1.0),
+    "arctan": (True, -np.inf, np.inf),
+    "sinh": (True, -np.inf, np.inf),
+    "tanh": (True, -np.inf, np.inf),
+    "exp": (True, -np.inf, np.inf),
+    "log": (True, 0.0, np.inf),
+    "sqrt": (True, 0.0, np.inf),
+}
+
+
+def _function_interval(function: str, arguments: list[Interval]) -> Interval:
+    """Bounds of a NumPy function of ``FUNCTIONS`` over intervals."""
+    if function in ("minimum", "maximum"):
+        (left_low, left_high), (right_low, right_high) = arguments
+        numpy_function = getattr(np, function)
+        return (
+            numpy_function(left_low, right_low),
+            numpy_function(left_high, right_high),
+        )
+    if function == "arctan2":
+        return -np.pi, np.pi
+    if function == "tan":
+        return -np.inf, np.inf
+    ((low, high),) = arguments
+    if function in ("sin", "cos"):
+        return _trigonometric_interval(function, low, high)
+    if function in ("abs", "cosh"):
+        spans_zero = (low <= 0) & (high >= 0)
+        smallest = np.where(spans_zero, 0.0, np.minimum(np.abs(low), np.abs(high)))
+        largest = np.maximum(np.abs(low), np.abs(high))
+        if function == "cosh":
+            return np.cosh(smallest), np.cosh(largest)
+        return smallest, largest
+    increasing, start, stop = _MONOTONIC[function]
+    numpy_function = getattr(np, function)
+    defined = (low >= start) & (high <= stop)
+    low, high = numpy_function(low), numpy_function(high)
+    if not increasing:
+        low, high = high, low
+    return np.where(defined, low, np.nan), np.where(defined, high, np.nan)
+
+
+def _trigonometric_interval(
+    function: str,
+    low: np.ndarray,
+    high: np.ndarray,
+) -> Interval:
+    """Range of the sine or the cosine over intervals."""
+    # cos(u) = sin(u + pi / 2), the maxima of the sine are at pi / 2 + 2 k pi
+    # and its minima at -pi / 2 + 2 k pi
+    phase = 0.5 * np.pi if function == "cos" else 0.0
+    start, stop = low + phase, high + phase
+    period = 2 * np.pi
+    reaches_max = np.floor((stop - 0.5 * np.pi) / period) >= np.ceil(
+        (start - 0.5 * np.pi) / period,
+    )
+    reaches_min = np.floor((stop + 0.5 * np.pi) / period) >= np.ceil(
+        (start + 0.5 * np.pi) / period,
+    )
+    ends = np.sin(start), np.sin(stop)
+    return (
+        np.where(reaches_min, -1.0, np.minimum(*ends)),
+        np.where(reaches_max, 1.0, np.maximum(*ends)),
+    )
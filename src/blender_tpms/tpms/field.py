@@ -0,0 +1,224 @@
+"""Evaluation of the TPMS field on rectilinear grids."""
+
+from __future__ import annotations
+
+import itertools
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+from blender_tpms.tpms.expression import surface_bounds
+from blender_tpms.tpms.symmetry import maps_grid, symmetry_group
+
+Function = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+_3D = 3
+# largest number of points of the band evaluated at once
+_CHUNK_SIZE = 1 << 20
+
+
+def evaluate_dense(function: Function, axes: Sequence[np.ndarray]) -> np.ndarray:
+    """Evaluate the function on full 3D coordinate arrays."""
+    return function(*np.meshgrid(*axes, indexing="ij"))
+
+
+def evaluate_separable(function: Function, axes: Sequence[np.ndarray]) -> np.ndarray:
+    """Evaluate the function on broadcastable 1D coordinate arrays.
+
+    Every term of the surfaces is a product of 1D harmonics, so ``sin``/``cos``
+    of each axis are computed on ``n`` values instead of ``n**3`` and the terms
+    are assembled by broadcasting their outer products.
+    """
+    field = function(*np.meshgrid(*axes, indexing="ij", sparse=True))
+    return np.broadcast_to(field, tuple(len(axis) for axis in axes))
+
+
+def _symmetric_blocks(n_points: int, block_size: int) -> list[slice]:
+    """Split an axis in blocks such that its reversal maps blocks onto blocks."""
+    half = n_points // 2
+    n_blocks = max(1, round(half / block_size))
+    edges = np.linspace(0, half, n_blocks + 1).round().astype(int)
+    edges = np.unique(np.concatenate([edges, n_points - edges]))
+    return [slice(start, stop) for start, stop in zip(edges[:-1], edges[1:])]
+
+
+def evaluate_symmetric(
+    function: Function,
+    axes: Sequence[np.ndarray],
+    block_size: int = 32,
+) -> np.ndarray:
+    """Evaluate the function on its asymmetric unit and fill the rest.
+
+    The grid is split in blocks mapped onto each other by the symmetry
+    operations of the surface which also map the sample points onto each other.
+    Only one block per orbit is evaluated, separably, the others are filled by
+    transposing, reversing and negating it.
+    """
+    axes = [np.asarray(axis) for axis in axes]
+    group = [
+        operation
+        for operation in symmetry_group(function)
+        if maps_grid(operation, axes)
+    ]
+    blocks = [_symmetric_blocks(len(axis), block_size) for axis in axes]
+    n_points = [len(axis) for axis in axes]
+    n_blocks = [len(axis_blocks) for axis_blocks in blocks]
+
+    field = np.empty(n_points, dtype=np.result_type(*axes))
+    filled = np.zeros(n_blocks, dtype=bool)
+    for block in np.ndindex(*n_blocks):
+        if filled[block]:
+            continue
+        slices = [axis_blocks[index] for axis_blocks, index in zip(blocks, block)]
+        values = evaluate_separable(
+            function,
+            [axis[axis_slice] for axis, axis_slice in zip(axes, slices)],
+        )
+        for permutation, signs, field_sign in group:
+            image_block = tuple(
+                block[source] if sign > 0 else n_blocks[axis] - 1 - block[source]
+                for axis, (source, sign) in enumerate(zip(permutation, signs))
+            )
+            if filled[image_block]:
+                continue
+            image = field_sign * values.transpose(permutation)
+            image = image[tuple(slice(None, None, sign) for sign in signs)]
+            field[
+                tuple(blocks[axis][index] for axis, index in enumerate(image_block))
+            ] = image
+            filled[image_block] = True
+    return field
+
+
+def evaluate_narrow_band(
+    function: Function,
+    axes: Sequence[np.ndarray],
+    band: float = 0.0,
+    block_size: int = 8,
+) -> np.ndarray:
+    """Evaluate the function only where it may lie within ``[-band, band]``.
+
+    The grid points are grouped in blocks of ``block_size`` points along each
+    axis, holding the first corners of as many cells. The function is bounded
+    on the cells of each block by interval arithmetic (see ``surface_bounds``).
+    The blocks whose cells are entirely above ``band`` or below ``-band`` hold
+    the bound closest to the band instead of the values, which keeps their
+    points on their side of the levels within the band, so that no isosurface
+    of these levels crosses their cells. The function is only evaluated on the
+    corners of the cells of the other blocks, the narrow band, by batches of
+    blocks evaluated separably.
+
+    Only the expressions evaluated point by point are bounded, the other
+    functions are evaluated separably on the whole grid.
+    """
+    axes = [np.asarray(axis) for axis in axes]
+    bounds = surface_bounds(function)
+    if bounds is None or min(len(axis) for axis in axes) < 2:  # noqa: PLR2004
+        return evaluate_separable(function, axes)
+
+    n_blocks = [-(-len(axis) // block_size) for axis in axes]
+    # coordinates of the points of each block, the last point of an axis
+    # padding its last block
+    coordinates = [
+        axis[np.minimum(np.arange(n_axis_blocks * block_size), len(axis) - 1)].reshape(
+            n_axis_blocks,
+            block_size,
+        )
+        for axis, n_axis_blocks in zip(axes, n_blocks)
+    ]
+    # last corners of the cells of each block
+    stops = [
+        axis[np.minimum(np.arange(1, n_axis_blocks + 1) * block_size, len(axis) - 1)]
+        for axis, n_axis_blocks in zip(axes, n_blocks)
+    ]
+    low, high = bounds(
+        np.meshgrid(
+            *(np.minimum(first[:, 0], stop) for first, stop in zip(coordinates, stops)),
+            indexing="ij",
+            sparse=True,
+        ),
+        np.meshgrid(
+            *(np.maximum(first[:, 0], stop) for first, stop in zip(coordinates, stops)),
+            indexing="ij",
+            sparse=True,
+        ),
+    )
+    dtype = np.result_type(*axes)
+    # the evaluated values may exceed the bounds by their rounding errors
+    margin = 64 * np.finfo(dtype).eps * np.maximum(1.0, np.abs([low, high]).max(axis=0))
+    with np.errstate(invalid="ignore"):
+        above = low > band + margin
+        below = high < -band - margin
+    in_band = ~(above | below)
+
+    field = np.empty([n_axis_blocks * block_size for n_axis_blocks in n_blocks], dtype)
+    blocks = field.reshape(
+        [size for n_axis_blocks in n_blocks for size in (n_axis_blocks, block_size)],
+    )
+    culled = np.where(above, low, np.where(below, high, 0.0))
+    blocks[...] = culled[:, None, :, None, :, None]
+
+    band_blocks = np.argwhere(in_band)
+    _evaluate_blocks(function, blocks, coordinates, band_blocks, (0, 0, 0))
+    # the last corners of the cells of the band are the first points of the
+    # next blocks along the shifted axes
+    for shift in itertools.product((0, 1), repeat=_3D):
+        if not any(shift):
+            continue
+        neighbors = band_blocks + shift
+        neighbors = neighbors[np.all(neighbors < n_blocks, axis=1)]
+        neighbors = neighbors[~in_band[tuple(neighbors.T)]]
+        _evaluate_blocks(function, blocks, coordinates, neighbors, shift)
+    return field[tuple(slice(len(axis)) for axis in axes)]
+
+
+def _evaluate_blocks(
+    function: Function,
+    blocks: np.ndarray,
+    coordinates: Sequence[np.ndarray],
+    indices: np.ndarray,
+    shift: tuple[int, int, int],
+) -> None:
+    """Evaluate the function on blocks, or on their first layers if shifted."""
+    sizes = [1 if axis_shift else blocks.shape[1] for axis_shift in shift]
+    n_batch = max(1, _CHUNK_SIZE // int(np.prod(sizes)))
+    for first in range(0, len(indices), n_batch):
+        batch = indices[first : first + n_batch]
+        points = []
+        index: list[np.ndarray | int | slice] = []
+        for axis, (axis_coordinates, size) in enumerate(zip(coordinates, sizes)):
+            shape = [-1, 1, 1, 1]
+            shape[axis + 1] = size
+            points.append(axis_coordinates[batch[:, axis], :size].reshape(shape))
+            index += [batch[:, axis], slice(None) if size > 1 else 0]
+        values = np.broadcast_to(function(*points), (len(batch), *sizes))
+        blocks[tuple(index)] = values.reshape(
+            len(batch),
+            *(size for size in sizes if size > 1),
+        )
+
+
+EVALUATIONS: dict[str, Callable[..., np.ndarray]] = {
+    "dense": evaluate_dense,
+    "separable": evaluate_separable,
+    "symmetric": evaluate_symmetric,
+    "narrow_band": evaluate_narrow_band,
+}
+
+
+def evaluate(
+    function: Function,
+    axes: Sequence[np.ndarray],
+    evaluation: str = "separable",
+    **options: Any,  # noqa: ANN401
+) -> np.ndarray:
+    """Evaluate the function on the grid spanned by three 1D axes.
+
+    The returned array is indexed as ``field[i, j, k] = function(axes[0][i],
+    axes[1][j], axes[2][k])``. The options are passed to the evaluation, such
+    as the ``band`` of ``evaluate_narrow_band``.
+    """
+    if evaluation not in EVALUATIONS:
+        err_msg = f"evaluation must be one of {list(EVALUATIONS)}"
+        raise ValueError(err_msg)
+    return EVALUATIONS[evaluation](function, axes, **options)
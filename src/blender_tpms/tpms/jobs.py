@@ -0,0 +1,220 @@
+"""Generation of TPMS meshes in worker processes.
+
+A ``TpmsJob`` generates a part in a process of its own, so that the caller is
+not blocked and can cancel it. The worker sends the stages it enters through a
+queue, read without blocking by ``poll``. The finished mesh is written by the
+worker to a shared memory block, which ``result`` maps as arrays without
+copying them, or pickled through the queue on Windows.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import queue
+from contextlib import contextmanager
+from typing import Any, Iterator, NamedTuple
+
+import numpy as np
+
+from blender_tpms.tpms.cache import GeometryCache
+from blender_tpms.tpms.profiling import Profiler, Stage
+from blender_tpms.tpms.tpms import (
+    MeshChunk,
+    SharedArrays,
+    Tpms,
+    _release_shared_memory,
+    _shared_arrays,
+    _to_shared_memory,
+)
+
+# processes started from blender must not inherit its state
+_CONTEXT = multiprocessing.get_context("spawn")
+_MESHES = ("mesh", "proxy")
+
+
+class JobResult(NamedTuple):
+    """Meshes and relative density generated by a job."""
+
+    mesh: MeshChunk
+    proxy: MeshChunk | None
+    density: float
+
+
+class TpmsJob:
+    """Generation of a part of a TPMS in a worker process.
+
+    The job goes from ``"pending"`` to ``"running"`` when started, then to
+    ``"done"``, ``"failed"`` or ``"cancelled"``. The worker creates the
+    geometry with ``parameters``, fits its offset to ``target_density`` if it
+    is positive and extracts ``part``. With ``proxy_resolution``, it also
+    extracts a proxy of the part subsampled to this resolution.
+    """
+
+    def __init__(
+        self,
+        tpms_class: type[Tpms],
+        parameters: dict[str, Any],
+        *,
+        target_density: float = 0.0,
+        proxy_resolution: int | None = None,
+        disk_cache: bool = False,
+    ) -> None:
+        """Create a job, started with ``start``."""
+        self.state = "pending"
+        self.stages: list[str] = []
+        self.error: str | None = None
+        self._queue = _CONTEXT.Queue()
+        self._process = _CONTEXT.Process(
+            target=_generate,
+            args=(
+                self._queue,
+                tpms_class,
+                parameters,
+                target_density,
+                proxy_resolution,
+                disk_cache,
+            ),
+            daemon=True,
+        )
+        self._density = 0.0
+        self._shared: SharedArrays | None = None
+
+    @property
+    def stage(self) -> str | None:
+        """Path of the last stage entered by the worker."""
+        return self.stages[-1] if self.stages else None
+
+    def start(self) -> None:
+        """Start the worker process."""
+        self._process.start()
+        self.state = "running"
+
+    def poll(self) -> str:
+        """Read the messages sent by the worker without blocking.
+
+        Returns the state of the job.
+        """
+        while self.state == "running":
+            # a worker which exited has flushed its messages
+            alive = self._process.is_alive()
+            try:
+                kind, value = self._queue.get_nowait()
+            except queue.Empty:
+                if not alive:
+                    self._finish(
+                        "failed",
+                        f"the worker exited with code {self._process.exitcode}",
+                    )
+                break
+            if kind == "stage":
+                self.stages.append(value)
+            elif kind == "done":
+                self._density, self._shared = value
+                self._finish("done")
+            else:
+                self._finish("failed", value)
+        return self.state
+
+    def cancel(self) -> None:
+        """Stop the worker and release the mesh which was not read."""
+        if self.state == "pending":
+            self.state = "cancelled"
+        # the messages are read before stopping the worker, which could be
+        # interrupted while sending one, to release a mesh already sent
+        if self.poll() == "running":
+            self._process.terminate()
+            self._finish("cancelled")
+        if self._shared is not None:
+            _release_shared_memory(self._shared)
+            self._shared = None
+
+    @contextmanager
+    def result(self) -> Iterator[JobResult]:
+        """Map the meshes generated by the job.
+
+        The shared memory is released after the block, the arrays must not be
+        used outside of it. On Windows, where the worker cannot leave a block
+        behind when it exits, the meshes are received as arrays.
+        """
+        if self.state != "done" or self._shared is None:
+            err_msg = f"the job is {self.state}, its result cannot be read"
+            raise RuntimeError(err_msg)
+        shared, self._shared = self._shared, None
+        with _shared_arrays(shared) as arrays:
+            yield JobResult(
+                *(_generated_mesh(arrays, mesh) for mesh in _MESHES),
+                density=self._density,
+            )
+
+    def _finish(self, state: str, error: str | None = None) -> None:
+        self.state = state
+        self.error = error
+        self._process.join()
+        self._queue.close()
+
+
+class _StageReporter(Profiler):
+    """Profiler sending the path of each stage it enters through a queue."""
+
+    def __init__(self, messages: multiprocessing.Queue) -> None:
+        super().__init__()
+        self._messages = messages
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        self._messages.put(("stage", "/".join([*self._paths, name])))
+        with super().stage(name) as record:
+            yield record
+
+
+def _generate(  # noqa: PLR0913, PLR0917
+    messages: multiprocessing.Queue,
+    tpms_class: type[Tpms],
+    parameters: dict[str, Any],
+    target_density: float,
+    proxy_resolution: int | None,
+    disk_cache: bool,  # noqa: FBT001
+) -> None:
+    """Generate the meshes of a job in the worker process."""
+    try:
+        reporter = _StageReporter(messages)
+        tpms = tpms_class(
+            **parameters,
+            geometry_cache=GeometryCache() if disk_cache else None,
+            profiler=reporter,
+        )
+        with reporter.activate():
+            if target_density > 0 and tpms.part != "surface":
+                tpms.fit_offset(target_density)
+            density, _ = tpms.estimate_relative_density()
+            meshes = {"mesh": tpms.vtk_mesh}
+            if proxy_resolution is not None:
+                meshes["proxy"] = tpms.proxy_mesh(proxy_resolution)
+    except Exception as error:  # noqa: BLE001 (reported to the caller)
+        messages.put(("error", f"{type(error).__name__}: {error}"))
+        return
+
+    arrays = {}
+    for prefix, mesh in meshes.items():
+        arrays[f"{prefix}.points"] = np.asarray(mesh.points)
+        arrays[f"{prefix}.faces"] = mesh.faces.reshape(-1, 4)[:, 1:]
+        for name in ("surface", "lower_surface", "upper_surface"):
+            if name in mesh.point_data:
+                arrays[f"{prefix}.point_data.{name}"] = np.asarray(mesh[name])
+    messages.put(("done", (density, _to_shared_memory(arrays))))
+
+
+def _generated_mesh(arrays: dict[str, np.ndarray], prefix: str) -> MeshChunk | None:
+    """Mesh of the arrays starting with a prefix, if any."""
+    if f"{prefix}.points" not in arrays:
+        return None
+    point_data = f"{prefix}.point_data."
+    return MeshChunk(
+        points=arrays[f"{prefix}.points"],
+        faces=arrays[f"{prefix}.faces"],
+        point_data={
+            name[len(point_data) :]: data
+            for name, data in arrays.items()
+            if name.startswith(point_data)
+        },
+    )
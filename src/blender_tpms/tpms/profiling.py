@@ -0,0 +1,165 @@
+"""Opt-in instrumentation of the generation stages.
+
+A ``Profiler`` records the duration of nested stages, the size of what they
+produce and, with ``trace_memory``, the peak of the memory traced by
+``tracemalloc`` during each of them (NumPy arrays are traced, the VTK objects
+are not). The stages are recorded by the active profiler, if any, so that
+instrumenting a function costs nothing when no profiler is active.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Iterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_ACTIVE: ContextVar[Profiler | None] = ContextVar("profiler", default=None)
+
+
+@dataclass
+class Stage:
+    """Measures of a stage, ``path`` joins the names of the enclosing stages."""
+
+    path: str
+    seconds: float = 0.0
+    nbytes: int | None = None
+    peak_bytes: int | None = None
+
+
+class Profiler:
+    """Collect the duration, output size and memory peak of each stage."""
+
+    def __init__(self, *, trace_memory: bool = False) -> None:
+        """Create a profiler, tracing the memory allocations if asked."""
+        self.trace_memory = trace_memory
+        self.stages: list[Stage] = []
+        self._paths: list[str] = []
+        # peak of the traced memory in the enclosing stages, before a nested
+        # stage resets it
+        self._peaks: list[int] = []
+        self._started_tracing = False
+
+    @contextmanager
+    def activate(self) -> Iterator[Profiler]:
+        """Make the profiler record the stages run in the block."""
+        token = _ACTIVE.set(self)
+        self._start_tracing()
+        try:
+            yield self
+        finally:
+            self._stop_tracing()
+            _ACTIVE.reset(token)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        """Record a stage nested in the current one."""
+        record = Stage("/".join([*self._paths, name]))
+        self.stages.append(record)
+        self._paths.append(name)
+        with self.activate():
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                self._peaks.append(current)
+                # Python 3.8 lacks reset_peak, the peaks of the stages are then
+                # bounded by the peak since the tracing started
+                if hasattr(tracemalloc, "reset_peak"):
+                    tracemalloc.reset_peak()
+            start = time.perf_counter()
+            try:
+                yield record
+            finally:
+                record.seconds = time.perf_counter() - start
+                if self.trace_memory:
+                    peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                    record.peak_bytes = peak - current
+                    if self._peaks:
+                        self._peaks[-1] = max(self._peaks[-1], peak)
+                self._paths.pop()
+                logger.debug("%s: %.3fs", record.path, record.seconds)
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Measures aggregated per stage path, in the order of the first calls.
+
+        The durations and sizes are summed over the calls of a stage, the
+        memory peak is the largest one.
+        """
+        totals: dict[str, dict[str, Any]] = {}
+        for record in self.stages:
+            total = totals.setdefault(
+                record.path,
+                {"path": record.path, "calls": 0, "seconds": 0.0},
+            )
+            total["calls"] += 1
+            total["seconds"] += record.seconds
+            if record.nbytes is not None:
+                total["nbytes"] = total.get("nbytes", 0) + record.nbytes
+            if record.peak_bytes is not None:
+                total["peak_bytes"] = max(
+                    total.get("peak_bytes", 0),
+                    record.peak_bytes,
+                )
+        return list(totals.values())
+
+    def report(self) -> str:
+        """Table of the aggregated measures, one stage per line."""
+        lines = [f"{'stage':<40} {'calls':>5} {'time':>9} {'size':>10} {'peak':>10}"]
+        for total in self.summary():
+            depth = total["path"].count("/")
+            name = "  " * depth + total["path"].rsplit("/", 1)[-1]
+            lines.append(
+                f"{name:<40} {total['calls']:>5} {total['seconds']:>8.3f}s"
+                f" {_megabytes(total.get('nbytes')):>10}"
+                f" {_megabytes(total.get('peak_bytes')):>10}",
+            )
+        return "\n".join(lines)
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        """Measures of every call of the stages."""
+        return [asdict(record) for record in self.stages]
+
+    def _start_tracing(self) -> None:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def _stop_tracing(self) -> None:
+        if self._started_tracing and not self._paths:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Stage | None]:
+    """Record a stage with the active profiler, if any."""
+    profiler = _ACTIVE.get()
+    if profiler is None:
+        yield None
+        return
+    with profiler.stage(name) as record:
+        yield record
+
+
+def nbytes(value: Any) -> int | None:  # noqa: ANN401
+    """Memory held by an array, a dataset or a tuple of them."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, "actual_memory_size"):  # PyVista datasets
+        return value.actual_memory_size * 1024
+    if isinstance(value, tuple):
+        sizes = [nbytes(item) for item in value]
+        return None if None in sizes else sum(sizes)
+    return None
+
+
+def _megabytes(value: int | None) -> str:
+    return "" if value is None else f"{value / 1024**2:.1f}MB"
@@ -0,0 +1,39 @@
+"""Names of the built-in surfaces, listed without importing them.
+
+The names are those of the functions of ``surfaces``, in the order of
+``inspect.getmembers``. They fill the surface menus of the add-on, which are
+built when it registers, before the surfaces are needed.
+"""
+
+SURFACE_NAMES = (
+    "Dprime",
+    "FRD",
+    "Gprime",
+    "I",
+    "KP",
+    "OCTO",
+    "P",
+    "PN",
+    "P_W",
+    "SC",
+    "doubleP",
+    "double_diamond",
+    "double_gyroid",
+    "fischerKochS",
+    "gyroid",
+    "honeycomb",
+    "honeycomb_I",
+    "honeycomb_L",
+    "honeycomb_diamond",
+    "honeycomb_gyroid",
+    "honeycomb_primitive",
+    "lidinoid",
+    "neovius",
+    "pmy",
+    "schoenFRD",
+    "schoenIWP",
+    "schwarzD",
+    "schwarzP",
+    "splitP",
+    "split_p",
+)
@@ -0,0 +1,250 @@
+"""Surfaces described as trigonometric series.
+
+A ``TrigSeries`` is a table of terms ``c * f(a x) * g(b y) * h(c z)``, each
+factor being the sine or the cosine of an integer multiple of a coordinate, a
+cosine of frequency 0 standing for 1. The series are written as sums such as
+``"0.5 sin(2x) cos(y) - cos(2z) + 0.3"``.
+
+The evaluation computes each harmonic once per axis on the coordinate arrays,
+which are 1D when they are broadcast. The terms are summed on the planes they
+span and only these sums touch the full output, accumulated in place with a
+single scratch buffer. The derivatives are series as well.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+# ("sin", 2) for sin(2 u), ("cos", 0) for 1
+Harmonic = Tuple[str, int]
+
+_3D = 3
+_ONE: Harmonic = ("cos", 0)
+_AXES = "xyz"
+_SIGN = re.compile(r"\s*([+-])\s*")
+_TERM = re.compile(r"(\d+(?:\.\d*)?)?\s*((?:(?:sin|cos)\(\d*[xyz]\)\s*)*)")
+_FACTOR = re.compile(r"(sin|cos)\((\d*)([xyz])\)")
+
+
+class Term(NamedTuple):
+    """Coefficient and harmonics along x, y and z of a term of a series."""
+
+    coefficient: float
+    harmonics: tuple[Harmonic, Harmonic, Harmonic]
+
+
+@dataclass(frozen=True)
+class TrigSeries:
+    """Sum of products of 1D harmonics, callable as a surface function."""
+
+    terms: tuple[Term, ...]
+
+    @classmethod
+    def parse(cls, text: str) -> TrigSeries:
+        """Series of a sum such as ``"2 cos(x) cos(y) - sin(2z) + 0.5"``.
+
+        The terms with the same harmonics are merged.
+        """
+        tokens = _SIGN.split(text.strip())
+        # a leading sign splits off an empty token
+        tokens = tokens[1:] if not tokens[0] else ["+", *tokens]
+
+        coefficients: dict[tuple[Harmonic, Harmonic, Harmonic], float] = {}
+        for sign, term in zip(tokens[::2], tokens[1::2]):
+            harmonics, coefficient = _parse_term(term)
+            if sign == "-":
+                coefficient = -coefficient
+            coefficients[harmonics] = coefficients.get(harmonics, 0) + coefficient
+        return cls(
+            tuple(
+                Term(coefficient, harmonics)
+                for harmonics, coefficient in coefficients.items()
+                if coefficient != 0
+            ),
+        )
+
+    def __call__(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Evaluate the series on broadcastable coordinate arrays."""
+        coordinates = [np.asarray(coordinate) for coordinate in (x, y, z)]
+        coordinates = [
+            coordinate if coordinate.dtype.kind == "f" else coordinate.astype(float)
+            for coordinate in coordinates
+        ]
+        values = [
+            {harmonic: _harmonic_values(harmonic, coordinate) for harmonic in harmonics}
+            for harmonics, coordinate in zip(self._axis_harmonics, coordinates)
+        ]
+        field = np.empty(
+            np.broadcast_shapes(*(coordinate.shape for coordinate in coordinates)),
+            dtype=np.result_type(*coordinates),
+        )
+
+        # the products touching the whole field are accumulated in place
+        axis, groups, planes = self._plan
+        planes = [_sum_terms(terms, values) for terms in planes]
+        filled = False
+        scratch = None
+        for harmonic, terms in groups:
+            plane = _sum_terms(terms, values)
+            if not filled:
+                np.multiply(plane, values[axis][harmonic], out=field)
+                filled = True
+                continue
+            if scratch is None:
+                scratch = np.empty_like(field)
+            np.multiply(plane, values[axis][harmonic], out=scratch)
+            np.add(field, scratch, out=field)
+        if not filled:
+            if len(planes) > 1:
+                np.add(planes[0], planes[1], out=field)
+                planes = planes[2:]
+            else:
+                field[...] = planes[0] if planes else 0
+                planes = []
+        for plane in planes:
+            np.add(field, plane, out=field)
+        return field[()]
+
+    def derivative(self, axis: int) -> TrigSeries:
+        """Series of the partial derivative along an axis."""
+        terms = []
+        for coefficient, harmonics in self.terms:
+            kind, frequency = harmonics[axis]
+            if frequency == 0:
+                continue
+            if kind == "sin":
+                derivative, factor = ("cos", frequency), frequency
+            else:
+                derivative, factor = ("sin", frequency), -frequency
+            terms.append(
+                Term(
+                    coefficient * factor,
+                    (*harmonics[:axis], derivative, *harmonics[axis + 1 :]),
+                ),
+            )
+        return TrigSeries(tuple(terms))
+
+    def gradient(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        z: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Evaluate the analytic gradient on broadcastable coordinate arrays."""
+        return tuple(derivative(x, y, z) for derivative in self._gradient)
+
+    @cached_property
+    def _gradient(self) -> tuple[TrigSeries, TrigSeries, TrigSeries]:
+        return tuple(self.derivative(axis) for axis in range(_3D))
+
+    @cached_property
+    def _axis_harmonics(self) -> list[set[Harmonic]]:
+        """Distinct harmonics of each axis, except the constant one."""
+        return [
+            {term.harmonics[axis] for term in self.terms} - {_ONE}
+            for axis in range(_3D)
+        ]
+
+    @cached_property
+    def _plan(self) -> tuple[int, list[tuple[Harmonic, list[Term]]], list[list[Term]]]:
+        """Order of evaluation of the terms minimizing the passes on the field.
+
+        The terms varying along the three axes are grouped by their harmonic
+        along the axis having the fewest of them, each group being a sum over
+        the other two axes times this harmonic. The other terms are summed on
+        planes spanning at most two axes, added to the field in one pass each.
+        """
+        cube_terms = [term for term in self.terms if _ONE not in term.harmonics]
+        axis = min(
+            range(_3D),
+            key=lambda axis: len({term.harmonics[axis] for term in cube_terms}),
+        )
+        groups: dict[Harmonic, list[Term]] = {}
+        for coefficient, harmonics in cube_terms:
+            groups.setdefault(harmonics[axis], []).append(
+                Term(coefficient, (*harmonics[:axis], _ONE, *harmonics[axis + 1 :])),
+            )
+
+        planes: dict[frozenset[int], list[Term]] = {}
+        other_terms = sorted(
+            (term for term in self.terms if _ONE in term.harmonics),
+            key=lambda term: term.harmonics.count(_ONE),
+        )
+        for term in other_terms:
+            axes = frozenset(
+                index
+                for index, harmonic in enumerate(term.harmonics)
+                if harmonic != _ONE
+            )
+            # merge the term into a plane spanning its axes, or extend one
+            plane = next((plane for plane in planes if axes <= plane), None)
+            if plane is None:
+                plane = next(
+                    (plane for plane in planes if len(plane | axes) < _3D),
+                    axes,
+                )
+                planes[plane | axes] = planes.pop(plane, [])
+                plane = plane | axes
+            planes[plane].append(term)
+        return axis, list(groups.items()), list(planes.values())
+
+
+def _parse_term(term: str) -> tuple[tuple[Harmonic, Harmonic, Harmonic], float]:
+    match = _TERM.fullmatch(term)
+    if match is None or not term:
+        err_msg = f"invalid term {term!r}"
+        raise ValueError(err_msg)
+    number, factors = match.groups()
+    if number is None and not factors:
+        err_msg = f"invalid term {term!r}"
+        raise ValueError(err_msg)
+
+    harmonics = [_ONE] * _3D
+    for kind, frequency, axis in _FACTOR.findall(factors):
+        index = _AXES.index(axis)
+        if harmonics[index] != _ONE:
+            err_msg = f"several factors along {axis} in {term!r}"
+            raise ValueError(err_msg)
+        harmonics[index] = (kind, int(frequency or 1))
+        if harmonics[index] == ("sin", 0):
+            err_msg = f"null factor in {term!r}"
+            raise ValueError(err_msg)
+    return tuple(harmonics), float(number or 1)
+
+
+def _sum_terms(
+    terms: list[Term],
+    values: list[dict[Harmonic, np.ndarray]],
+) -> float | np.ndarray:
+    """Sum of terms spanning at most two axes, on their broadcast shape."""
+    total = 0
+    for coefficient, harmonics in terms:
+        product = coefficient
+        for axis_values, harmonic in zip(values, harmonics):
+            if harmonic != _ONE:
+                product = _scaled(axis_values[harmonic], product)
+        total = total + product
+    return total
+
+
+def _harmonic_values(harmonic: Harmonic, coordinate: np.ndarray) -> np.ndarray:
+    kind, frequency = harmonic
+    function = np.sin if kind == "sin" else np.cos
+    return function(coordinate if frequency == 1 else frequency * coordinate)
+
+
+def _scaled(
+    values: np.ndarray | None,
+    factor: float | np.ndarray,
+) -> float | np.ndarray:
+    """Product of harmonic values and a factor, None standing for 1."""
+    if values is None:
+        return factor
+    if isinstance(factor, float) and factor == 1:
+        return values
+    return factor * values
@@ -1,263 +1,257 @@
-"""Definition of the different TPMS surfaces."""
+"""Definition of the different TPMS surfaces.
+
+Each surface is a trigonometric series, see ``TrigSeries``. The functions
+evaluate the series of ``SERIES`` on broadcastable coordinate arrays.
+"""
+
+from __future__ import annotations
 
 import numpy as np
-from numpy import cos, pi, sin
+
+from blender_tpms.tpms.series import TrigSeries
+
+SERIES: dict[str, TrigSeries] = {
+    "gyroid": TrigSeries.parse("sin(x) cos(y) + sin(y) cos(z) + sin(z) cos(x)"),
+    "schwarzP": TrigSeries.parse("cos(x) + cos(y) + cos(z)"),
+    "schwarzD": TrigSeries.parse(
+        "sin(x) sin(y) sin(z) + sin(x) cos(y) cos(z) + cos(x) sin(y) cos(z) "
+        "+ cos(x) cos(y) sin(z)",
+    ),
+    "neovius": TrigSeries.parse("3 cos(x) + cos(y) + cos(z) + 4 cos(x) cos(y) cos(z)"),
+    "schoenIWP": TrigSeries.parse(
+        "2 cos(x) cos(y) + 2 cos(y) cos(z) + 2 cos(z) cos(x) - cos(2x) - cos(2y) "
+        "- cos(2z)",
+    ),
+    "schoenFRD": TrigSeries.parse(
+        "4 cos(x) cos(y) cos(z) - cos(2x) cos(2y) - cos(2y) cos(2z) - cos(2z) cos(2x)",
+    ),
+    "fischerKochS": TrigSeries.parse(
+        "cos(2x) sin(y) cos(z) + cos(x) cos(2y) sin(z) + sin(x) cos(y) cos(2z)",
+    ),
+    "pmy": TrigSeries.parse(
+        "2 cos(x) cos(y) cos(z) + sin(2x) sin(y) + sin(x) sin(2z) + sin(2y) sin(z)",
+    ),
+    "honeycomb": TrigSeries.parse("-sin(x) sin(y) + cos(y) + cos(z)"),
+    "lidinoid": TrigSeries.parse(
+        "0.5 sin(2x) cos(y) sin(z) + 0.5 sin(2y) cos(z) sin(x) "
+        "+ 0.5 sin(2z) cos(x) sin(y) - 0.5 cos(2x) cos(2y) - 0.5 cos(2y) cos(2z) "
+        "- 0.5 cos(2z) cos(2x) + 0.3",
+    ),
+    "split_p": TrigSeries.parse(
+        "1.1 sin(2x) cos(y) sin(z) + 1.1 sin(2y) cos(z) sin(x) "
+        "+ 1.1 sin(2z) cos(x) sin(y) - 0.2 cos(2x) cos(2y) - 0.2 cos(2y) cos(2z) "
+        "- 0.2 cos(2z) cos(2x) - 0.4 cos(2x) - 0.4 cos(2y) - 0.4 cos(2z)",
+    ),
+    "honeycomb_gyroid": TrigSeries.parse("sin(x) cos(y) + sin(y) + cos(x)"),
+    "honeycomb_primitive": TrigSeries.parse("cos(x) + cos(y)"),
+    "honeycomb_diamond": TrigSeries.parse(
+        "cos(x) cos(y) + sin(x) sin(y) + sin(x) cos(y) + cos(x) sin(y)",
+    ),
+    "honeycomb_I": TrigSeries.parse("cos(x) cos(y) + cos(y) + cos(x)"),
+    "honeycomb_L": TrigSeries.parse(
+        "1.1 sin(2x) cos(y) + 1.1 sin(2y) sin(x) + 1.1 cos(x) sin(y) "
+        "- cos(2x) cos(2y) - cos(2y) - cos(2x)",
+    ),
+    "SC": TrigSeries.parse(
+        "2 cos(x) + 2 cos(y) + 2 cos(z) "
+        "+ cos(x) cos(y) + cos(y) cos(z) + cos(z) cos(x)",
+    ),
+    "I": TrigSeries.parse("cos(x) cos(y) + cos(y) cos(z) + cos(z) cos(x)"),
+    "P": TrigSeries.parse("sin(x) + sin(y) + sin(z)"),
+    "P_W": TrigSeries.parse(
+        "4 cos(x) cos(y) + 4 cos(y) cos(z) + 4 cos(z) cos(x) - 3 cos(x) cos(y) cos(z)",
+    ),
+    "double_gyroid": TrigSeries.parse(
+        "2.75 sin(2x) sin(z) cos(y) + 2.75 sin(2y) sin(x) cos(z) "
+        "+ 2.75 sin(2z) sin(y) cos(x) - cos(2x) cos(2y) - cos(2y) cos(2z) "
+        "- cos(2z) cos(2x)",
+    ),
+    "Gprime": TrigSeries.parse(
+        "5 sin(2x) sin(z) cos(y) + 5 sin(2y) sin(x) cos(z) + 5 sin(2z) sin(y) cos(x) "
+        "+ cos(2x) cos(2y) + cos(2y) cos(2z) + cos(2z) cos(2x)",
+    ),
+    "double_diamond": TrigSeries.parse(
+        "sin(2x) sin(2y) + sin(2y) sin(2z) + sin(2x) sin(2z) + cos(2x) cos(2y) cos(2z)",
+    ),
+    "Dprime": TrigSeries.parse(
+        "sin(x) sin(y) sin(z) + cos(x) cos(y) cos(z) - cos(2x) cos(2y) "
+        "- cos(2y) cos(2z) - cos(2z) cos(2x) - 0.4",
+    ),
+    "doubleP": TrigSeries.parse(
+        "0.5 cos(x) cos(y) + 0.5 cos(y) cos(z) + 0.5 cos(z) cos(x) + 0.2 cos(2x) "
+        "+ 0.2 cos(2y) + 0.2 cos(2z)",
+    ),
+    "OCTO": TrigSeries.parse(
+        "4 cos(x) cos(y) + 4 cos(y) cos(z) + 4 cos(z) cos(x) "
+        "- 2.8 cos(x) cos(y) cos(z) + cos(x) + cos(y) + cos(z) + 1.5",
+    ),
+    "PN": TrigSeries.parse(
+        "0.6 cos(x) cos(y) cos(z) + 0.4 cos(x) + 0.4 cos(y) + 0.4 cos(z) "
+        "+ 0.2 cos(2x) cos(2y) cos(2z) + 0.2 cos(2x) + 0.2 cos(2y) + 0.2 cos(2z) "
+        "+ 0.1 cos(3x) + 0.1 cos(3y) + 0.1 cos(3z) + 0.2 cos(x) cos(y) "
+        "+ 0.2 cos(y) cos(z) + 0.2 cos(z) cos(x)",
+    ),
+    "KP": TrigSeries.parse(
+        "0.6 cos(x) + 0.6 cos(y) + 0.6 cos(z) + 0.7 cos(x) cos(y) + 0.7 cos(y) cos(z) "
+        "+ 0.7 cos(z) cos(x) - 0.9 cos(2x) cos(2y) cos(2z) + 0.4",
+    ),
+    "FRD": TrigSeries.parse(
+        "8 cos(x) cos(y) cos(z) + cos(2x) cos(2y) cos(2z) - cos(2x) cos(2y) "
+        "+ cos(2y) cos(2z) + cos(2z) cos(2x)",
+    ),
+    "splitP": TrigSeries.parse(
+        "1.1 sin(2x) sin(z) cos(y) + 1.1 sin(2y) sin(x) cos(z) "
+        "+ 1.1 sin(2z) sin(y) cos(x) - 0.2 cos(2x) cos(2y) - 0.2 cos(2y) cos(2z) "
+        "- 0.2 cos(2z) cos(2x) - 0.4 cos(x) - 0.4 cos(y) - 0.4 cos(z)",
+    ),
+}
 
 
 def gyroid(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Gyroid surface."""
-    return sin(x) * cos(y) + sin(y) * cos(z) + sin(z) * cos(x)
+    return SERIES["gyroid"](x, y, z)
 
 
 def schwarzP(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Primitive Schwarz surface."""
-    return cos(x) + cos(y) + cos(z)
+    return SERIES["schwarzP"](x, y, z)
 
 
 def schwarzD(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Diamond Schwarz surface."""
-    a = sin(x) * sin(y) * sin(z)
-    b = sin(x) * cos(y) * cos(z)
-    c = cos(x) * sin(y) * cos(z)
-    d = cos(x) * cos(y) * sin(z)
-    return a + b + c + d
+    return SERIES["schwarzD"](x, y, z)
 
 
 def neovius(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Neovius surface."""
-    a = 3 * cos(x) + cos(y) + cos(z)
-    b = 4 * cos(x) * cos(y) * cos(z)
-
-    return a + b
+    return SERIES["neovius"](x, y, z)
 
 
 def schoenIWP(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Schoen's IWP surface."""
-    a = 2 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x))
-    b = cos(2 * x) + cos(2 * y) + cos(2 * z)
-
-    return a - b
+    return SERIES["schoenIWP"](x, y, z)
 
 
 def schoenFRD(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Schoen's FRD surface."""
-    a = 4 * cos(x) * cos(y) * cos(z)
-    b = cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x)
-    return a - b
+    return SERIES["schoenFRD"](x, y, z)
 
 
 def fischerKochS(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Fischer-Koch surface."""
-    a = cos(2 * x) * sin(y) * cos(z)
-    b = cos(x) * cos(2 * y) * sin(z)
-    c = sin(x) * cos(y) * cos(2 * z)
-
-    return a + b + c
+    return SERIES["fischerKochS"](x, y, z)
 
 
 def pmy(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Primitive My surface."""
-    a = 2 * cos(x) * cos(y) * cos(z)
-    b = sin(2 * x) * sin(y)
-    c = sin(x) * sin(2 * z)
-    d = sin(2 * y) * sin(z)
-
-    return a + b + c + d
+    return SERIES["pmy"](x, y, z)
 
 
 def honeycomb(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Honeycomb surface."""
-    return sin(x) * cos(y + pi / 2.0) + sin(y + pi / 2.0) + cos(z)
+    return SERIES["honeycomb"](x, y, z)
 
 
 def lidinoid(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Lidinoid surface."""
-    return (
-        0.5
-        * (
-            sin(2 * x) * cos(y) * sin(z)
-            + sin(2 * y) * cos(z) * sin(x)
-            + sin(2 * z) * cos(x) * sin(y)
-        )
-        - 0.5
-        * (cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x))
-        + 0.3
-    )
+    return SERIES["lidinoid"](x, y, z)
 
 
 def split_p(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Split P surface."""
-    return (
-        1.1
-        * (
-            sin(2 * x) * cos(y) * sin(z)
-            + sin(2 * y) * cos(z) * sin(x)
-            + sin(2 * z) * cos(x) * sin(y)
-        )
-        - 0.2
-        * (cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x))
-        - 0.4 * (cos(2 * x) + cos(2 * y) + cos(2 * z))
-    )
+    return SERIES["split_p"](x, y, z)
 
 
 def honeycomb_gyroid(x: np.ndarray, y: np.ndarray, _: np.ndarray) -> np.ndarray:
     """Honeycomb gyroid surface."""
-    return sin(x) * cos(y) + sin(y) + cos(x)
+    return SERIES["honeycomb_gyroid"](x, y, _)
 
 
 def honeycomb_primitive(x: np.ndarray, y: np.ndarray, _: np.ndarray) -> np.ndarray:
     """Honeycomb primitive surface."""
-    return cos(x) + cos(y)
+    return SERIES["honeycomb_primitive"](x, y, _)
 
 
 def honeycomb_diamond(x: np.ndarray, y: np.ndarray, _: np.ndarray) -> np.ndarray:
     """Honeycomb diamond surface."""
-    return cos(x) * cos(y) + sin(x) * sin(y) + sin(x) * cos(y) + cos(x) * sin(y)
+    return SERIES["honeycomb_diamond"](x, y, _)
 
 
 def honeycomb_I(x: np.ndarray, y: np.ndarray, _: np.ndarray) -> np.ndarray:
     """Honeycomb I surface."""
-    return cos(x) * cos(y) + cos(y) + cos(x)
+    return SERIES["honeycomb_I"](x, y, _)
 
 
 def honeycomb_L(x: np.ndarray, y: np.ndarray, _: np.ndarray) -> np.ndarray:
     """Honeycomb L surface."""
-    return 1.1 * (sin(2 * x) * cos(y) + sin(2 * y) * sin(x) + cos(x) * sin(y)) - (
-        cos(2 * x) * cos(2 * y) + cos(2 * y) + cos(2 * x)
-    )
+    return SERIES["honeycomb_L"](x, y, _)
 
 
 def SC(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Schwarz's surface."""
-    return (
-        2 * (cos(x) + cos(y) + cos(z))
-        + cos(x) * cos(y)
-        + cos(y) * cos(z)
-        + cos(z) * cos(x)
-    )
+    return SERIES["SC"](x, y, z)
 
 
 def I(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """I surface."""
-    return cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x)
+    return SERIES["I"](x, y, z)
 
 
 def P(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """P surface."""
-    return sin(x) + sin(y) + sin(z)
+    return SERIES["P"](x, y, z)
 
 
 def P_W(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """P_W surface."""
-    a = 4 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x))
-    b = 3 * cos(x) * cos(y) * cos(z)
-    return a - b
+    return SERIES["P_W"](x, y, z)
 
 
 def double_gyroid(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Double gyroid surface."""
-    return 2.75 * (
-        sin(2 * x) * sin(z) * cos(y)
-        + sin(2 * y) * sin(x) * cos(z)
-        + sin(2 * z) * sin(y) * cos(x)
-    ) - (cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x))
+    return SERIES["double_gyroid"](x, y, z)
 
 
 def Gprime(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """G' surface."""
-    return (
-        5
-        * (
-            sin(2 * x) * sin(z) * cos(y)
-            + sin(2 * y) * sin(x) * cos(z)
-            + sin(2 * z) * sin(y) * cos(x)
-        )
-        + cos(2 * x) * cos(2 * y)
-        + cos(2 * y) * cos(2 * z)
-        + cos(2 * z) * cos(2 * x)
-    )
+    return SERIES["Gprime"](x, y, z)
 
 
 def double_diamond(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Double diamond surface."""
-    return (
-        sin(2 * x) * sin(2 * y)
-        + sin(2 * y) * sin(2 * z)
-        + sin(2 * x) * sin(2 * z)
-        + cos(2 * x) * cos(2 * y) * cos(2 * z)
-    )
+    return SERIES["double_diamond"](x, y, z)
 
 
 def Dprime(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """D' surface."""
-    return (
-        sin(x) * sin(y) * sin(z)
-        + cos(x) * cos(y) * cos(z)
-        - (cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x))
-        - 0.4
-    )
+    return SERIES["Dprime"](x, y, z)
 
 
 def doubleP(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Double P surface."""
-    return 0.5 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x)) + 0.2 * (
-        cos(2 * x) + cos(2 * y) + cos(2 * z)
-    )
+    return SERIES["doubleP"](x, y, z)
 
 
 def OCTO(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Octo surface."""
-    return (
-        4 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x))
-        - 2.8 * cos(x) * cos(y) * cos(z)
-        + (cos(x) + cos(y) + cos(z))
-        + 1.5
-    )
+    return SERIES["OCTO"](x, y, z)
 
 
 def PN(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """PN surface."""
-    return (
-        0.6 * (cos(x) * cos(y) * cos(z))
-        + 0.4 * (cos(x) + cos(y) + cos(z))
-        + 0.2 * (cos(2 * x) * cos(2 * y) * cos(2 * z))
-        + 0.2 * (cos(2 * x) + cos(2 * y) + cos(2 * z))
-        + 0.1 * (cos(3 * x) + cos(3 * y) + cos(3 * z))
-        + 0.2 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x))
-    )
+    return SERIES["PN"](x, y, z)
 
 
 def KP(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """KP surface."""
-    return (
-        0.6 * (cos(x) + cos(y) + cos(z))
-        + 0.7 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x))
-        - 0.9 * (cos(2 * x) * cos(2 * y) * cos(2 * z))
-        + 0.4
-    )
+    return SERIES["KP"](x, y, z)
 
 
 def FRD(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """FRD surface."""
-    return (
-        8 * cos(x) * cos(y) * cos(z)
-        + cos(2 * x) * cos(2 * y) * cos(2 * z)
-        - cos(2 * x) * cos(2 * y)
-        + cos(2 * y) * cos(2 * z)
-        + cos(2 * z) * cos(2 * x)
-    )
+    return SERIES["FRD"](x, y, z)
 
 
 def splitP(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
     """Split P surface."""
-    return (
-        1.1
-        * (
-            sin(2 * x) * sin(z) * cos(y)
-            + sin(2 * y) * sin(x) * cos(z)
-            + sin(2 * z) * sin(y) * cos(x)
-        )
-        - 0.2
-        * (cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x))
-        - 0.4 * (cos(x) + cos(y) + cos(z))
-    )
+    return SERIES["splitP"](x, y, z)
@@ -0,0 +1,111 @@
+"""Point symmetries of the TPMS surfaces.
+
+A symmetry operation ``("z,x,y", 1)`` states that ``f(z, x, y) = f(x, y, z)``
+and ``("-x,-y,-z", -1)`` that ``f(-x, -y, -z) = -f(x, y, z)``. Only signed
+permutations of the coordinates fixing the origin are considered, they map a
+grid centered on the origin onto itself.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Sequence, Tuple
+
+import numpy as np
+
+Symmetry = Tuple[str, int]
+# permutation of the coordinates, sign of each coordinate, sign of the field
+Operation = Tuple[Tuple[int, int, int], Tuple[int, int, int], int]
+
+_CUBIC = (("-x,y,z", 1), ("x,-y,z", 1), ("x,y,-z", 1), ("y,x,z", 1), ("z,y,x", 1))
+_GYROID = (("-x,-y,-z", -1), ("z,x,y", 1))
+_CENTROSYMMETRIC_CYCLIC = (("-x,-y,-z", 1), ("z,x,y", 1))
+_TETRAGONAL = (("x,y,-z", 1), ("-x,y,z", 1), ("x,-y,z", 1), ("y,x,z", 1))
+
+# generators of the symmetry group of each surface
+SYMMETRIES: dict[str, tuple[Symmetry, ...]] = {
+    "gyroid": _GYROID,
+    "schwarzP": _CUBIC,
+    "schwarzD": (("-x,-y,-z", -1), ("x,z,y", 1), ("z,y,x", 1)),
+    "neovius": (("x,y,-z", 1), ("-x,y,z", 1), ("x,-y,z", 1), ("x,z,y", 1)),
+    "schoenIWP": _CUBIC,
+    "schoenFRD": _CUBIC,
+    "fischerKochS": _GYROID,
+    "pmy": _CENTROSYMMETRIC_CYCLIC,
+    "honeycomb": (("x,y,-z", 1), ("-x,-y,z", 1)),
+    "lidinoid": _CENTROSYMMETRIC_CYCLIC,
+    "split_p": _CENTROSYMMETRIC_CYCLIC,
+    "honeycomb_gyroid": (("x,y,-z", 1),),
+    "honeycomb_primitive": _TETRAGONAL,
+    "honeycomb_diamond": (("x,y,-z", 1), ("y,x,z", 1)),
+    "honeycomb_I": _TETRAGONAL,
+    "honeycomb_L": (("x,y,-z", 1),),
+    "SC": _CUBIC,
+    "I": _CUBIC,
+    "P": (("-x,-y,-z", -1), ("x,z,y", 1), ("z,y,x", 1)),
+    "P_W": _CUBIC,
+    "double_gyroid": _CENTROSYMMETRIC_CYCLIC,
+    "Gprime": _CENTROSYMMETRIC_CYCLIC,
+    "double_diamond": (("-x,-y,-z", 1), ("x,z,y", 1), ("z,y,x", 1)),
+    "Dprime": (("-x,-y,z", 1), ("x,-y,-z", 1), ("y,x,z", 1), ("z,y,x", 1)),
+    "doubleP": _CUBIC,
+    "OCTO": _CUBIC,
+    "PN": _CUBIC,
+    "KP": _CUBIC,
+    "FRD": (("x,y,-z", 1), ("-x,y,z", 1), ("x,-y,z", 1), ("y,x,z", 1)),
+    "splitP": _CENTROSYMMETRIC_CYCLIC,
+}
+
+_IDENTITY: Operation = ((0, 1, 2), (1, 1, 1), 1)
+
+
+def parse_symmetry(symmetry: Symmetry) -> Operation:
+    """Convert a symmetry such as ``("-y,x,z", 1)`` to an operation."""
+    coordinates, field_sign = symmetry
+    permutation = []
+    signs = []
+    for coordinate in coordinates.split(","):
+        coordinate = coordinate.strip()  # noqa: PLW2901
+        signs.append(-1 if coordinate.startswith("-") else 1)
+        permutation.append("xyz".index(coordinate.lstrip("-")))
+    if sorted(permutation) != [0, 1, 2] or field_sign not in (-1, 1):
+        err_msg = f"invalid symmetry {symmetry}"
+        raise ValueError(err_msg)
+    return tuple(permutation), tuple(signs), field_sign
+
+
+def compose(first: Operation, second: Operation) -> Operation:
+    """Operation applying ``second`` and then ``first``."""
+    permutation_1, signs_1, field_sign_1 = first
+    permutation_2, signs_2, field_sign_2 = second
+    return (
+        tuple(permutation_2[axis] for axis in permutation_1),
+        tuple(sign * signs_2[axis] for sign, axis in zip(signs_1, permutation_1)),
+        field_sign_1 * field_sign_2,
+    )
+
+
+def symmetry_group(function: Callable | str) -> list[Operation]:
+    """All the symmetry operations of a surface, including the identity."""
+    name = function if isinstance(function, str) else function.__name__
+    generators = [parse_symmetry(symmetry) for symmetry in SYMMETRIES.get(name, ())]
+
+    group = [_IDENTITY]
+    for operation in group:
+        for generator in generators:
+            composed = compose(operation, generator)
+            if composed not in group:
+                group.append(composed)
+    return group
+
+
+def maps_grid(operation: Operation, axes: Sequence[np.ndarray]) -> bool:
+    """Check that the operation maps the grid spanned by the axes onto itself."""
+    permutation, signs, _ = operation
+    for axis, sign, source in zip(axes, signs, permutation):
+        image = axes[source] if sign > 0 else -axes[source][::-1]
+        if len(image) != len(axis):
+            return False
+        tolerance = 64 * np.finfo(axis.dtype).eps * np.max(np.abs(axis), initial=1.0)
+        if not np.allclose(image, axis, rtol=0, atol=tolerance):
+            return False
+    return True
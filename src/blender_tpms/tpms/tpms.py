@@ -2,21 +2,104 @@
 
 from __future__ import annotations
 
+import copy
 import itertools
-from typing import Callable, Sequence
+import multiprocessing
+import sys
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, suppress
+from multiprocessing import shared_memory
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import numpy as np
 import pyvista as pv
 
-from blender_tpms.tpms import surfaces
+from blender_tpms.tpms.cache import GeometryCache, geometry_key
+from blender_tpms.tpms.contour import contour_part, isosurface
+from blender_tpms.tpms.density import (
+    estimate_part_density,
+    offset_for_density,
+    offset_table,
+)
+from blender_tpms.tpms.expression import (
+    Expression,
+    compile_expression,
+    surface_function,
+)
+from blender_tpms.tpms.field import EVALUATIONS, evaluate
+from blender_tpms.tpms.profiling import Profiler, nbytes, stage
+from blender_tpms.tpms.writers import write_chunks
+
+if TYPE_CHECKING:
+    from pathlib import Path  # pragma: no cover
 
 Field = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+Grading = Union[float, np.ndarray, Field, str, None]
+T = TypeVar("T")
+# name, dtype, shape and offset of an array in a shared memory block
+Layout = Tuple[str, str, Tuple[int, ...], int]
 
 _3D = 3
+_DEFAULT_SLAB_SIZE = 16
+_INDEX_TOLERANCE = 1e-6
+# points per cell needed to sample both faces of a cell
+_MIN_PROXY_RESOLUTION = 2
+_EXTRACTIONS = ("clip", "contour")
+# processes started from blender must not inherit its state
+_CONTEXT = multiprocessing.get_context("spawn")
+# a named block outlives the handles of the process creating it on POSIX only,
+# on Windows the arrays are pickled to the reading process instead
+_SHARED_MEMORY = sys.platform != "win32"
 
 
 class Tpms:
-    """Triply periodic minimal surface geometry."""
+    """Triply periodic minimal surface geometry.
+
+    Derived geometry (grid, field, offset surfaces, extracted parts and
+    relative density) is computed lazily and cached. Assigning one of the
+    attributes listed in ``_dependencies`` only drops the artifacts depending
+    on it, e.g. changing ``offset`` keeps the evaluated field. Arrays modified
+    in place are not tracked.
+    """
+
+    # Direct dependencies of each cached artifact, on attributes or on other
+    # artifacts. Artifacts must be listed after the ones they depend on.
+    _dependencies: ClassVar[dict[str, tuple[str, ...]]] = {
+        "grid": ("cell_size", "repeat_cell", "resolution", "dtype"),
+        "field": ("grid", "surface_function", "swap", "phase_shift", "evaluation"),
+        "offset": ("field", "offset"),
+        "surface": ("field", "tiling", "slab_size", "workers", "extraction"),
+        "sheet": ("offset", "tiling", "slab_size", "workers", "extraction"),
+        "lower_skeletal": ("offset", "tiling", "slab_size", "workers", "extraction"),
+        "upper_skeletal": ("offset", "tiling", "slab_size", "workers", "extraction"),
+        "skeletals": ("lower_skeletal", "upper_skeletal"),
+        "relative_density": (
+            "part",
+            "sheet",
+            "lower_skeletal",
+            "upper_skeletal",
+            "skeletals",
+            "surface",
+        ),
+        "relative_density_estimate": ("part", "offset"),
+    }
+    _tileable: ClassVar[bool] = True
+    # order of the axes of the grid points, the first one varying the fastest
+    _point_order: ClassVar[str] = "XYZ"
 
     def __init__(
         self,
@@ -28,32 +111,130 @@ class Tpms:
         resolution: int = 20,
         offset: float | Field = 0.0,
         phase_shift: float | Sequence[float] | np.ndarray = (0.0, 0.0, 0.0),
+        *,
+        evaluation: str = "separable",
+        extraction: str = "clip",
+        tiling: bool = False,
+        dtype: str | type | np.dtype = "float64",
+        slab_size: int | None = None,
+        workers: int | None = None,
+        geometry_cache: GeometryCache | None = None,
+        profiler: Profiler | None = None,
     ) -> None:
-        """Create a TPMS geometry."""
+        """Create a TPMS geometry.
+
+        ``surface`` is the name of a function of ``surfaces`` or an expression
+        of ``x``, ``y`` and ``z`` such as ``"cos(x) + cos(y) + 0.5 * cos(z)"``,
+        see ``compile_expression``.
+
+        ``extraction`` selects how the boundary of the volume parts is built:
+        ``"clip"`` clips the grid to the volume of the part and extracts its
+        boundary, ``"contour"`` assembles the offset isosurfaces and the
+        regions of the grid sides inside the part, without the volume mesh.
+
+        With ``tiling``, the parts are extracted from a single periodic cell
+        which is then replicated over ``repeat_cell`` and welded, instead of
+        clipping the whole lattice. Each cell is then sampled with
+        ``resolution`` points including both of its faces.
+
+        ``dtype`` sets the floating point precision of the grid coordinates,
+        of the field and of the extracted meshes. ``float32`` halves the memory
+        used by the grid and the meshes, the relative density then matches the
+        ``float64`` one within a relative tolerance of ``1e-5``.
+
+        With ``slab_size``, the parts are extracted by slabs of ``slab_size``
+        cell layers along the third axis (see ``iter_chunks``), so that the
+        peak memory depends on the slab size rather than on the lattice size.
+        ``workers`` extracts the slabs in parallel with as many processes, the
+        lattice being split in one slab per process unless ``slab_size`` is
+        given. A callable offset must then be picklable.
+
+        With a ``geometry_cache``, the extracted parts are looked up in the
+        cache under a hash of the attributes they depend on before being
+        computed, and stored in it otherwise. Parts with a callable offset
+        are not cached.
+
+        The ``"narrow_band"`` evaluation bounds the surfaces typed in as
+        expressions on blocks of the grid and only evaluates the blocks which
+        may hold the offset surfaces, see ``evaluate_narrow_band``. The parts
+        and the relative density are unchanged, the field values away from the
+        surfaces are replaced with bounds. The field is evaluated again when
+        the offset grows.
+
+        With a ``profiler``, the computation of each artifact is recorded as a
+        stage, along with the extraction steps nested in it.
+        """
         if swap not in map("".join, itertools.permutations("XYZ")):
             err_msg = "swap must be a permutation of 'XYZ'"
             raise ValueError(err_msg)
+        if evaluation not in EVALUATIONS:
+            err_msg = f"evaluation must be one of {list(EVALUATIONS)}"
+            raise ValueError(err_msg)
+        if extraction not in _EXTRACTIONS:
+            err_msg = f"extraction must be one of {list(_EXTRACTIONS)}"
+            raise ValueError(err_msg)
+        if np.dtype(dtype) not in (np.float32, np.float64):
+            err_msg = "dtype must be float32 or float64"
+            raise ValueError(err_msg)
 
         self._init_cell_parameters(cell_size, repeat_cell)
 
         self.part = part
-        self.surface_function = getattr(surfaces, surface)
+        self.surface_function = surface_function(surface)
         self.swap = swap
 
         self.resolution = resolution
         self.offset = offset
         self.phase_shift = np.array(phase_shift)
+        self.evaluation = evaluation
+        self.extraction = extraction
+        self.tiling = tiling
+        self.dtype = np.dtype(dtype)
+        self.slab_size = slab_size
+        self.workers = workers
+        self.geometry_cache = geometry_cache
+        self.profiler = profiler
 
-        self.grid: pv.StructuredGrid
-        self._vtk_mesh = None
-        self._relative_density = None
-        self._sheet = None
-        self._lower_skeletal = None
-        self._upper_skeletal = None
-        self._surface = None
-        self._skeletals = None
+    def __setattr__(self, name: str, value: Any) -> None:  # noqa: ANN401
+        """Set an attribute and drop the cached artifacts depending on it."""
+        super().__setattr__(name, value)
+        self._invalidate(name)
 
-        self._compute_tpms_field()
+    def _invalidate(self, name: str) -> None:
+        """Drop every cached artifact that depends on ``name``."""
+        cache = self.__dict__.get("_cache")
+        if not cache:
+            return
+        stale = {name}
+        for artifact, dependencies in self._dependencies.items():
+            if stale.intersection(dependencies):
+                stale.add(artifact)
+                cache.pop(artifact, None)
+
+    def _cached(self, artifact: str, compute: Callable[[], T]) -> T:
+        """Return the cached ``artifact``, computing it on a miss."""
+        cache = self.__dict__.setdefault("_cache", {})
+        if artifact in cache:
+            self.cache_hits[artifact] += 1
+            return cache[artifact]
+        self.cache_misses[artifact] += 1
+        if self.profiler is None:
+            cache[artifact] = compute()
+        else:
+            with self.profiler.stage(artifact) as record:
+                cache[artifact] = compute()
+                record.nbytes = nbytes(cache[artifact])
+        return cache[artifact]
+
+    @property
+    def cache_hits(self) -> Counter:
+        """Number of cache hits per artifact."""
+        return self.__dict__.setdefault("_cache_hits", Counter())
+
+    @property
+    def cache_misses(self) -> Counter:
+        """Number of cache misses (i.e. computations) per artifact."""
+        return self.__dict__.setdefault("_cache_misses", Counter())
 
     def _init_cell_parameters(
         self,
@@ -79,95 +260,514 @@ class Tpms:
 
     def vtk_sheet(self) -> pv.UnstructuredGrid:
         """Sheet surface of the TPMS geometry."""
-        return self.grid.clip_scalar(scalars="upper_surface").clip_scalar(
-            scalars="lower_surface",
-            invert=False,
-        )
+        return _clip_part(self.grid, "sheet")
 
     def vtk_upper_skeletal(self) -> pv.UnstructuredGrid:
         """Upper skeletal surface of the TPMS geometry."""
-        return self.grid.clip_scalar(scalars="upper_surface", invert=False)
+        return _clip_part(self.grid, "upper_skeletal")
 
     def vtk_lower_skeletal(self) -> pv.UnstructuredGrid:
         """Lower skeletal surface of the TPMS geometry."""
-        return self.grid.clip_scalar(scalars="lower_surface")
+        return _clip_part(self.grid, "lower_skeletal")
+
+    @property
+    def grid(self) -> pv.StructuredGrid:
+        """Grid holding the TPMS field and the offset surfaces."""
+        self._cached("offset", self._update_offset_surfaces)
+        return self._cached("grid", self._compute_grid)
 
     @property
     def sheet(self) -> pv.PolyData:
         """Sheet surface of the TPMS geometry."""
-        if self._sheet is not None:
-            return self._sheet
-        self._sheet = self.vtk_sheet().extract_surface().clean().triangulate()
-        return self._sheet
+        return self._cached("sheet", lambda: self._extract_part("sheet"))
 
     @property
     def lower_skeletal(self) -> pv.PolyData:
         """Lower skeletal surface of the TPMS geometry."""
-        if self._lower_skeletal is not None:
-            return self._lower_skeletal
-        self._lower_skeletal = (
-            self.vtk_lower_skeletal().extract_surface().clean().triangulate()
+        return self._cached(
+            "lower_skeletal",
+            lambda: self._extract_part("lower_skeletal"),
         )
-        return self._lower_skeletal
 
     @property
     def upper_skeletal(self) -> pv.PolyData:
         """Upper skeletal surface of the TPMS geometry."""
-        if self._upper_skeletal is not None:
-            return self._upper_skeletal
-        self._upper_skeletal = (
-            self.vtk_upper_skeletal().extract_surface().clean().triangulate()
+        return self._cached(
+            "upper_skeletal",
+            lambda: self._extract_part("upper_skeletal"),
         )
-        return self._upper_skeletal
 
     @property
     def skeletals(self) -> tuple[pv.PolyData, pv.PolyData]:
         """Lower and upper skeletal surfaces of the TPMS geometry."""
-        if self._skeletals is not None:
-            return self._skeletals
-        self._skeletals = self.lower_skeletal + self.upper_skeletal
-        return self._skeletals
+        return self._cached(
+            "skeletals",
+            lambda: self.lower_skeletal + self.upper_skeletal,
+        )
 
     @property
     def surface(self) -> pv.PolyData:
         """Surface of the TPMS geometry."""
-        if self._surface is not None:
-            return self._surface
-        self._surface = self.grid.contour(
-            isosurfaces=[0.0],
-            scalars="surface",
-        ).extract_surface()
-        return self._surface
+        return self._cached("surface", lambda: self._extract_part("surface"))
+
+    def _extract_part(self, part: str) -> pv.PolyData:
+        if self.geometry_cache is None or not self._cacheable():
+            return self._compute_part(part)
+        key = geometry_key({"part": part, **self._parameters(part)})
+        with stage("cache_load"):
+            mesh = self.geometry_cache.load(key)
+        if mesh is None:
+            mesh = self._compute_part(part)
+            with stage("cache_store"):
+                self.geometry_cache.store(key, mesh)
+        return mesh
+
+    def _cacheable(self) -> bool:
+        """Check that the parameters identify the parts, see ``geometry_key``."""
+        return not callable(self.offset)
+
+    def _parameters(self, artifact: str) -> dict[str, Any]:
+        """Attributes an artifact depends on, directly or through others."""
+        names = set()
+        pending = [artifact]
+        while pending:
+            current = pending.pop()
+            for name in self._dependencies[current]:
+                # the offset artifact depends on the attribute of the same name
+                if name in self._dependencies and name != current:
+                    pending.append(name)
+                else:
+                    names.add(name)
+        return {
+            "class": type(self).__name__,
+            **{name: getattr(self, name) for name in sorted(names)},
+        }
+
+    def _compute_part(self, part: str) -> pv.PolyData:
+        if self.tiling and np.any(self.repeat_cell > 1):
+            return self._tiled_part(part)
+        if self.slab_size is not None or (self.workers or 1) > 1:
+            return _merge_chunks(self.iter_chunks(part))
+        return _extract_surface(self.grid, part, extraction=self.extraction)
+
+    def iter_chunks(
+        self,
+        part: str | None = None,
+        slab_size: int | None = None,
+        workers: int | None = None,
+    ) -> Iterator[MeshChunk]:
+        """Extract a part slab by slab along the third grid axis.
+
+        The field is evaluated on slabs of ``slab_size`` cell layers sharing
+        one layer with the previous slab, so that only one slab is held in
+        memory at a time. Each chunk holds the vertices added by a slab and its
+        triangles, indexing the vertices of all the chunks yielded so far.
+
+        With ``workers``, the slabs are extracted by a pool of processes and
+        the chunks are still yielded in the order of the slabs.
+        """
+        part = self.part if part is None else part
+        workers = workers or self.workers or 1
+        *_, z = self._linspaces()
+        last_layer = len(z) - 1
+        slab_size = (
+            slab_size
+            or self.slab_size
+            or (-(-last_layer // workers) if workers > 1 else _DEFAULT_SLAB_SIZE)
+        )
+        if slab_size < 1:
+            err_msg = "slab_size must be a positive number of layers"
+            raise ValueError(err_msg)
+        if workers < 1:
+            err_msg = "workers must be a positive number of processes"
+            raise ValueError(err_msg)
+
+        slabs = [
+            (start, min(start + slab_size, last_layer))
+            for start in range(0, max(last_layer, 1), slab_size)
+        ]
+        if workers == 1 or len(slabs) == 1:
+            yield from self._stitch_part(
+                part,
+                (
+                    self._slab_mesh(part, start, stop, last_layer)
+                    for start, stop in slabs
+                ),
+            )
+            return
+
+        # the slabs are computed from a copy without the cached artifacts
+        tpms = self._replace(profiler=None)
+        with ProcessPoolExecutor(
+            min(workers, len(slabs)),
+            mp_context=_CONTEXT,
+        ) as executor:
+            futures = [
+                executor.submit(_shared_slab_mesh, tpms, part, start, stop, last_layer)
+                for start, stop in slabs
+            ]
+            try:
+                yield from self._stitch_part(
+                    part,
+                    (_from_shared_memory(future.result()) for future in futures),
+                )
+            finally:
+                for future in futures:
+                    if not future.cancel() and future.exception() is None:
+                        _release_shared_memory(future.result())
+
+    def save(
+        self,
+        path: str | Path,
+        part: str | None = None,
+        slab_size: int | None = None,
+        workers: int | None = None,
+        point_data: Sequence[str] = (),
+    ) -> tuple[int, int]:
+        """Write a part to a binary STL or PLY file as it is extracted.
+
+        The chunks of ``iter_chunks`` are written to the file as soon as they
+        are extracted, so that the mesh of the part is never held in memory.
+        ``point_data`` lists the fields written with the vertices of a PLY
+        file. Returns the numbers of vertices and triangles.
+        """
+        return write_chunks(
+            self.iter_chunks(part, slab_size, workers),
+            path,
+            point_data,
+        )
+
+    def _stitch_part(
+        self,
+        part: str,
+        slabs: Iterable[SlabMesh],
+    ) -> Iterator[MeshChunk]:
+        """Stitch the slabs of a part and keep the density integrated on them.
+
+        The relative density of the part is the mean of the densities of the
+        slabs weighted by their thickness, so that the grid of the whole
+        lattice is not needed to estimate it once the part is extracted. Its
+        error is the weighted mean of the errors estimated on each slab.
+        """
+        densities = []
+
+        def record_densities() -> Iterator[SlabMesh]:
+            for slab in slabs:
+                densities.append(slab.density)
+                yield slab
+
+        yield from _stitch_slabs(record_densities())
+        if part == self.part and densities:
+            *estimate, thicknesses = np.transpose(densities)
+            self.__dict__.setdefault("_cache", {}).setdefault(
+                "relative_density_estimate",
+                tuple(
+                    float(values @ thicknesses / thicknesses.sum())
+                    for values in estimate
+                ),
+            )
+
+    def _slab_mesh(self, part: str, start: int, stop: int, last_layer: int) -> SlabMesh:
+        """Extract a part between two layers of the grid."""
+        *linspaces, z = self._linspaces()
+        slab_linspaces = [*linspaces, z[start : stop + 1]]
+        grid = self._block_grid(slab_linspaces)
+        density = self._part_density(part, grid, slab_linspaces)
+        # index coordinates of the grid points, interpolated by the extraction
+        # to locate the vertices in the grid
+        n_i, n_j, _ = grid.dimensions
+        grid["_index"] = np.stack(
+            np.meshgrid(
+                np.arange(n_i, dtype=float),
+                np.arange(n_j, dtype=float),
+                np.arange(start, stop + 1, dtype=float),
+                indexing="ij",
+            ),
+            axis=-1,
+        ).reshape(-1, _3D, order="F")
+        mesh = _extract_surface(grid, part, clean=False, extraction=self.extraction)
+        if not mesh.n_points:
+            mesh = pv.PolyData(np.empty((0, _3D), dtype=self.dtype))
+            for name in ("surface", "lower_surface", "upper_surface"):
+                mesh.point_data[name] = np.empty(0, dtype=self.dtype)
+            mesh.point_data["_index"] = np.empty((0, _3D))
+        index = mesh["_index"]
+        faces = mesh.faces.reshape(-1, 4)[:, 1:]
+
+        on_start = np.abs(index[:, 2] - start) < _INDEX_TOLERANCE
+        on_stop = np.abs(index[:, 2] - stop) < _INDEX_TOLERANCE
+        # faces on the sides shared with the neighboring slabs are inside the
+        # part
+        inner = np.zeros(len(faces), dtype=bool)
+        if start > 0:
+            inner |= np.all(on_start[faces], axis=1)
+        if stop < last_layer:
+            inner |= np.all(on_stop[faces], axis=1)
+
+        # merge the coincident vertices, as `clean` does, and drop the faces
+        # collapsed by the merge
+        _, first, merged = np.unique(
+            mesh.points,
+            axis=0,
+            return_index=True,
+            return_inverse=True,
+        )
+        merged = first[merged.ravel()]
+        faces = merged[faces[~inner]]
+        faces = faces[
+            (faces[:, 0] != faces[:, 1])
+            & (faces[:, 1] != faces[:, 2])
+            & (faces[:, 2] != faces[:, 0])
+        ]
+        kept = np.unique(faces)
+        compact = np.full(mesh.n_points, -1, dtype=np.int64)
+        compact[kept] = np.arange(len(kept))
+        local_index = compact[merged]
+
+        # the vertices on the shared layers are matched by their position in
+        # the layer
+        keys = np.round(index[:, :2] / _INDEX_TOLERANCE).astype(np.int64)
+        shared_start = np.flatnonzero((local_index >= 0) & on_start & (start > 0))
+        shared_stop = np.flatnonzero((local_index >= 0) & on_stop)
+        return SlabMesh(
+            points=np.asarray(mesh.points)[kept],
+            faces=compact[faces],
+            point_data={
+                name: np.asarray(mesh.point_data[name])[kept]
+                for name in ("surface", "lower_surface", "upper_surface")
+            },
+            start_keys=keys[shared_start],
+            start_index=local_index[shared_start],
+            stop_keys=keys[shared_stop],
+            stop_index=local_index[shared_stop],
+            density=np.array([*density, z[stop] - z[start]]),
+        )
+
+    def proxy_mesh(self, resolution: int, part: str | None = None) -> pv.PolyData:
+        """Part extracted from the field subsampled to a lower resolution.
+
+        The proxy grid spans the lattice with ``resolution`` points per cell
+        and takes the values of the nearest points of the grid, so that the
+        field is not evaluated again. The proxy is meant for previews, its
+        vertices may be off by half a cell of the full resolution grid.
+        """
+        part = self.part if part is None else part
+        if resolution >= self.resolution:
+            return getattr(self, part)
+        if resolution < _MIN_PROXY_RESOLUTION:
+            err_msg = f"resolution must be at least {_MIN_PROXY_RESOLUTION}"
+            raise ValueError(err_msg)
+
+        grid = self.grid
+        linspaces = self._linspaces()
+        proxy_linspaces = [
+            np.linspace(linspace[0], linspace[-1], resolution * repeat_cell_axis)
+            for linspace, repeat_cell_axis in zip(linspaces, self.repeat_cell)
+        ]
+        indices = np.ix_(
+            *(
+                np.rint(
+                    np.linspace(0, len(linspace) - 1, len(proxy_linspace)),
+                ).astype(int)
+                for linspace, proxy_linspace in zip(linspaces, proxy_linspaces)
+            ),
+        )
+        proxy = self._compute_grid(proxy_linspaces)
+        for name in ("surface", "lower_surface", "upper_surface"):
+            values = self._axis_values(grid[name])[indices]
+            proxy[name] = values.transpose(
+                ["XYZ".index(axis) for axis in self._point_order],
+            ).ravel(order="F")
+        with stage("proxy"):
+            return _extract_surface(proxy, part, extraction=self.extraction)
+
+    def _tiled_part(self, part: str) -> pv.PolyData:
+        """Extract the part of a single cell and tile it over the lattice."""
+        if not self._tileable:
+            err_msg = f"tiling is not supported by {type(self).__name__}"
+            raise ValueError(err_msg)
+        if callable(self.offset):
+            err_msg = "tiling requires a constant offset"
+            raise TypeError(err_msg)
+
+        cell = self._replace(
+            repeat_cell=np.ones(_3D, dtype=int),
+            tiling=False,
+            geometry_cache=None,
+        )
+        _check_periodic(cell)
+        # make the field exactly periodic so that the faces of neighboring
+        # cells are extracted identically
+        field = cell._cached("field", cell._compute_tpms_field)  # noqa: SLF001
+        field = field.reshape((cell.resolution,) * _3D, order="F")
+        field[-1, :, :] = field[0, :, :]
+        field[:, -1, :] = field[:, 0, :]
+        field[:, :, -1] = field[:, :, 0]
+
+        mesh = getattr(cell, part)
+        with stage("tiling"):
+            return _tile_cell_mesh(
+                mesh,
+                self.cell_size,
+                self.repeat_cell,
+                self.resolution,
+            )
+
+    def _replace(self, **changes: Any) -> Tpms:  # noqa: ANN401
+        """Copy the geometry with some attributes changed and an empty cache."""
+        clone = copy.copy(self)
+        clone.__dict__.update(
+            _cache={},
+            _cache_hits=Counter(),
+            _cache_misses=Counter(),
+        )
+        for name, value in changes.items():
+            setattr(clone, name, value)
+        return clone
 
     @property
     def vtk_mesh(self) -> pv.PolyData:
         """VTK mesh of the TPMS geometry."""
-        if self._vtk_mesh is not None:
-            return self._vtk_mesh
-
-        self._compute_tpms_field()
-
         return getattr(self, self.part)
 
     @property
     def relative_density(self) -> float:
         """Relative density of the geometry."""
-        if self._relative_density is not None:
-            return self._relative_density
         grid_volume = np.prod(self.cell_size) * np.prod(self.repeat_cell)
-        self._relative_density = self.vtk_mesh.volume / grid_volume
-        return self._relative_density
+        return self._cached(
+            "relative_density",
+            lambda: self.vtk_mesh.volume / grid_volume,
+        )
 
-    def _create_grid(
+    def estimate_relative_density(self) -> tuple[float, float]:
+        """Relative density integrated on the field, without extracting the part.
+
+        Returns the estimate and an estimate of its error. The surface part has
+        no volume.
+        """
+        return self._cached(
+            "relative_density_estimate",
+            self._estimate_relative_density,
+        )
+
+    def _estimate_relative_density(self) -> tuple[float, float]:
+        return self._part_density(self.part, self.grid, self._linspaces())
+
+    def _part_density(
         self,
-        x: np.ndarray,
-        y: np.ndarray,
-        z: np.ndarray,
-    ) -> pv.StructuredGrid:
-        return pv.StructuredGrid(x, y, z)
+        part: str,
+        grid: pv.DataSet,
+        linspaces: Sequence[np.ndarray],
+    ) -> tuple[float, float]:
+        """Relative density of a part on a grid spanned by the linspaces."""
+        return estimate_part_density(
+            part,
+            {
+                scalars: self._axis_values(grid[scalars], linspaces)
+                for scalars in ("lower_surface", "upper_surface")
+            },
+            linspaces,
+            self._volume_weights,
+        )
+
+    def fit_offset(
+        self,
+        density: float,
+        tolerance: float = 1e-4,
+        max_iterations: int = 8,
+    ) -> float:
+        """Set the offset reaching a relative density and return it.
+
+        The offset interpolated in the density table of the surface is refined
+        by secant steps on the density estimated on the field of this geometry,
+        until it is within ``tolerance`` of the target. The current offset is
+        kept if it already reaches the density. Where the density is flat, the
+        offset is bisected between the ones below and above the target, if
+        any, otherwise the search stops.
+        """
+        if self.part == "surface":
+            err_msg = "the surface has no volume, its density cannot be fitted"
+            raise ValueError(err_msg)
+        if not 0 < density < 1:
+            err_msg = "density must be between 0 and 1"
+            raise ValueError(err_msg)
+        if not callable(self.offset):
+            estimate, _ = self.estimate_relative_density()
+            if abs(estimate - density) <= tolerance:
+                return self.offset
+        offsets, densities = offset_table(self.surface_function, self.part)
+        offset = offset_for_density(self.surface_function, self.part, density)
+        slope = np.interp(offset, offsets, np.gradient(densities, offsets))
+        previous = None
+        # offsets reaching a density below and above the target
+        bracket: dict[bool, float] = {}
+        for _ in range(max_iterations):
+            self.offset = offset
+            estimate, _ = self.estimate_relative_density()
+            if abs(estimate - density) <= tolerance:
+                break
+            bracket[estimate > density] = offset
+            if previous is not None and estimate != previous[1]:
+                slope = (estimate - previous[1]) / (offset - previous[0])
+            previous = (offset, estimate)
+            if slope != 0:
+                offset += (density - estimate) / slope
+            elif len(bracket) == 2:  # noqa: PLR2004
+                offset = 0.5 * (bracket[False] + bracket[True])
+            else:
+                break
+        return self.offset
+
+    def _axis_values(
+        self,
+        values: np.ndarray,
+        linspaces: Sequence[np.ndarray] | None = None,
+    ) -> np.ndarray:
+        """Values of the grid points indexed along the X, Y and Z axes.
+
+        The grid is spanned by ``linspaces``, the ones of the lattice by default.
+        """
+        if linspaces is None:
+            linspaces = self._linspaces()
+        shape = dict(zip("XYZ", (len(linspace) for linspace in linspaces)))
+        values = np.reshape(
+            values,
+            [shape[axis] for axis in self._point_order],
+            order="F",
+        )
+        return values.transpose([self._point_order.index(axis) for axis in "XYZ"])
+
+    def _volume_weights(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Jacobian of the grid mapping, up to a constant factor."""
+        return np.ones(np.broadcast(x, y).shape)
+
+    def _compute_grid(
+        self,
+        linspaces: Sequence[np.ndarray] | None = None,
+    ) -> pv.DataSet:
+        """Uniform grid spanned by the linspaces, storing only its spacing."""
+        if linspaces is None:
+            linspaces = self._linspaces()
+        return pv.ImageData(
+            dimensions=[len(linspace) for linspace in linspaces],
+            spacing=[
+                linspace[1] - linspace[0] if len(linspace) > 1 else 1.0
+                for linspace in linspaces
+            ],
+            origin=[linspace[0] for linspace in linspaces],
+        )
 
-    def _compute_tpms_field(self) -> None:
-        linspaces = [
+    def _block_grid(self, linspaces: Sequence[np.ndarray]) -> pv.DataSet:
+        """Grid spanned by the linspaces with its field and offset surfaces."""
+        grid = self._compute_grid(linspaces)
+        offset = self._offset_values(grid, linspaces)
+        grid["surface"] = self._field_values(linspaces, _half_width(offset))
+        grid["lower_surface"] = grid["surface"] + 0.5 * offset
+        grid["upper_surface"] = grid["surface"] - 0.5 * offset
+        return grid
+
+    def _linspaces(self) -> list[np.ndarray]:
+        return [
             np.linspace(
                 -0.5 * cell_size_axis * repeat_cell_axis,
                 0.5 * cell_size_axis * repeat_cell_axis,
@@ -179,40 +779,493 @@ class Tpms:
             )
         ]
 
-        x, y, z = np.meshgrid(*linspaces)
+    def _compute_tpms_field(self) -> np.ndarray:
+        grid = self._cached("grid", self._compute_grid)
+        linspaces = self._linspaces()
+        band = None
+        if self.evaluation == "narrow_band":
+            band = _half_width(self._offset_values(grid, linspaces))
+        # band within which the field is evaluated exactly,
+        # see `_update_offset_surfaces`
+        self._field_band = band
+        grid["surface"] = self._field_values(linspaces, band)
+        return grid["surface"]
 
-        self.grid = self._create_grid(x, y, z)
+    def _field_values(
+        self,
+        linspaces: Sequence[np.ndarray],
+        band: float | None = None,
+    ) -> np.ndarray:
+        """Field on the grid spanned by the linspaces.
 
-        k_x, k_y, k_z = 2.0 * np.pi / self.cell_size
+        With the narrow band evaluation, the field is only exact where it lies
+        within ``[-band, band]``, see ``evaluate_narrow_band``.
+        """
+        k = 2.0 * np.pi / self.cell_size
         xyz = {
-            "X": k_x * (x + self.phase_shift[0]),
-            "Y": k_y * (y + self.phase_shift[1]),
-            "Z": k_z * (z + self.phase_shift[2]),
+            axis: (k_axis * (linspace + phase_shift_axis)).astype(self.dtype)
+            for axis, k_axis, linspace, phase_shift_axis in zip(
+                "XYZ",
+                k,
+                linspaces,
+                self.phase_shift,
+            )
         }
-        tpms_field = self.surface_function(*(xyz[axis] for axis in self.swap))
+        options = {"band": band or 0.0} if self.evaluation == "narrow_band" else {}
+        tpms_field = evaluate(
+            self.surface_function,
+            [xyz[axis] for axis in self.swap],
+            self.evaluation,
+            **options,
+        )
+        # the field axes follow `swap`, the grid points follow `_point_order`
+        tpms_field = tpms_field.transpose(
+            [self.swap.index(axis) for axis in self._point_order],
+        )
+        return tpms_field.ravel(order="F")
 
-        self.grid["surface"] = tpms_field.ravel(order="F")
-        self._update_offset(self.offset)
+    def _update_offset(self, offset: float | Field) -> None:
+        self.offset = offset
+        self._cached("offset", self._update_offset_surfaces)
 
-    def _update_offset(self, offset: float | Callable) -> None:
-        if isinstance(offset, float):
-            self.offset = offset
-        elif isinstance(offset, Callable):
-            self.offset = offset(self.grid.x, self.grid.y, self.grid.z).ravel("F")
+    def _update_offset_surfaces(self) -> np.ndarray:
+        field = self._cached("field", self._compute_tpms_field)
+        grid = self._cached("grid", self._compute_grid)
+
+        offset = self._offset_values(grid, self._linspaces())
+        if self._field_band is not None and _half_width(offset) > self._field_band:
+            # the offset surfaces leave the band where the field is exact
+            del self._cache["field"]
+            field = self._cached("field", self._compute_tpms_field)
+        grid["lower_surface"] = field + 0.5 * offset
+        grid["upper_surface"] = field - 0.5 * offset
+        return offset
+
+    def _offset_values(
+        self,
+        grid: pv.DataSet,
+        linspaces: Sequence[np.ndarray],  # noqa: ARG002
+    ) -> float | np.ndarray:
+        if callable(self.offset):
+            return np.asarray(self.offset(*grid.points.T), dtype=self.dtype)
+        return self.offset
+
+
+class _MappedTpms(Tpms, ABC):
+    """TPMS geometry on a grid mapped from the Cartesian one point by point."""
+
+    _tileable: ClassVar[bool] = False
+    _point_order: ClassVar[str] = "YXZ"
+
+    @abstractmethod
+    def _create_grid(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        z: np.ndarray,
+    ) -> pv.StructuredGrid:
+        """Grid of the points mapped from the Cartesian coordinates."""
+
+    def _compute_grid(
+        self,
+        linspaces: Sequence[np.ndarray] | None = None,
+    ) -> pv.StructuredGrid:
+        if linspaces is None:
+            linspaces = self._linspaces()
+        x, y, z = np.meshgrid(*(linspace.astype(self.dtype) for linspace in linspaces))
+        return self._create_grid(x, y, z)
+
+
+class MeshChunk(NamedTuple):
+    """Part of a triangle mesh extracted incrementally."""
+
+    points: np.ndarray
+    faces: np.ndarray
+    point_data: dict[str, np.ndarray]
+
+
+def _check_periodic(cell: Tpms) -> None:
+    """Check that the opposite faces of a cell only differ by rounding.
+
+    The field is evaluated exactly on the faces, whatever the evaluation of
+    the cell, since the narrow band one bounds the field away from the surface.
+    """
+    dense = cell._replace(evaluation="dense")
+    linspaces = cell._linspaces()  # noqa: SLF001
+    tolerance = np.sqrt(np.finfo(cell.dtype).eps)
+    for axis, linspace in enumerate(linspaces):
+        first, last = (
+            dense._field_values(  # noqa: SLF001
+                [*linspaces[:axis], linspace[[index]], *linspaces[axis + 1 :]],
+            )
+            for index in (0, -1)
+        )
+        scale = max(float(np.max(np.abs(first))), 1.0)
+        if not np.allclose(first, last, rtol=0.0, atol=tolerance * scale):
+            err_msg = (
+                "tiling requires a surface periodic over the cell, its field "
+                f"differs on the opposite faces along {'XYZ'[axis]}"
+            )
+            raise ValueError(err_msg)
+
+
+def _half_width(offset: float | np.ndarray) -> float:
+    """Half-width of the band around the surface holding the offset surfaces."""
+    return 0.5 * float(np.max(np.abs(offset)))
+
+
+def _clip_part(grid: pv.DataSet, part: str) -> pv.UnstructuredGrid:
+    """Volume of the grid occupied by a part."""
+    if part == "sheet":
+        return grid.clip_scalar(scalars="upper_surface").clip_scalar(
+            scalars="lower_surface",
+            invert=False,
+        )
+    if part == "upper_skeletal":
+        return grid.clip_scalar(scalars="upper_surface", invert=False)
+    if part == "lower_skeletal":
+        return grid.clip_scalar(scalars="lower_surface")
+    err_msg = f"{part} is not a volume part"
+    raise ValueError(err_msg)
+
+
+def _extract_surface(
+    grid: pv.DataSet,
+    part: str,
+    *,
+    clean: bool = True,
+    extraction: str = "clip",
+) -> pv.PolyData:
+    """Triangulated boundary of a part."""
+    if part == "surface":
+        with stage("isosurface"):
+            return isosurface(grid, "surface")
+    if part == "skeletals":
+        return _extract_surface(
+            grid,
+            "lower_skeletal",
+            clean=clean,
+            extraction=extraction,
+        ).merge(
+            _extract_surface(
+                grid,
+                "upper_skeletal",
+                clean=clean,
+                extraction=extraction,
+            ),
+            merge_points=clean,
+        )
+    if extraction == "contour":
+        with stage("contour"):
+            return contour_part(grid, part)
+    with stage("clip_scalar"):
+        volume = _clip_part(grid, part)
+    with stage("extract_surface"):
+        boundary = volume.extract_surface()
+    if clean:
+        with stage("clean"):
+            boundary = boundary.clean()
+    with stage("triangulate"):
+        boundary = boundary.triangulate()
+    if isinstance(grid, pv.ImageData):
+        # the parts clipped from the left-handed structured grids face
+        # inwards, flip the ones clipped from the right-handed image data
+        boundary.faces = boundary.faces.reshape(-1, 4)[:, [0, 3, 2, 1]].ravel()
+        boundary.points = boundary.points.astype(grid["surface"].dtype)
+    return boundary
+
+
+class SharedArrays(NamedTuple):
+    """Arrays sent to another process, in a shared memory block if possible.
+
+    The block is ``name``, holding the arrays at ``layout``. Without shared
+    memory, ``name`` is ``None`` and the arrays are sent in ``arrays``.
+    """
+
+    name: str | None
+    layout: list[Layout]
+    arrays: dict[str, np.ndarray]
+
+
+class SlabMesh(NamedTuple):
+    """Part extracted from a slab, with its vertices on the shared layers."""
+
+    points: np.ndarray
+    faces: np.ndarray
+    point_data: dict[str, np.ndarray]
+    start_keys: np.ndarray
+    start_index: np.ndarray
+    stop_keys: np.ndarray
+    stop_index: np.ndarray
+    # relative density of the part in the slab, its error and slab thickness
+    density: np.ndarray
+
+
+def _stitch_slabs(slabs: Iterable[SlabMesh]) -> Iterator[MeshChunk]:
+    """Renumber the vertices of consecutive slabs, merging the shared ones."""
+    n_vertices = 0
+    interface = np.empty((0, 2), dtype=np.int64), np.empty(0, dtype=np.int64)
+    for slab in slabs:
+        vertex_index = np.full(len(slab.points), -1, dtype=np.int64)
+        if len(slab.start_keys):
+            matched = _match_keys(slab.start_keys, *interface)
+            vertex_index[slab.start_index[matched >= 0]] = matched[matched >= 0]
+        new = vertex_index < 0
+        vertex_index[new] = n_vertices + np.arange(np.count_nonzero(new))
+        n_vertices += np.count_nonzero(new)
+
+        interface = slab.stop_keys, vertex_index[slab.stop_index]
+        yield MeshChunk(
+            points=slab.points[new],
+            faces=vertex_index[slab.faces],
+            point_data={name: data[new] for name, data in slab.point_data.items()},
+        )
+
+
+def _shared_slab_mesh(
+    tpms: Tpms,
+    part: str,
+    start: int,
+    stop: int,
+    last_layer: int,
+) -> SharedArrays:
+    """Extract a slab in a worker process and return it in shared memory."""
+    slab = tpms._slab_mesh(part, start, stop, last_layer)  # noqa: SLF001
+    arrays = {
+        **{
+            name: getattr(slab, name)
+            for name in SlabMesh._fields
+            if name != "point_data"
+        },
+        **{f"point_data.{name}": data for name, data in slab.point_data.items()},
+    }
+    return _to_shared_memory(arrays)
+
+
+def _to_shared_memory(arrays: dict[str, np.ndarray]) -> SharedArrays:
+    """Copy arrays to a new shared memory block, owned by the reading process."""
+    if not _SHARED_MEMORY:
+        return SharedArrays(None, [], arrays)
+    from multiprocessing import resource_tracker
+
+    memory = shared_memory.SharedMemory(
+        create=True,
+        size=max(sum(array.nbytes for array in arrays.values()), 1),
+    )
+    layout = []
+    offset = 0
+    for name, array in arrays.items():
+        np.ndarray(array.shape, array.dtype, memory.buf, offset)[...] = array
+        layout.append((name, array.dtype.str, array.shape, offset))
+        offset += array.nbytes
+    # the block is unlinked by the process reading it
+    resource_tracker.unregister(memory._name, "shared_memory")  # noqa: SLF001
+    memory.close()
+    return SharedArrays(memory.name, layout, {})
+
+
+@contextmanager
+def _shared_arrays(shared: SharedArrays) -> Iterator[dict[str, np.ndarray]]:
+    """Map the arrays sent by another process and release their block after.
+
+    The arrays must not be used outside of the block.
+    """
+    if shared.name is None:
+        yield shared.arrays
+        return
+    memory = shared_memory.SharedMemory(name=shared.name)
+    try:
+        yield {
+            name: np.ndarray(shape, dtype, memory.buf, offset)
+            for name, dtype, shape, offset in shared.layout
+        }
+    finally:
+        memory.unlink()
+        # the block stays mapped while the caller holds arrays
+        with suppress(BufferError):
+            memory.close()
+
+
+def _from_shared_memory(shared: SharedArrays) -> SlabMesh:
+    """Read a slab sent by a worker process and release its block."""
+    with _shared_arrays(shared) as shared_arrays:
+        arrays = {name: array.copy() for name, array in shared_arrays.items()}
+        del shared_arrays
+    point_data = "point_data."
+    return SlabMesh(
+        **{
+            field: arrays.pop(field)
+            for field in SlabMesh._fields
+            if field != "point_data"
+        },
+        point_data={name[len(point_data) :]: data for name, data in arrays.items()},
+    )
+
+
+def _release_shared_memory(shared: SharedArrays) -> None:
+    """Unlink the block of arrays which were not read."""
+    if shared.name is None:
+        return
+    try:
+        memory = shared_memory.SharedMemory(name=shared.name)
+    except FileNotFoundError:
+        return
+    memory.close()
+    memory.unlink()
+
+
+def _match_keys(
+    keys: np.ndarray,
+    known_keys: np.ndarray,
+    known_index: np.ndarray,
+) -> np.ndarray:
+    """Index of the known vertices matching the keys, -1 if there is none."""
+    _, inverse = np.unique(
+        np.concatenate([known_keys, keys]),
+        axis=0,
+        return_inverse=True,
+    )
+    inverse = inverse.ravel()
+    index_of_key = np.full(inverse.max(initial=-1) + 1, -1, dtype=np.int64)
+    index_of_key[inverse[: len(known_keys)]] = known_index
+    return index_of_key[inverse[len(known_keys) :]]
+
+
+def _merge_chunks(chunks: Iterable[MeshChunk]) -> pv.PolyData:
+    """Assemble the chunks of a mesh."""
+    chunks = list(chunks)
+    faces = np.concatenate([chunk.faces for chunk in chunks])
+    mesh = pv.PolyData(
+        np.concatenate([chunk.points for chunk in chunks]),
+        faces=np.hstack([np.full((len(faces), 1), _3D), faces]).ravel(),
+    )
+    for name in chunks[0].point_data:
+        mesh.point_data[name] = np.concatenate(
+            [chunk.point_data[name] for chunk in chunks],
+        )
+    return mesh
 
-        self.grid["lower_surface"] = self.grid["surface"] + 0.5 * self.offset
-        self.grid["upper_surface"] = self.grid["surface"] - 0.5 * self.offset
 
+def _side_order(
+    points: np.ndarray,
+    spacing: np.ndarray,
+    tolerance: float,
+) -> np.ndarray:
+    """Order of the vertices of a cell side, sorted along the grid lines.
 
-class CylindricalTpms(Tpms):
+    Every vertex of a side lies on a grid line of the side, whose index is
+    exact, and is sorted by its interpolated coordinate along the line, which
+    is only known up to rounding errors.
+    """
+    lines = np.round(points / spacing)
+    on_first_line = np.abs(points[:, 0] - lines[:, 0] * spacing[0]) < tolerance
+    line_axis = np.where(on_first_line, 0, 1)
+    vertex = np.arange(len(points))
+    return np.lexsort(
+        (points[vertex, 1 - line_axis], lines[vertex, line_axis], line_axis),
+    )
+
+
+def _tile_cell_mesh(
+    mesh: pv.PolyData,
+    cell_size: np.ndarray,
+    repeat_cell: np.ndarray,
+    resolution: int,
+) -> pv.PolyData:
+    """Replicate the mesh of a periodic cell and weld the copies together.
+
+    The faces lying on the cell sides shared by two copies are dropped and the
+    vertices on these sides are merged with their counterpart in the
+    neighboring copy, matched once on the cell mesh.
+    """
+    points = np.asarray(mesh.points)
+    faces = mesh.faces.reshape(-1, 4)[:, 1:]
+    n_points = len(points)
+    tolerance = 64 * np.finfo(points.dtype).eps * np.max(cell_size)
+
+    copy_index = np.indices(repeat_cell).reshape(_3D, -1).T
+    n_copies = len(copy_index)
+    strides = np.array([repeat_cell[1] * repeat_cell[2], repeat_cell[2], 1])
+
+    drop = np.zeros((n_copies, len(faces)), dtype=bool)
+    merged = np.arange(n_copies * n_points)
+    for axis in range(_3D):
+        if repeat_cell[axis] == 1:
+            continue
+        on_min_side = np.abs(points[:, axis] + 0.5 * cell_size[axis]) < tolerance
+        on_max_side = np.abs(points[:, axis] - 0.5 * cell_size[axis]) < tolerance
+        drop |= np.all(on_min_side[faces], axis=1) & (copy_index[:, [axis]] > 0)
+        drop |= np.all(on_max_side[faces], axis=1) & (
+            copy_index[:, [axis]] < repeat_cell[axis] - 1
+        )
+
+        # match the vertices of both sides by their in-plane coordinates, up
+        # to the rounding errors of the interpolation along the cell edges
+        in_plane = [other for other in range(_3D) if other != axis]
+        in_plane_points = points[:, in_plane] + 0.5 * cell_size[in_plane]
+        spacing = cell_size[in_plane] / (resolution - 1)
+        min_side = np.flatnonzero(on_min_side)
+        max_side = np.flatnonzero(on_max_side)
+        min_side = min_side[_side_order(in_plane_points[min_side], spacing, tolerance)]
+        max_side = max_side[_side_order(in_plane_points[max_side], spacing, tolerance)]
+        if len(min_side) != len(max_side) or not np.allclose(
+            in_plane_points[min_side],
+            in_plane_points[max_side],
+            rtol=0,
+            atol=tolerance,
+        ):
+            err_msg = "the cell mesh is not periodic"
+            raise ValueError(err_msg)
+
+        copies = np.flatnonzero(copy_index[:, axis] > 0)
+        merged[(copies[:, None] * n_points + min_side).ravel()] = (
+            (copies[:, None] - strides[axis]) * n_points + max_side
+        ).ravel()
+
+    # vertices on edges and corners are merged through several sides
+    while not np.array_equal(merged[merged], merged):
+        merged = merged[merged]
+    kept = merged == np.arange(len(merged))
+    new_index = np.cumsum(kept) - 1
+
+    translations = ((copy_index - 0.5 * (repeat_cell - 1)) * cell_size).astype(
+        points.dtype,
+    )
+    tiled_points = (points[None, :, :] + translations[:, None, :]).reshape(-1, _3D)
+    tiled_faces = (faces[None, :, :] + (np.arange(n_copies) * n_points)[:, None, None])[
+        ~drop
+    ]
+    tiled_faces = new_index[merged[tiled_faces]]
+
+    tiled_mesh = pv.PolyData(
+        tiled_points[kept],
+        faces=np.hstack(
+            [np.full((len(tiled_faces), 1), _3D), tiled_faces],
+        ).ravel(),
+    )
+    for name in mesh.point_data:
+        tiled_mesh.point_data[name] = np.tile(mesh.point_data[name], n_copies)[kept]
+    return tiled_mesh
+
+
+class CylindricalTpms(_MappedTpms):
     """Cylindrical TPMS geometry."""
 
+    _dependencies: ClassVar[dict[str, tuple[str, ...]]] = {
+        **Tpms._dependencies,  # noqa: SLF001
+        "grid": (
+            *Tpms._dependencies["grid"],  # noqa: SLF001
+            "cylinder_radius",
+            "unit_theta",
+        ),
+    }
+
     def __init__(
         self,
         radius: float = 1.0,
         cell_size: float | Sequence[float] | np.ndarray = 1.0,
         repeat_cell: int | Sequence[int] | np.ndarray = 1,
-        **kwargs,
+        **kwargs: Any,  # noqa: ANN401
     ) -> None:
         """Create a cylindrical TPMS geometry."""
         self._init_cell_parameters(cell_size, repeat_cell)
@@ -234,8 +1287,6 @@ class CylindricalTpms(Tpms):
     @property
     def relative_density(self) -> float:
         """Relative density of the geometry."""
-        if self._relative_density is not None:
-            return self._relative_density
         grid_volume = (
             self.cylinder_radius
             * self.cell_size[0]
@@ -243,8 +1294,10 @@ class CylindricalTpms(Tpms):
             * self.cell_size[2]
             * np.prod(self.repeat_cell)
         )
-        self._relative_density = self.vtk_mesh.volume / grid_volume
-        return self._relative_density
+        return self._cached(
+            "relative_density",
+            lambda: self.vtk_mesh.volume / grid_volume,
+        )
 
     def _create_grid(
         self,
@@ -257,16 +1310,29 @@ class CylindricalTpms(Tpms):
 
         return pv.StructuredGrid(rho * np.cos(theta), rho * np.sin(theta), z)
 
+    def _volume_weights(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return np.broadcast_to(x + self.cylinder_radius, np.broadcast(x, y).shape)
+
 
-class SphericalTpms(Tpms):
+class SphericalTpms(_MappedTpms):
     """Spherical TPMS geometry."""
 
+    _dependencies: ClassVar[dict[str, tuple[str, ...]]] = {
+        **Tpms._dependencies,  # noqa: SLF001
+        "grid": (
+            *Tpms._dependencies["grid"],  # noqa: SLF001
+            "sphere_radius",
+            "unit_theta",
+            "unit_phi",
+        ),
+    }
+
     def __init__(
         self,
         radius: float = 1.0,
         cell_size: float | Sequence[float] | np.ndarray = 1.0,
         repeat_cell: int | Sequence[int] | np.ndarray = 1,
-        **kwargs,
+        **kwargs: Any,  # noqa: ANN401
     ) -> None:
         """Create a spherical TPMS geometry."""
         self._init_cell_parameters(cell_size, repeat_cell)
@@ -294,10 +1360,10 @@ class SphericalTpms(Tpms):
     @property
     def relative_density(self) -> float:
         """Relative density of the geometry."""
-        if self._relative_density is not None:
-            return self._relative_density
-        self._relative_density = self.vtk_mesh.volume / abs(self.grid.volume)
-        return self._relative_density
+        return self._cached(
+            "relative_density",
+            lambda: self.vtk_mesh.volume / abs(self.grid.volume),
+        )
 
     def _create_grid(
         self,
@@ -315,37 +1381,205 @@ class SphericalTpms(Tpms):
             rho * np.cos(theta),
         )
 
+    def _volume_weights(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        rho = x + self.sphere_radius
+        theta = y * self.unit_theta + np.pi / 2.0
+        return rho**2 * np.abs(np.sin(theta))
+
+
+class GradedTpms(Tpms):
+    """TPMS geometry graded over a coarse control lattice.
+
+    The offset, the cell size and the blend with a second surface vary over
+    the lattice. Each grading is sampled on ``control_points`` points per
+    axis spanning the lattice and trilinearly upsampled to the grid, so that
+    callables and expressions are evaluated on the control points only.
+
+    A grading is None (no grading), a number, an array of the values at the
+    control points, a callable of the control point coordinates or an
+    expression of ``x``, ``y`` and ``z`` (see ``compile_expression``):
+
+    - ``offset_grading`` is added to ``offset``, which ``fit_offset`` shifts;
+    - ``cell_size_grading`` scales the cell size, it must be positive;
+    - ``surface_blend`` is the weight of ``blend_surface`` in the field, from 0
+      (``surface`` only) to 1 (``blend_surface`` only).
+
+    The field is evaluated on the full grid coordinates when the cell size or
+    the surface is graded, the separable evaluations do not apply.
+    """
+
+    _dependencies: ClassVar[dict[str, tuple[str, ...]]] = {
+        **Tpms._dependencies,  # noqa: SLF001
+        "field": (
+            *Tpms._dependencies["field"],  # noqa: SLF001
+            "control_points",
+            "cell_size_grading",
+            "blend_surface_function",
+            "surface_blend",
+        ),
+        "offset": (
+            *Tpms._dependencies["offset"],  # noqa: SLF001
+            "control_points",
+            "offset_grading",
+        ),
+    }
+    _tileable: ClassVar[bool] = False
+
+    def __init__(
+        self,
+        offset_grading: Grading = None,
+        cell_size_grading: Grading = None,
+        blend_surface: str | None = None,
+        surface_blend: Grading = None,
+        control_points: int | Sequence[int] = 5,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Create a graded TPMS geometry."""
+        if isinstance(control_points, int):
+            control_points = (control_points,) * _3D
+        if len(control_points) != _3D or min(control_points) < 1:
+            err_msg = "control_points must be a positive int or a sequence of 3"
+            raise ValueError(err_msg)
+        if surface_blend is not None and blend_surface is None:
+            err_msg = "surface_blend requires a blend_surface"
+            raise ValueError(err_msg)
+
+        self.control_points = tuple(control_points)
+        self.offset_grading = _compiled_grading(offset_grading)
+        self.cell_size_grading = _compiled_grading(cell_size_grading)
+        self.blend_surface_function = (
+            None if blend_surface is None else surface_function(blend_surface)
+        )
+        self.surface_blend = _compiled_grading(surface_blend)
+        super().__init__(**kwargs)
+
+    def control_values(self, grading: Grading) -> np.ndarray | None:
+        """Values of a grading at the control points, None if not graded."""
+        if grading is None:
+            return None
+        if callable(grading):
+            x, y, z = np.meshgrid(
+                *self._control_linspaces(),
+                indexing="ij",
+                sparse=True,
+            )
+            values = np.broadcast_to(grading(x, y, z), self.control_points)
+        else:
+            values = grading
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 0:
+            return np.full(self.control_points, values)
+        if values.shape != self.control_points:
+            err_msg = f"the grading must have the shape {self.control_points}"
+            raise ValueError(err_msg)
+        return values
+
+    def _control_linspaces(self) -> list[np.ndarray]:
+        return [
+            np.linspace(linspace[0], linspace[-1], n_points)
+            for linspace, n_points in zip(self._linspaces(), self.control_points)
+        ]
+
+    def _upsampled(
+        self,
+        grading: Grading,
+        linspaces: Sequence[np.ndarray],
+    ) -> np.ndarray | None:
+        """Grading interpolated on the grid spanned by the linspaces."""
+        values = self.control_values(grading)
+        if values is None:
+            return None
+        return trilinear_upsample(
+            values,
+            self._control_linspaces(),
+            linspaces,
+        ).astype(self.dtype, copy=False)
+
+    def _cacheable(self) -> bool:
+        gradings = (self.offset_grading, self.cell_size_grading, self.surface_blend)
+        return super()._cacheable() and not any(
+            callable(grading) and not isinstance(grading, Expression)
+            for grading in gradings
+        )
+
+    def _field_values(
+        self,
+        linspaces: Sequence[np.ndarray],
+        band: float | None = None,
+    ) -> np.ndarray:
+        scale = self._upsampled(self.cell_size_grading, linspaces)
+        weight = self._upsampled(self.surface_blend, linspaces)
+        if scale is None and weight is None:
+            return super()._field_values(linspaces, band)
+        if scale is not None and np.min(scale) <= 0:
+            err_msg = "cell_size_grading must be positive"
+            raise ValueError(err_msg)
+
+        k = 2.0 * np.pi / self.cell_size
+        coordinates = np.meshgrid(
+            *(
+                (k_axis * (linspace + phase_shift_axis)).astype(self.dtype)
+                for k_axis, linspace, phase_shift_axis in zip(
+                    k,
+                    linspaces,
+                    self.phase_shift,
+                )
+            ),
+            indexing="ij",
+            sparse=scale is None,
+        )
+        if scale is not None:
+            coordinates = [axis_coordinates / scale for axis_coordinates in coordinates]
+        xyz = dict(zip("XYZ", coordinates))
+        swapped = [xyz[axis] for axis in self.swap]
+
+        tpms_field = np.asarray(self.surface_function(*swapped))
+        if weight is not None:
+            blend = self.blend_surface_function(*swapped)
+            tpms_field = tpms_field + weight * (blend - tpms_field)
+        shape = tuple(len(linspace) for linspace in linspaces)
+        tpms_field = np.broadcast_to(tpms_field, shape).astype(self.dtype, copy=False)
+        return tpms_field.ravel(order="F")
+
+    def _offset_values(
+        self,
+        grid: pv.DataSet,
+        linspaces: Sequence[np.ndarray],
+    ) -> float | np.ndarray:
+        offset = super()._offset_values(grid, linspaces)
+        grading = self._upsampled(self.offset_grading, linspaces)
+        if grading is None:
+            return offset
+        return offset + grading.ravel(order="F")
+
+
+def trilinear_upsample(
+    values: np.ndarray,
+    control_linspaces: Sequence[np.ndarray],
+    linspaces: Sequence[np.ndarray],
+) -> np.ndarray:
+    """Interpolate values given on a coarse grid on a finer one.
+
+    The interpolation is separable: the values are interpolated along each
+    axis in turn, the last pass only producing an array of the fine size.
+    The points outside of the coarse grid take the values on its boundary.
+    """
+    for axis, (control, linspace) in enumerate(zip(control_linspaces, linspaces)):
+        if len(control) == 1:
+            values = np.repeat(values, len(linspace), axis=axis)
+            continue
+        position = np.interp(linspace, control, np.arange(len(control)))
+        lower = np.minimum(position.astype(int), len(control) - 2)
+        fraction = position - lower
+        shape = [1] * values.ndim
+        shape[axis] = len(linspace)
+        fraction = fraction.reshape(shape)
+        below = np.take(values, lower, axis=axis)
+        above = np.take(values, lower + 1, axis=axis)
+        values = below + fraction * (above - below)
+    return values
+
 
-# class GradedTpms(Tpms):
-#     def __init__(
-#         self,
-#         part,
-#         surface,
-#         swap,
-#         cell_size,
-#         repeat_cell,
-#         resolution,
-#         offset,
-#         phase_shift,
-#         offset_grading,
-#         edges,
-#     ):
-#         super().__init__(
-#             part,
-#             surface,
-#             swap,
-#             cell_size,
-#             repeat_cell,
-#             resolution,
-#             offset,
-#             phase_shift,
-#         )
-#         self.offset_grading = offset_grading
-#         self.edges = edges
-
-
-#     def _create_grid(self, x, y, z):
-#         a = self.edges[0]
-#         b = self.edges[1]
-#         self.offset = literal_eval(self.offset_grading)
-#         return pv.StructuredGrid(x, y, z)
+def _compiled_grading(grading: Grading) -> Grading:
+    """Grading with the expressions compiled."""
+    return compile_expression(grading) if isinstance(grading, str) else grading
@@ -0,0 +1,202 @@
+"""Binary STL and PLY files written chunk by chunk.
+
+The writers consume the chunks of a mesh as they are extracted (see
+``Tpms.iter_chunks``) and write them to disk at once, so that the whole mesh
+is never held in memory. The faces of a chunk may index the vertices of the
+chunk and of the previous one, which are the only ones kept. The winding of
+the triangles is reversed, as in Blender, so that the normals of the parts face
+outwards.
+
+The counts of the headers are only known at the end and are patched when the
+writer is closed. The PLY format lists all the vertices before the faces, the
+faces are spilled to a temporary file appended to the vertices when closing.
+"""
+
+from __future__ import annotations
+
+import shutil
+import struct
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Iterable, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from typing_extensions import Self  # pragma: no cover
+
+    from blender_tpms.tpms.tpms import MeshChunk  # pragma: no cover
+
+_STL_HEADER = b"binary STL written by blender_tpms".ljust(80)
+_STL_TRIANGLE = np.dtype(
+    [("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")],
+)
+_PLY_FACE = np.dtype([("count", "u1"), ("vertices", "<i4", 3)])
+# width of the counts written in the PLY header, patched when closing
+_PLY_COUNT_WIDTH = 10
+_BUFFER_SIZE = 1 << 20
+
+
+class _ChunkWriter(ABC):
+    """Vertex window shared by the writers."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.n_vertices = 0
+        self.n_triangles = 0
+        self._previous_points = np.empty((0, 3), dtype=np.float32)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def write_chunks(self, chunks: Iterable[MeshChunk]) -> None:
+        """Write chunks in order."""
+        for chunk in chunks:
+            self.write(chunk)
+
+    @abstractmethod
+    def write(self, chunk: MeshChunk) -> None:
+        """Write a chunk after the previous ones."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Patch the header and close the file."""
+
+    def _add_chunk(self, chunk: MeshChunk) -> tuple[np.ndarray, np.ndarray]:
+        """Vertices of the previous and current chunks and the faces indexing them."""
+        points = np.asarray(chunk.points, dtype=np.float32)
+        window = np.concatenate([self._previous_points, points])
+        faces = np.asarray(chunk.faces) - (self.n_vertices - len(self._previous_points))
+        if faces.size and (faces.min() < 0 or faces.max() >= len(window)):
+            err_msg = (
+                "the faces of a chunk must index the vertices of the chunk or of "
+                "the previous one"
+            )
+            raise ValueError(err_msg)
+        self._previous_points = points
+        self.n_vertices += len(points)
+        self.n_triangles += len(faces)
+        return window, faces
+
+
+class StlWriter(_ChunkWriter):
+    """Binary STL file written chunk by chunk."""
+
+    def __init__(self, path: str | Path) -> None:
+        """Create the file, written until ``close``."""
+        super().__init__(path)
+        self._file = self.path.open("wb", buffering=_BUFFER_SIZE)
+        self._file.write(_STL_HEADER + struct.pack("<I", 0))
+
+    def write(self, chunk: MeshChunk) -> None:
+        """Write the triangles of a chunk, with their normals."""
+        window, faces = self._add_chunk(chunk)
+        faces = faces[:, ::-1]
+        triangles = np.empty(len(faces), dtype=_STL_TRIANGLE)
+        vertices = np.take(window, faces, axis=0)
+        triangles["vertices"] = vertices
+        normals = np.cross(
+            vertices[:, 1] - vertices[:, 0],
+            vertices[:, 2] - vertices[:, 0],
+        )
+        lengths = np.sqrt(np.einsum("ij,ij->i", normals, normals))[:, np.newaxis]
+        np.divide(normals, lengths, out=normals, where=lengths > 0)
+        triangles["normal"] = normals
+        triangles["attribute"] = 0
+        self._file.write(triangles)
+
+    def close(self) -> None:
+        """Patch the number of triangles and close the file."""
+        if self._file.closed:
+            return
+        self._file.seek(len(_STL_HEADER))
+        self._file.write(struct.pack("<I", self.n_triangles))
+        self._file.close()
+
+
+class PlyWriter(_ChunkWriter):
+    """Binary PLY file written chunk by chunk.
+
+    The vertices hold their coordinates and the ``point_data`` arrays of the
+    chunks, as single precision properties.
+    """
+
+    def __init__(self, path: str | Path, point_data: Sequence[str] = ()) -> None:
+        """Create the file, written until ``close``."""
+        super().__init__(path)
+        self.point_data = tuple(point_data)
+        self._vertex = np.dtype(
+            [(name, "<f4") for name in ("x", "y", "z", *self.point_data)],
+        )
+        self._file = self.path.open("wb", buffering=_BUFFER_SIZE)
+        self._file.write(self._header(0, 0))
+        self._faces: IO[bytes] = tempfile.TemporaryFile(  # noqa: SIM115
+            dir=self.path.parent,
+            buffering=_BUFFER_SIZE,
+        )
+
+    def write(self, chunk: MeshChunk) -> None:
+        """Write the vertices of a chunk and spill its faces."""
+        self._add_chunk(chunk)
+        vertices = np.empty(len(chunk.points), dtype=self._vertex)
+        for axis, name in enumerate("xyz"):
+            vertices[name] = chunk.points[:, axis]
+        for name in self.point_data:
+            vertices[name] = chunk.point_data[name]
+        self._file.write(vertices)
+
+        faces = np.empty(len(chunk.faces), dtype=_PLY_FACE)
+        faces["count"] = 3
+        faces["vertices"] = np.asarray(chunk.faces)[:, ::-1]
+        self._faces.write(faces)
+
+    def close(self) -> None:
+        """Append the faces, patch the counts and close the file."""
+        if self._file.closed:
+            return
+        self._faces.seek(0)
+        shutil.copyfileobj(self._faces, self._file, _BUFFER_SIZE)
+        self._faces.close()
+        self._file.seek(0)
+        self._file.write(self._header(self.n_vertices, self.n_triangles))
+        self._file.close()
+
+    def _header(self, n_vertices: int, n_triangles: int) -> bytes:
+        """Header with counts of a fixed width, so that it can be patched."""
+        lines = [
+            "ply",
+            "format binary_little_endian 1.0",
+            f"element vertex {n_vertices:0{_PLY_COUNT_WIDTH}d}",
+            *(f"property float {name}" for name in self._vertex.names),
+            f"element face {n_triangles:0{_PLY_COUNT_WIDTH}d}",
+            "property list uchar int vertex_indices",
+            "end_header",
+        ]
+        return "".join(f"{line}\n" for line in lines).encode("ascii")
+
+
+def write_chunks(
+    chunks: Iterable[MeshChunk],
+    path: str | Path,
+    point_data: Sequence[str] = (),
+) -> tuple[int, int]:
+    """Write chunks to a STL or PLY file, after the extension of the path.
+
+    ``point_data`` lists the arrays written with the vertices of a PLY file.
+    Returns the numbers of vertices and triangles.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".stl":
+        writer: _ChunkWriter = StlWriter(path)
+    elif suffix == ".ply":
+        writer = PlyWriter(path, point_data)
+    else:
+        err_msg = f"unsupported file extension {suffix!r}, use .stl or .ply"
+        raise ValueError(err_msg)
+    with writer:
+        writer.write_chunks(chunks)
+    return writer.n_vertices, writer.n_triangles
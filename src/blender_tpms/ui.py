@@ -2,25 +2,45 @@
 
 from __future__ import annotations
 
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, ClassVar
+
 import bpy
-from bpy_extras.object_utils import AddObjectHelper, object_data_add
+import numpy as np
+from bpy_extras.object_utils import (
+    AddObjectHelper,
+    add_object_align_init,
+    object_data_add,
+)
 
-from blender_tpms.interface import polydata_to_mesh
+import blender_tpms.tpms
+from blender_tpms import lod
+from blender_tpms.interface import polydata_to_mesh, triangles_to_mesh
 from blender_tpms.material import apply_material
-
-# GradedTpms,
 from blender_tpms.properties import (
     CylindricalTpmsProperties,
-    # TpmsGradingProperties,
     OperatorProperties,
     SphericalTpmsProperties,
+    TpmsGradingProperties,
     TpmsProperties,
 )
-from blender_tpms.tpms import (
-    CylindricalTpms,
-    SphericalTpms,
-    Tpms,
-)
+from blender_tpms.tpms.profiling import stage
+
+if TYPE_CHECKING:
+    from mathutils import Matrix  # pragma: no cover
+
+    from blender_tpms.tpms import Tpms, TpmsJob  # pragma: no cover
+
+logger = logging.getLogger(__name__)
+
+# geometries kept for the redos of the operators, each one holding its grid
+_CACHED_GEOMETRIES = 2
+# seconds between the polls of the background jobs
+_POLL_INTERVAL = 0.2
+
+_JOBS: list[BackgroundJob] = []
 
 
 def set_shade_auto_smooth() -> None:
@@ -32,59 +52,278 @@ def set_shade_auto_smooth() -> None:
         bpy.ops.object.shade_smooth_by_angle(angle=angle, keep_sharp_edges=True)
 
 
-class OperatorTpms(
-    bpy.types.Operator,
-    OperatorProperties,
-    AddObjectHelper,
-    TpmsProperties,
-):
-    """Add a TPMS mesh."""
-
-    bl_idname = "mesh.tpms_add"
-    bl_label = "TPMS"
-    bl_options = {"REGISTER", "UNDO"}  # noqa: RUF012 (blender uses type hints for another purpose)
+class TpmsOperator:
+    """Execution shared by the TPMS operators.
+
+    The geometry is kept between the redos of the operator, keyed by its
+    parameters. Changing the offset or the part reuses the evaluated field
+    and the other options reuse the extracted mesh. With the disk cache, the
+    meshes are also reused across sessions. With the profile option, the
+    time and memory used by each stage are logged and reported. With a
+    viewport resolution, the viewport displays a proxy mesh subsampled from
+    the same field and the renders use the full resolution mesh.
+
+    In the background, the geometry is generated by a worker process and the
+    object is added by a timer polling the job once it is done, the stages
+    being shown in the status bar. The geometry is then not kept for the
+    redos.
+    """
+
+    # name of the geometry class in blender_tpms.tpms, which imports PyVista
+    # when the operator first runs rather than when the add-on registers
+    tpms_class: ClassVar[str] = "Tpms"
+
+    def tpms_type(self) -> type[Tpms]:
+        """Class of the geometry."""
+        return getattr(blender_tpms.tpms, self.tpms_class)
+
+    def geometry_parameters(self) -> dict[str, Any]:
+        """Parameters of the geometry except the part and the offset."""
+        return {
+            "surface": self.expression.strip() or self.surface,
+            "swap": self.swap,
+            "cell_size": tuple(self.cell_size),
+            "repeat_cell": tuple(self.repeat_cell),
+            "resolution": self.resolution,
+            "phase_shift": tuple(self.phase_shift),
+            "dtype": self.dtype,
+        }
 
     def execute(self, context: bpy.types.Context) -> set[str]:
         """Execute the operator."""
-        tpms = Tpms(
-            part=self.part,
-            surface=self.surface,
-            swap=self.swap,
-            cell_size=self.cell_size,
-            repeat_cell=self.repeat_cell,
-            resolution=self.resolution,
-            offset=self.offset,
-            phase_shift=self.phase_shift,
-        )
-
-        mesh = polydata_to_mesh(tpms.vtk_mesh)
-
-        self.density = f"{tpms.relative_density:.1%}"
-
-        # add the mesh as an object into the scene with this utility module
-        object_data_add(context, mesh, operator=self)
+        if self.background:
+            self.start_job(context)
+            return {"FINISHED"}
+        try:
+            tpms = cached_tpms(self.tpms_type(), **self.geometry_parameters())
+        except ValueError as error:  # invalid expression
+            self.report({"ERROR"}, str(error))
+            return {"CANCELLED"}
+        if not self.profile:
+            self.add_tpms(context, tpms)
+            return {"FINISHED"}
+
+        profiler = blender_tpms.tpms.Profiler(trace_memory=True)
+        tpms.profiler = profiler
+        try:
+            with profiler.activate():
+                self.add_tpms(context, tpms)
+        finally:
+            tpms.profiler = None
+        report = profiler.report()
+        logger.info("%s\n%s", self.bl_idname, report)
+        self.report({"INFO"}, report)
+        return {"FINISHED"}
 
-        attr_name = "surface"
-        mesh.attributes.new(attr_name, type="FLOAT", domain="POINT")
-        mesh.attributes[attr_name].data.foreach_set("value", tpms.vtk_mesh[attr_name])
+    def add_tpms(self, context: bpy.types.Context, tpms: Tpms) -> None:
+        """Generate the part of the geometry and add it to the scene."""
+        tpms.part = self.part
+        tpms.geometry_cache = (
+            blender_tpms.tpms.GeometryCache() if self.disk_cache else None
+        )
+        if self.target_density > 0 and self.part != "surface":
+            tpms.fit_offset(self.target_density)
+        elif tpms.offset != self.offset:
+            tpms._update_offset(self.offset)  # noqa: SLF001
+        density, _ = tpms.estimate_relative_density()
+        self.density = f"{density:.1%}"
+
+        polydata = tpms.vtk_mesh
+        with stage("polydata_to_mesh"):
+            mesh = polydata_to_mesh(polydata)
+        set_surface_attribute(mesh, polydata["surface"])
+
+        proxy_mesh = None
+        if self.proxy_resolution() is not None:
+            proxy = tpms.proxy_mesh(self.viewport_resolution)
+            with stage("polydata_to_mesh"):
+                proxy_mesh = polydata_to_mesh(proxy, mesh_name=f"{mesh.name}_proxy")
+            set_surface_attribute(proxy_mesh, proxy["surface"])
+
+        add_tpms_object(
+            context,
+            mesh,
+            proxy_mesh,
+            matrix=add_object_align_init(context, self),
+            auto_smooth=self.auto_smooth,
+            material=self.material,
+        )
 
-        if self.auto_smooth:
+    def proxy_resolution(self) -> int | None:
+        """Resolution of the mesh displayed in the viewport, if it is a proxy."""
+        if 0 < self.viewport_resolution < self.resolution:
+            return self.viewport_resolution
+        return None
+
+    def start_job(self, context: bpy.types.Context) -> None:
+        """Generate the part of the geometry in a background process."""
+        job = blender_tpms.tpms.TpmsJob(
+            self.tpms_type(),
+            {
+                **self.geometry_parameters(),
+                "part": self.part,
+                "offset": self.offset,
+            },
+            target_density=self.target_density,
+            proxy_resolution=self.proxy_resolution(),
+            disk_cache=self.disk_cache,
+        )
+        # the job started by the previous execution is replaced on redo
+        cancel_jobs(self.bl_idname)
+        job.start()
+        _JOBS.append(
+            BackgroundJob(
+                job=job,
+                operator=self.bl_idname,
+                matrix=add_object_align_init(context, self),
+                auto_smooth=self.auto_smooth,
+                material=self.material,
+            ),
+        )
+        self.density = ""
+        if not bpy.app.timers.is_registered(poll_jobs):
+            bpy.app.timers.register(poll_jobs, first_interval=_POLL_INTERVAL)
+
+
+def set_surface_attribute(mesh: bpy.types.Mesh, values: np.ndarray) -> None:
+    """Store the field values at the vertices of a mesh."""
+    with stage("attributes"):
+        mesh.attributes.new("surface", type="FLOAT", domain="POINT")
+        mesh.attributes["surface"].data.foreach_set("value", values)
+
+
+def add_tpms_object(  # noqa: PLR0913
+    context: bpy.types.Context,
+    mesh: bpy.types.Mesh,
+    proxy_mesh: bpy.types.Mesh | None = None,
+    *,
+    matrix: Matrix,
+    auto_smooth: bool,
+    material: bool,
+) -> bpy.types.Object:
+    """Add an object displaying a mesh, or its proxy mesh, to the scene."""
+    # add the mesh as an object into the scene with this utility module
+    obj = object_data_add(context, mesh)
+    obj.matrix_world = matrix
+
+    if auto_smooth:
+        with stage("auto_smooth"):
             set_shade_auto_smooth()
 
-        if self.material:
+    if material:
+        values = np.empty(len(mesh.vertices), dtype=np.float32)
+        mesh.attributes["surface"].data.foreach_get("value", values)
+        with stage("material"):
             apply_material(
                 mesh=mesh,
-                tpms=tpms,
-                attr_name=attr_name,
+                tpms=None,
+                attr_name="surface",
                 colormap="coolwarm",
                 n_colors=9,
+                value_range=(values.min(), values.max()),
             )
 
-        return {"FINISHED"}
+    if proxy_mesh is not None:
+        lod.set_lod_meshes(obj, proxy_mesh)
+        if auto_smooth:
+            with stage("auto_smooth"):
+                set_shade_auto_smooth()
+    return obj
+
+
+@dataclass
+class BackgroundJob:
+    """Job of an operator and the object added once it is done."""
+
+    job: TpmsJob
+    operator: str
+    matrix: Matrix
+    auto_smooth: bool
+    material: bool
+
+    def add_object(self, context: bpy.types.Context) -> bpy.types.Object:
+        """Add the meshes generated by the job to the scene."""
+        with self.job.result() as result:
+            mesh = triangles_to_mesh(result.mesh.points, result.mesh.faces)
+            set_surface_attribute(mesh, result.mesh.point_data["surface"])
+            proxy_mesh = None
+            if result.proxy is not None:
+                proxy_mesh = triangles_to_mesh(
+                    result.proxy.points,
+                    result.proxy.faces,
+                    mesh_name=f"{mesh.name}_proxy",
+                )
+                set_surface_attribute(proxy_mesh, result.proxy.point_data["surface"])
+        logger.info("%s: relative density %.1f%%", self.operator, 100 * result.density)
+        return add_tpms_object(
+            context,
+            mesh,
+            proxy_mesh,
+            matrix=self.matrix,
+            auto_smooth=self.auto_smooth,
+            material=self.material,
+        )
+
+
+def poll_jobs() -> float | None:
+    """Add the objects of the finished jobs, run by a timer while jobs run."""
+    for background_job in list(_JOBS):
+        state = background_job.job.poll()
+        if state == "running":
+            continue
+        _JOBS.remove(background_job)
+        if state == "done":
+            background_job.add_object(bpy.context)
+        elif state == "failed":
+            logger.error("%s: %s", background_job.operator, background_job.job.error)
+    show_progress()
+    return _POLL_INTERVAL if _JOBS else None
+
+
+def cancel_jobs(operator: str | None = None) -> None:
+    """Cancel the jobs running in the background, or the ones of an operator."""
+    for background_job in list(_JOBS):
+        if operator in (None, background_job.operator):
+            background_job.job.cancel()
+            _JOBS.remove(background_job)
+    show_progress()
+
+
+def show_progress() -> None:
+    """Show the stage of the running jobs in the status bar."""
+    workspace = bpy.context.workspace
+    if workspace is None:
+        return
+    if not _JOBS:
+        workspace.status_text_set(None)
+        return
+    stages = [background_job.job.stage or "starting" for background_job in _JOBS]
+    workspace.status_text_set(f"TPMS generation: {', '.join(stages)}")
+
+
+@lru_cache(maxsize=_CACHED_GEOMETRIES)
+def cached_tpms(tpms_class: type[Tpms], **parameters: Any) -> Tpms:  # noqa: ANN401
+    """Geometry shared by the operators, the caller sets its part and offset."""
+    return tpms_class(**parameters)
+
+
+class OperatorTpms(
+    bpy.types.Operator,
+    TpmsOperator,
+    OperatorProperties,
+    AddObjectHelper,
+    TpmsProperties,
+):
+    """Add a TPMS mesh."""
+
+    bl_idname = "mesh.tpms_add"
+    bl_label = "TPMS"
+    bl_options = {"REGISTER", "UNDO"}  # noqa: RUF012 (blender uses type hints for another purpose)
 
 
 class OperatorCylindricalTpms(
     bpy.types.Operator,
+    TpmsOperator,
     OperatorProperties,
     AddObjectHelper,
     TpmsProperties,
@@ -96,48 +335,16 @@ class OperatorCylindricalTpms(
     bl_label = "Cylindrical TPMS"
     bl_options = {"REGISTER", "UNDO"}  # noqa: RUF012 (blender uses type hints for another purpose)
 
-    def execute(self, context: bpy.types.Context) -> set[str]:
-        """Execute the operator."""
-        tpms = CylindricalTpms(
-            radius=self.radius,
-            part=self.part,
-            surface=self.surface,
-            swap=self.swap,
-            cell_size=self.cell_size,
-            repeat_cell=self.repeat_cell,
-            resolution=self.resolution,
-            offset=self.offset,
-            phase_shift=self.phase_shift,
-        )
-
-        mesh = polydata_to_mesh(tpms.vtk_mesh)
+    tpms_class = "CylindricalTpms"
 
-        self.density = f"{tpms.relative_density:.1%}"
-
-        # add the mesh as an object into the scene with this utility module
-        object_data_add(context, mesh, operator=self)
-
-        attr_name = "surface"
-        mesh.attributes.new(attr_name, type="FLOAT", domain="POINT")
-        mesh.attributes[attr_name].data.foreach_set("value", tpms.vtk_mesh[attr_name])
-
-        if self.auto_smooth:
-            set_shade_auto_smooth()
-
-        if self.material:
-            apply_material(
-                mesh=mesh,
-                tpms=tpms,
-                attr_name=attr_name,
-                colormap="coolwarm",
-                n_colors=9,
-            )
-
-        return {"FINISHED"}
+    def geometry_parameters(self) -> dict[str, Any]:
+        """Parameters of the geometry except the part and the offset."""
+        return {**super().geometry_parameters(), "radius": self.radius}
 
 
 class OperatorSphericalTpms(
     bpy.types.Operator,
+    TpmsOperator,
     OperatorProperties,
     AddObjectHelper,
     TpmsProperties,
@@ -149,97 +356,40 @@ class OperatorSphericalTpms(
     bl_label = "Spherical TPMS"
     bl_options = {"REGISTER", "UNDO"}  # noqa: RUF012 (blender uses type hints for another purpose)
 
-    def execute(self, context: bpy.types.Context) -> set[str]:
-        """Execute the operator."""
-        tpms = SphericalTpms(
-            radius=self.radius,
-            part=self.part,
-            surface=self.surface,
-            swap=self.swap,
-            cell_size=self.cell_size,
-            repeat_cell=self.repeat_cell,
-            resolution=self.resolution,
-            offset=self.offset,
-            phase_shift=self.phase_shift,
-        )
-
-        mesh = polydata_to_mesh(tpms.vtk_mesh)
-
-        self.density = f"{tpms.relative_density:.1%}"
-
-        # add the mesh as an object into the scene with this utility module
-        object_data_add(context, mesh, operator=self)
-
-        attr_name = "surface"
-        mesh.attributes.new(attr_name, type="FLOAT", domain="POINT")
-        mesh.attributes[attr_name].data.foreach_set("value", tpms.vtk_mesh[attr_name])
+    tpms_class = "SphericalTpms"
 
-        if self.auto_smooth:
-            set_shade_auto_smooth()
-
-        if self.material:
-            apply_material(
-                mesh=mesh,
-                tpms=tpms,
-                attr_name=attr_name,
-                colormap="coolwarm",
-                n_colors=9,
-            )
-
-        return {"FINISHED"}
+    def geometry_parameters(self) -> dict[str, Any]:
+        """Parameters of the geometry except the part and the offset."""
+        return {**super().geometry_parameters(), "radius": self.radius}
 
 
-# class OperatorGradedTpms(
-#     bpy.types.Operator,
-#     OperatorProperties,
-#     AddObjectHelper,
-#     TpmsGradingProperties,
-#     TpmsProperties,
-# ):
-#     """Add a Graded TPMS mesh"""
-
-#     bl_idname = "mesh.graded_tpms_add"
-#     bl_label = "Graded TPMS"
-#     bl_options = {"REGISTER", "UNDO"}  # noqa: RUF012 (blender uses type hints for another purpose)
-
-#     def execute(self, context):
-#         tpms = GradedTpms(
-#             self.part,
-#             self.surface,
-#             self.swap,
-#             self.cell_size,
-#             self.repeat_cell,
-#             self.resolution,
-#             self.offset,
-#             self.phase_shift,
-#             self.offset_grading,
-#             self.edges,
-#         )
-
-#         mesh = polydata_to_mesh(tpms.vtk_mesh)
-
-#         self.density = f"{tpms.relative_density:.1%}"
-
-#         # add the mesh as an object into the scene with this utility module
-#         object_data_add(context, mesh, operator=self)
-
-#         attr_name = "surface"
-#         mesh.attributes.new(attr_name, type="FLOAT", domain="POINT")
-#         mesh.attributes[attr_name].data.foreach_set("value", tpms.vtk_mesh[attr_name])
+class OperatorGradedTpms(
+    bpy.types.Operator,
+    TpmsOperator,
+    OperatorProperties,
+    AddObjectHelper,
+    TpmsGradingProperties,
+    TpmsProperties,
+):
+    """Add a Graded TPMS mesh."""
 
-#         if self.auto_smooth:
-#             set_shade_auto_smooth()
+    bl_idname = "mesh.graded_tpms_add"
+    bl_label = "Graded TPMS"
+    bl_options = {"REGISTER", "UNDO"}  # noqa: RUF012 (blender uses type hints for another purpose)
 
-#         if self.material:
-#             apply_material(
-#                 mesh=mesh,
-#                 tpms=tpms,
-#                 attr_name=attr_name,
-#                 colormap="coolwarm",
-#                 n_colors=9,
-#             )
+    tpms_class = "GradedTpms"
 
-#         return {"FINISHED"}
+    def geometry_parameters(self) -> dict[str, Any]:
+        """Parameters of the geometry except the part and the offset."""
+        surface_blend = self.surface_blend.strip() or None
+        return {
+            **super().geometry_parameters(),
+            "offset_grading": self.offset_grading.strip() or None,
+            "cell_size_grading": self.cell_size_grading.strip() or None,
+            "blend_surface": self.blend_surface if surface_blend else None,
+            "surface_blend": surface_blend,
+            "control_points": self.control_points,
+        }
 
 
 # class OperatorGradedCylindricalTpms(
@@ -276,17 +426,57 @@ class OBJECT_MT_tpms_submenu(bpy.types.Menu):  # noqa: N801
         layout.operator(OperatorTpms.bl_idname, icon="MESH_CUBE")
         layout.operator(OperatorCylindricalTpms.bl_idname, icon="MESH_CYLINDER")
         layout.operator(OperatorSphericalTpms.bl_idname, icon="MESH_UVSPHERE")
-        # layout.operator(OperatorGradedTpms.bl_idname, icon='MESH_CUBE')
+        layout.operator(OperatorGradedTpms.bl_idname, icon="MESH_CUBE")
+        layout.operator(OperatorCancelTpmsJobs.bl_idname, icon="CANCEL")
         # layout.operator(OperatorGradedCylindricalTpms.bl_idname, icon='MESH_CYLINDER')
 
 
+class OperatorCancelTpmsJobs(bpy.types.Operator):
+    """Cancel the TPMS generations running in the background."""
+
+    bl_idname = "mesh.tpms_cancel_jobs"
+    bl_label = "Cancel TPMS Generation"
+
+    @classmethod
+    def poll(cls, _: bpy.types.Context) -> bool:
+        """Enable the operator while jobs run."""
+        return bool(_JOBS)
+
+    def execute(self, _: bpy.types.Context) -> set[str]:
+        """Execute the operator."""
+        cancel_jobs()
+        return {"FINISHED"}
+
+
+class OBJECT_PT_tpms_lod(bpy.types.Panel):  # noqa: N801
+    """Panel of the meshes of a TPMS object."""
+
+    bl_label = "TPMS"
+    bl_idname = "OBJECT_PT_tpms_lod"
+    bl_space_type = "PROPERTIES"
+    bl_region_type = "WINDOW"
+    bl_context = "object"
+
+    @classmethod
+    def poll(cls, context: bpy.types.Context) -> bool:
+        """Show the panel for the objects having a proxy mesh."""
+        return context.object is not None and context.object.tpms_lod.full_mesh
+
+    def draw(self, context: bpy.types.Context) -> None:
+        """Draw the panel."""
+        self.layout.prop(context.object.tpms_lod, "display", expand=True)
+
+
 def register() -> None:
     """Register the UI elements."""
+    lod.register()
+    bpy.utils.register_class(OBJECT_PT_tpms_lod)
     bpy.utils.register_class(OBJECT_MT_tpms_submenu)
     bpy.utils.register_class(OperatorTpms)
     bpy.utils.register_class(OperatorCylindricalTpms)
     bpy.utils.register_class(OperatorSphericalTpms)
-    # bpy.utils.register_class(OperatorGradedTpms)
+    bpy.utils.register_class(OperatorGradedTpms)
+    bpy.utils.register_class(OperatorCancelTpmsJobs)
     # bpy.utils.register_class(OperatorGradedCylindricalTpms)
     bpy.types.VIEW3D_MT_mesh_add.append(menu_func)
 
@@ -297,6 +487,13 @@ def unregister() -> None:
     bpy.utils.unregister_class(OperatorTpms)
     bpy.utils.unregister_class(OperatorCylindricalTpms)
     bpy.utils.unregister_class(OperatorSphericalTpms)
-    # bpy.utils.unregister_class(OperatorGradedTpms)
+    bpy.utils.unregister_class(OperatorGradedTpms)
+    bpy.utils.unregister_class(OperatorCancelTpmsJobs)
     # bpy.utils.unregister_class(OperatorGradedCylindricalTpms)
     bpy.types.VIEW3D_MT_mesh_add.remove(menu_func)
+    bpy.utils.unregister_class(OBJECT_PT_tpms_lod)
+    lod.unregister()
+    cancel_jobs()
+    if bpy.app.timers.is_registered(poll_jobs):
+        bpy.app.timers.unregister(poll_jobs)
+    cached_tpms.cache_clear()
@@ -0,0 +1,112 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+import pyvista as pv
+from blender_tpms.tpms import GeometryCache, Tpms, surfaces
+from blender_tpms.tpms.cache import (
+    CACHE_VERSION,
+    cache_directory,
+    geometry_key,
+    load_arrays,
+    save_arrays,
+)
+
+
+@pytest.fixture(autouse=True)
+def _cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BLENDER_TPMS_CACHE", str(tmp_path))
+
+
+def test_cache_directory(tmp_path: Path) -> None:
+    assert cache_directory() == tmp_path / f"v{CACHE_VERSION}"
+
+
+def test_save_load_arrays() -> None:
+    assert load_arrays("arrays") is None
+
+    save_arrays("arrays", {"a": np.arange(3), "b": np.eye(2)})
+    arrays = load_arrays("arrays")
+
+    assert set(arrays) == {"a", "b"}
+    np.testing.assert_array_equal(arrays["a"], np.arange(3))
+    assert list(cache_directory().iterdir()) == [cache_directory() / "arrays.npz"]
+
+
+def test_load_corrupted_arrays() -> None:
+    cache_directory().mkdir(parents=True)
+    (cache_directory() / "arrays.npz").write_bytes(b"not an archive")
+
+    assert load_arrays("arrays") is None
+
+
+def test_geometry_key() -> None:
+    parameters = {"surface_function": surfaces.gyroid, "cell_size": np.ones(3)}
+    key = geometry_key(parameters)
+
+    assert key == geometry_key(dict(reversed(parameters.items())))
+    assert key != geometry_key({**parameters, "cell_size": np.full(3, 2.0)})
+    with pytest.raises(TypeError, match="hash"):
+        geometry_key({"offset": object()})
+
+
+def test_geometry_cache() -> None:
+    cache = GeometryCache()
+    mesh = Tpms(part="sheet", resolution=12).vtk_mesh
+    assert cache.load("sheet") is None
+
+    cache.store("sheet", mesh)
+    loaded = cache.load("sheet")
+
+    np.testing.assert_array_equal(loaded.points, mesh.points)
+    np.testing.assert_array_equal(loaded.faces, mesh.faces)
+    np.testing.assert_array_equal(loaded["surface"], mesh["surface"])
+
+    cache.store("empty", pv.PolyData())
+    assert cache.load("empty").n_points == 0
+
+
+def test_geometry_cache_empty_mesh() -> None:
+    cache = GeometryCache()
+    mesh = pv.PolyData(np.empty((0, 3)))
+    for name in ("surface", "lower_surface", "upper_surface"):
+        mesh.point_data[name] = np.empty(0)
+
+    cache.store("empty", mesh)
+    loaded = cache.load("empty")
+
+    assert loaded.n_points == 0
+    assert set(loaded.point_data) == set(mesh.point_data)
+    assert len(loaded["surface"]) == 0
+
+
+def test_geometry_cache_eviction() -> None:
+    mesh = Tpms(part="sheet", resolution=12).vtk_mesh
+    cache = GeometryCache()
+    cache.store("first", mesh)
+    cache.store("second", mesh)
+    size = sum(file.stat().st_size for file in cache.directory.rglob("*.npy"))
+    os.utime(cache.directory / "first", (0, 0))
+    cache.load("second")
+
+    cache.max_bytes = size + 1
+    cache.store("third", mesh)
+
+    assert sorted(path.name for path in cache.directory.iterdir()) == [
+        "second",
+        "third",
+    ]
+
+
+def test_tpms_geometry_cache() -> None:
+    cache = GeometryCache()
+    Tpms(part="sheet", resolution=12, geometry_cache=cache).vtk_mesh  # noqa: B018
+    tpms = Tpms(part="sheet", resolution=12, geometry_cache=cache)
+    mesh = tpms.vtk_mesh
+
+    assert mesh.n_cells > 0
+    assert "field" not in tpms.cache_misses
+    tpms.offset = 0.2
+    assert tpms.vtk_mesh.n_cells != mesh.n_cells
+    assert len(list(cache.directory.iterdir())) == 2  # noqa: PLR2004
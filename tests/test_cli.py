@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+
+import pytest
+import pyvista as pv
+from blender_tpms.cli import DENSITIES, Sweep, Variant, main, run_sweep
+
+
+def test_sweep() -> None:
+    sweep = Sweep.from_dict(
+        {
+            "surfaces": ["gyroid", "cos(x) + cos(y)"],
+            "offsets": [0.3, 0.5],
+            "cell_sizes": [1, [1, 1, 2]],
+            "repeats": [2],
+        },
+    )
+    variants = list(sweep.variants())
+
+    assert len(variants) == 8
+    assert variants[1] == Variant("gyroid", 0.3, (1.0, 1.0, 2.0), (2, 2, 2))
+    assert variants[1].name == "gyroid_sheet_o0.3_c1x1x2_r2x2x2_n20"
+    assert variants[-1].name.startswith("expression_")
+
+
+@pytest.mark.parametrize(
+    ("spec", "match"),
+    [
+        ({"surfaces": ["gyroid"]}, "offsets"),
+        ({"surfaces": ["gyroid"], "offsets": [0.3], "size": 1}, "unknown keys"),
+        ({"surfaces": ["gyroid"], "offsets": [0.3], "repeats": [[1, 2]]}, "three"),
+        ({"surfaces": ["gyroid"], "offsets": [0.3], "part": "core"}, "part"),
+        ({"surfaces": ["cos(w)"], "offsets": [0.3]}, "unknown name"),
+    ],
+)
+def test_sweep_errors(spec: dict, match: str) -> None:
+    with pytest.raises(ValueError, match=match):
+        Sweep.from_dict(spec)
+
+
+def test_run_sweep(tmp_path: Path) -> None:
+    sweep = Sweep.from_dict(
+        {"surfaces": ["gyroid"], "offsets": [0.3, 0.5], "resolution": 10},
+    )
+
+    assert run_sweep(sweep, tmp_path, "ply", workers=2) == (2, 0, 0)
+    mesh = pv.read(tmp_path / "gyroid_sheet_o0.3_c1x1x1_r1x1x1_n10.ply")
+    assert mesh.n_cells > 0
+    (tmp_path / "gyroid_sheet_o0.5_c1x1x1_r1x1x1_n10.ply").unlink()
+    assert run_sweep(sweep, tmp_path, "ply", workers=1) == (1, 1, 0)
+    rows = (tmp_path / DENSITIES).read_text().splitlines()
+    assert len(rows) == 3
+    assert rows[1].startswith(
+        "gyroid_sheet_o0.3_c1x1x1_r1x1x1_n10.ply,gyroid,sheet,0.3,",
+    )
+
+
+@pytest.mark.parametrize(
+    "change",
+    [{"part": "lower_skeletal"}, {"resolution": 12}],
+)
+def test_run_sweep_changed_parameters(tmp_path: Path, change: dict) -> None:
+    spec = {"surfaces": ["gyroid"], "offsets": [0.5], "resolution": 8}
+    assert run_sweep(Sweep.from_dict(spec), tmp_path, workers=1) == (1, 0, 0)
+
+    changed = Sweep.from_dict({**spec, **change})
+    assert run_sweep(changed, tmp_path, workers=1) == (1, 0, 0)
+    assert len(list(tmp_path.glob("*.stl"))) == 2
+
+
+def test_main(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    spec = tmp_path / "sweep.json"
+    spec.write_text(json.dumps({"surfaces": ["schwarzP"], "offsets": [0.4]}))
+
+    assert main([str(spec), "--output", str(tmp_path / "out"), "--workers", "1"]) == 0
+    assert (tmp_path / "out" / "schwarzP_sheet_o0.4_c1x1x1_r1x1x1_n20.stl").exists()
+    spec.write_text(json.dumps({"surfaces": ["schwarzP"]}))
+    with pytest.raises(SystemExit):
+        main([str(spec)])
+    assert "offsets" in capsys.readouterr().err
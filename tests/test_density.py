@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from blender_tpms.tpms import Tpms
+from blender_tpms.tpms.cache import load_arrays
+from blender_tpms.tpms.density import (
+    PARTS,
+    build_density_tables,
+    estimate_density,
+    offset_for_density,
+)
+
+
+def test_estimate_density_linear_field() -> None:
+    axes = [
+        np.linspace(0.0, 1.0, 5),
+        np.linspace(0.0, 2.0, 7),
+        np.linspace(0.0, 1.0, 9),
+    ]
+    x, y, z = np.meshgrid(*axes, indexing="ij")
+
+    density, error = estimate_density(
+        [(0.3 + 0.2 * x - z, 1), (z - 0.1, 1)],
+        axes,
+        lambda x, y: np.ones(np.broadcast(x, y).shape),
+    )
+
+    # 0.1 < z < 0.3 + 0.2 * x, integrated over x in [0, 1]
+    assert density == pytest.approx(0.3, abs=1e-12)
+    assert error == pytest.approx(0.0, abs=1e-12)
+
+
+def test_estimate_density_weights() -> None:
+    axes = [
+        np.linspace(0.0, 1.0, 3),
+        np.linspace(0.0, 1.0, 3),
+        np.linspace(0.0, 1.0, 3),
+    ]
+    _, _, z = np.meshgrid(*axes, indexing="ij")
+    fields = [(0.5 - z, 1)]
+
+    uniform, _ = estimate_density(fields, axes, lambda x, y: 1.0)
+    weighted, _ = estimate_density(fields, axes, lambda x, y: x + y)
+
+    assert uniform == pytest.approx(0.5)
+    assert weighted == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("part", PARTS)
+def test_offset_for_density(
+    part: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("BLENDER_TPMS_CACHE", str(tmp_path))
+    offset = offset_for_density("gyroid", part, 0.3)
+    tpms = Tpms(part=part, offset=offset, resolution=48)
+
+    assert tpms.estimate_relative_density()[0] == pytest.approx(0.3, abs=1e-2)
+    assert load_arrays("density-gyroid") is not None
+
+    with pytest.raises(ValueError, match="density"):
+        offset_for_density("gyroid", part, 1.0)
+    with pytest.raises(ValueError, match="part"):
+        offset_for_density("gyroid", "surface", 0.3)
+
+
+def test_build_density_tables(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BLENDER_TPMS_CACHE", str(tmp_path))
+    build_density_tables(["gyroid", "schwarzP"], workers=2)
+
+    tables = load_arrays("density-schwarzP")
+    assert set(tables) == {"offset", *PARTS}
+    assert np.all(np.diff(tables["sheet"]) >= 0)
+    assert np.all(np.diff(tables["lower_skeletal"]) <= 0)
@@ -0,0 +1,183 @@
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+from blender_tpms.tpms import Tpms, surfaces
+from blender_tpms.tpms.cache import cache_directory, geometry_key
+from blender_tpms.tpms.expression import compile_expression, surface_function
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "sin(x) * cos(y) + sin(y) * cos(z) + sin(z) * cos(x)",
+        "sin(x) * cos(y) + cos(z) * sin(y) + cos(x) * sin(z) + 0 * cos(2 * x)",
+        "(sin(x) * cos(y) + sin(y) * cos(z) + sin(z) * cos(x)) / 1",
+    ],
+)
+def test_expression_series(text: str) -> None:
+    expression = compile_expression(text)
+    x, y, z = np.random.default_rng(0).uniform(-np.pi, np.pi, (3, 4, 5, 6))
+
+    assert expression.series is not None
+    np.testing.assert_allclose(expression(x, y, z), surfaces.gyroid(x, y, z))
+
+
+def test_expression_series_harmonics() -> None:
+    expression = compile_expression("cos(-2 * x) - sin(-y * 3) / 2 + 2**2 - pi")
+
+    assert dict(map(reversed, expression.series.terms)) == {
+        (("cos", 0), ("sin", 3), ("cos", 0)): 0.5,
+        (("cos", 2), ("cos", 0), ("cos", 0)): 1.0,
+        (("cos", 0), ("cos", 0), ("cos", 0)): 4 - np.pi,
+    }
+
+
+@pytest.mark.parametrize(
+    ("text", "function"),
+    [
+        (
+            "sqrt(x**2 + y**2) - 1 + sin(x)**2 + sqrt(y*y + x*x)",
+            lambda x, y, _: 2 * np.sqrt(x**2 + y**2) - 1 + np.sin(x) ** 2,
+        ),
+        (
+            "max(abs(x), abs(y)) * exp(-z)",
+            lambda x, y, z: np.maximum(abs(x), abs(y)) * np.exp(-z),
+        ),
+        ("cos(x + 1) * e", lambda x, _, __: np.cos(x + 1) * np.e),
+        ("abs(x) ** 2.5 - (-2.5) ** 2", lambda x, _, __: abs(x) ** 2.5 - 6.25),
+    ],
+)
+def test_expression_kernel(text: str, function: callable) -> None:
+    expression = compile_expression(text)
+    x, y, z = np.meshgrid(*[np.linspace(-1, 1, 5)] * 3, indexing="ij", sparse=True)
+
+    assert expression.series is None
+    field = expression(x, y, z)
+    assert field.shape == (5, 5, 5)
+    np.testing.assert_allclose(field, np.broadcast_to(function(x, y, z), field.shape))
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "sin(x) * cos(2 * y) + cos(x) ** 2 - sin(z) ** 3",
+        "tanh(x * y) + arctan(z) - sinh(x / 3) + cosh(y - z)",
+        "exp(-x**2) * sqrt(abs(y)) + log(2 + cos(z)) / (2 + sin(x))",
+        "arcsin(sin(x) / 2) + arccos(cos(y) / 2) + min(x, y) - max(y, z)",
+        "abs(x) ** 0.5 - 1 / (y ** 2 + 1) + tan(z / 8) + arctan2(y, x) + pi * e",
+    ],
+)
+def test_expression_bounds(text: str) -> None:
+    expression = compile_expression(text)
+    rng = np.random.default_rng(0)
+    lower = rng.uniform(-3, 3, (3, 20))
+    upper = lower + rng.uniform(0, 1.5, (3, 20))
+
+    low, high = expression.bounds(lower, upper)
+    fractions = np.linspace(0, 1, 9)[:, None]
+    samples = [
+        expression(
+            *(
+                a + fractions[index] * (b - a)
+                for a, b, index in zip(lower, upper, indices)
+            ),
+        )
+        for indices in np.ndindex(9, 9, 9)
+    ]
+    tolerance = 1e-12
+    assert low.shape == (20,)
+    assert np.all(low <= np.min(samples, axis=0) + tolerance)
+    assert np.all(high >= np.max(samples, axis=0) - tolerance)
+
+
+def test_expression_bounds_undefined() -> None:
+    expression = compile_expression("sqrt(x) + y ** z")
+    low, high = expression.bounds([-1.0, 0.0, 1.0], [1.0, 1.0, 2.0])
+
+    assert np.isnan(low)
+    assert np.isnan(high)
+
+
+def test_expression_common_subterms() -> None:
+    kernel = compile_expression("sqrt(x*x + y*y) + sin(sqrt(y*y + x*x))")._kernel
+
+    assert kernel.__code__.co_varnames.count("t0") == 1
+    # x*x, y*y, their sum, the square root, its sine and the result
+    assert len([name for name in kernel.__code__.co_varnames if name[0] == "t"]) == 6
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "__import__('os').system('ls')",
+        "x.real",
+        "sin",
+        "sin(x, y)",
+        "sin(x=1)",
+        "foo(x)",
+        "w + 1",
+        "x if y else z",
+        "x < y",
+        "[x]",
+        "lambda: x",
+        "'x'",
+        "1e999",
+        "10.0 ** 1000",
+        "1" + "0" * 400 + " + cos(x)",
+        "sin(x",
+        "x" * 3000,
+    ],
+)
+def test_expression_rejected(text: str) -> None:
+    with pytest.raises(ValueError, match="expression|unknown|unsupported|argument"):
+        compile_expression(text)
+
+
+def test_expression_large_frequency() -> None:
+    expression = compile_expression("sin(1e20 * x) + cos(y)")
+    x, y, z = np.random.default_rng(0).uniform(-np.pi, np.pi, (3, 4, 5, 6))
+
+    assert expression.series is None
+    np.testing.assert_allclose(
+        expression(x, y, z),
+        np.sin(1e20 * x) + np.cos(y),
+    )
+
+
+def test_expression_cache_and_pickle() -> None:
+    expression = compile_expression("cos(x) + cos(y) + 0.5 * cos(z)")
+
+    assert compile_expression("cos(x) + cos(y) + 0.5 * cos(z)") is expression
+    assert pickle.loads(pickle.dumps(expression)) is expression
+    assert surface_function("gyroid") is surfaces.gyroid
+    assert surface_function("cos(x) + cos(y) + 0.5 * cos(z)") is expression
+    assert geometry_key({"surface_function": expression}) != geometry_key(
+        {"surface_function": compile_expression("cos(x) + cos(y) + 0.6 * cos(z)")},
+    )
+
+
+def test_tpms_expression() -> None:
+    kwargs = {"part": "sheet", "offset": 0.5, "resolution": 12}
+    custom = Tpms(surface="cos(x) + cos(y) + cos(z)", **kwargs)
+    builtin = Tpms(surface="schwarzP", **kwargs)
+
+    np.testing.assert_allclose(custom.grid["surface"], builtin.grid["surface"])
+    assert custom.sheet.n_cells == builtin.sheet.n_cells
+    with pytest.raises(ValueError, match="unknown name"):
+        Tpms(surface="gyroide")
+
+
+def test_tpms_expression_fit_offset(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("BLENDER_TPMS_CACHE", str(tmp_path))
+    tpms = Tpms(surface="cos(x) + cos(y) + cos(z)", part="sheet", resolution=16)
+    tpms.fit_offset(0.3)
+
+    assert tpms.estimate_relative_density()[0] == pytest.approx(0.3, abs=1e-4)
+    tables = [path.name for path in cache_directory().glob("density-*")]
+    assert tables == [f"density-{tpms.surface_function.__name__}.npz"]
+    assert tables[0].startswith("density-expression-")
@@ -0,0 +1,109 @@
+from inspect import getmembers, isfunction
+from typing import Callable
+
+import numpy as np
+import pytest
+from blender_tpms.tpms import Tpms, surfaces
+from blender_tpms.tpms.expression import compile_expression
+from blender_tpms.tpms.field import evaluate
+
+
+@pytest.mark.parametrize(
+    "surface_function",
+    [func[1] for func in getmembers(surfaces, isfunction)],
+)
+def test_separable_evaluation(surface_function: Callable) -> None:
+    """Test that the separable evaluation matches the dense one."""
+    axes = [np.linspace(-np.pi, np.pi, n) for n in (7, 8, 9)]
+    dense = evaluate(surface_function, axes, evaluation="dense")
+    separable = evaluate(surface_function, axes, evaluation="separable")
+
+    assert separable.shape == (7, 8, 9)
+    np.testing.assert_array_equal(separable, dense)
+
+
+def test_invalid_evaluation() -> None:
+    with pytest.raises(ValueError, match="evaluation"):
+        evaluate(surfaces.gyroid, [np.zeros(2)] * 3, evaluation="unknown")
+
+
+@pytest.mark.parametrize("swap", ["XYZ", "ZXY", "YZX"])
+def test_tpms_evaluations(swap: str) -> None:
+    """Test that the Tpms field does not depend on the evaluation mode."""
+    kwargs = {
+        "surface": "fischerKochS",
+        "swap": swap,
+        "cell_size": (1.0, 2.0, 1.5),
+        "repeat_cell": (1, 2, 3),
+        "resolution": 6,
+        "phase_shift": (0.1, 0.2, 0.3),
+    }
+    dense = Tpms(evaluation="dense", **kwargs).grid["surface"]
+    separable = Tpms(evaluation="separable", **kwargs).grid["surface"]
+
+    np.testing.assert_array_equal(separable, dense)
+
+
+@pytest.mark.parametrize("n_points", [9, 17, 30])
+@pytest.mark.parametrize("band", [0.0, 0.4])
+def test_narrow_band_evaluation(n_points: int, band: float) -> None:
+    """Test that the culled points keep their side of the band."""
+    function = compile_expression("tanh(2 * (sin(x) * cos(y) + cos(z))) + 0.1 * x")
+    axes = [np.linspace(-2 * np.pi, 2 * np.pi, n) for n in (n_points, 21, 25)]
+    separable = evaluate(function, axes, evaluation="separable")
+    narrow_band = evaluate(
+        function,
+        axes,
+        evaluation="narrow_band",
+        band=band,
+        block_size=2,
+    )
+
+    assert narrow_band.shape == separable.shape
+    in_band = np.abs(separable) <= band
+    np.testing.assert_array_equal(narrow_band[in_band], separable[in_band])
+    assert np.all(np.sign(narrow_band - band) == np.sign(separable - band))
+    assert np.all(np.sign(narrow_band + band) == np.sign(separable + band))
+    assert np.any(narrow_band != separable)
+
+
+def test_narrow_band_series() -> None:
+    """Test that the series are evaluated separably."""
+    axes = [np.linspace(-np.pi, np.pi, 20)] * 3
+    narrow_band = evaluate(surfaces.gyroid, axes, evaluation="narrow_band", band=0.1)
+
+    np.testing.assert_array_equal(narrow_band, evaluate(surfaces.gyroid, axes))
+
+
+@pytest.mark.parametrize("part", ["sheet", "skeletals", "surface"])
+def test_tpms_narrow_band(part: str) -> None:
+    """Test that the parts extracted from the narrow band are unchanged."""
+    kwargs = {
+        "surface": "tanh(2 * (sin(x) * cos(y) + sin(y) * cos(z) + sin(z) * cos(x)))",
+        "part": part,
+        "repeat_cell": (2, 1, 2),
+        "resolution": 16,
+        "offset": 0.5,
+    }
+    separable = Tpms(**kwargs).vtk_mesh
+    narrow_band = Tpms(evaluation="narrow_band", **kwargs).vtk_mesh
+
+    np.testing.assert_array_equal(narrow_band.points, separable.points)
+    np.testing.assert_array_equal(narrow_band.faces, separable.faces)
+
+
+def test_tpms_narrow_band_offset() -> None:
+    """Test that the field is evaluated again when the offset leaves the band."""
+    kwargs = {"surface": "tanh(sin(x) * cos(y) + sin(y) * cos(z) + sin(z) * cos(x))"}
+    tpms = Tpms(evaluation="narrow_band", offset=0.3, **kwargs)
+    tpms.sheet
+    tpms.offset = 0.2
+    tpms.sheet
+    assert tpms.cache_misses["field"] == 1
+
+    tpms.offset = 0.8
+    np.testing.assert_array_equal(
+        tpms.sheet.points,
+        Tpms(offset=0.8, **kwargs).sheet.points,
+    )
+    assert tpms.cache_misses["field"] == 2
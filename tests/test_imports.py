@@ -0,0 +1,32 @@
+import subprocess
+import sys
+from inspect import getmembers, isfunction
+
+from blender_tpms.tpms import surfaces
+from blender_tpms.tpms.registry import SURFACE_NAMES
+
+# the modules loaded on the first generation, not when registering
+REGISTER = """
+import sys
+import bpy
+import blender_tpms
+blender_tpms.register()
+heavy = ("pyvista", "matplotlib")
+heavy += ("blender_tpms.tpms.tpms", "blender_tpms.tpms.surfaces")
+print(*(name for name in sys.modules if name.split(".")[0] in heavy or name in heavy))
+blender_tpms.unregister()
+"""
+
+
+def test_surface_names() -> None:
+    assert SURFACE_NAMES == tuple(name for name, _ in getmembers(surfaces, isfunction))
+
+
+def test_register_without_heavy_imports() -> None:
+    process = subprocess.run(
+        [sys.executable, "-c", REGISTER],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert process.stdout.split() == []
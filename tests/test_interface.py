@@ -1,3 +1,4 @@
+import numpy as np
 import pyvista as pv
 from blender_tpms.interface import get_all_surfaces, polydata_to_mesh
 
@@ -13,6 +14,22 @@ def test_polydata_to_mesh() -> None:
     assert len(mesh.polygons) == 12
 
 
+def test_polydata_to_mesh_winding() -> None:
+    """Test that the winding is reversed without modifying the polydata."""
+    polydata = pv.Cube().triangulate()
+    faces = polydata.faces.copy()
+    mesh = polydata_to_mesh(polydata, mesh_name="Winding")
+
+    np.testing.assert_array_equal(polydata.faces, faces)
+    triangles = np.array([polygon.vertices[:] for polygon in mesh.polygons])
+    np.testing.assert_array_equal(triangles, faces.reshape(-1, 4)[:, :0:-1])
+    np.testing.assert_allclose(
+        [vertex.co[:] for vertex in mesh.vertices],
+        polydata.points,
+    )
+    assert not mesh.validate()
+
+
 def test_get_all_surfaces() -> None:
     """Test get_all_surfaces function."""
     surfaces = get_all_surfaces()
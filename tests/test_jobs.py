@@ -0,0 +1,90 @@
+import queue
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from blender_tpms.tpms import SphericalTpms, Tpms, TpmsJob, jobs
+from blender_tpms.tpms import tpms as tpms_module
+
+
+@pytest.fixture(autouse=True)
+def _cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BLENDER_TPMS_CACHE", str(tmp_path))
+
+
+def wait(job: TpmsJob) -> str:
+    while job.poll() == "running":
+        time.sleep(0.01)
+    return job.state
+
+
+def test_job() -> None:
+    job = TpmsJob(
+        Tpms,
+        {"part": "lower_skeletal", "resolution": 12, "offset": 0.4},
+        proxy_resolution=6,
+    )
+    assert job.state == "pending"
+    job.start()
+
+    assert wait(job) == "done"
+    assert "lower_skeletal/clip_scalar" in job.stages
+    tpms = Tpms(part="lower_skeletal", resolution=12, offset=0.4)
+    with job.result() as result:
+        np.testing.assert_allclose(result.mesh.points, tpms.lower_skeletal.points)
+        np.testing.assert_array_equal(
+            result.mesh.faces,
+            tpms.lower_skeletal.faces.reshape(-1, 4)[:, 1:],
+        )
+        assert set(result.mesh.point_data) == {
+            "surface",
+            "lower_surface",
+            "upper_surface",
+        }
+        assert result.proxy.points.shape == tpms.proxy_mesh(6).points.shape
+        assert result.density == tpms.estimate_relative_density()[0]
+    with pytest.raises(RuntimeError, match="cannot be read"), job.result():
+        pass
+
+
+def test_job_target_density() -> None:
+    job = TpmsJob(SphericalTpms, {"resolution": 10}, target_density=0.3)
+    job.start()
+
+    assert wait(job) == "done"
+    with job.result() as result:
+        assert result.density == pytest.approx(0.3, abs=0.01)
+        assert result.proxy is None
+
+
+def test_job_result_without_shared_memory(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(tpms_module, "_SHARED_MEMORY", False)
+    messages = queue.Queue()
+    jobs._generate(messages, Tpms, {"resolution": 8}, 0.0, 4, False)
+    kind, value = messages.get_nowait()
+    while kind == "stage":
+        kind, value = messages.get_nowait()
+
+    job = TpmsJob(Tpms, {"resolution": 8})
+    job.state, (job._density, job._shared) = kind, value
+    with job.result() as result:
+        assert len(result.mesh.points) == Tpms(resolution=8).sheet.n_points
+        assert result.proxy is not None
+
+
+def test_job_cancel() -> None:
+    job = TpmsJob(Tpms, {"resolution": 200, "repeat_cell": 4})
+    job.start()
+    job.cancel()
+
+    assert job.state == "cancelled"
+    assert job.poll() == "cancelled"
+
+
+def test_job_error() -> None:
+    job = TpmsJob(Tpms, {"surface": "cos(w)"})
+    job.start()
+
+    assert wait(job) == "failed"
+    assert "unknown name" in job.error
@@ -1,7 +1,26 @@
+import time
+from pathlib import Path
+
 import blender_tpms.tpms
 import bpy
+import pytest
+from blender_tpms import lod
 from blender_tpms.interface import polydata_to_mesh
-from blender_tpms.ui import apply_material, set_shade_auto_smooth
+from blender_tpms.tpms.cache import cache_directory
+from blender_tpms.ui import (
+    OperatorCancelTpmsJobs,
+    OperatorGradedTpms,
+    OperatorTpms,
+    apply_material,
+    cached_tpms,
+    poll_jobs,
+    set_shade_auto_smooth,
+)
+
+
+@pytest.fixture(autouse=True)
+def _cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BLENDER_TPMS_CACHE", str(tmp_path))
 
 
 def test_auto_smooth() -> None:
@@ -33,3 +52,159 @@ def test_apply_material() -> None:
         colormap="coolwarm",
         n_colors=9,
     )
+
+
+def test_operator_float32() -> None:
+    bpy.utils.register_class(OperatorTpms)
+    try:
+        assert bpy.ops.mesh.tpms_add(dtype="float32") == {"FINISHED"}
+    finally:
+        bpy.utils.unregister_class(OperatorTpms)
+
+
+def test_operator_redo() -> None:
+    bpy.utils.register_class(OperatorTpms)
+    cached_tpms.cache_clear()
+    try:
+        bpy.ops.mesh.tpms_add(offset=0.3)
+        bpy.ops.mesh.tpms_add(offset=0.5, part="lower_skeletal")
+        bpy.ops.mesh.tpms_add(offset=0.5, part="lower_skeletal", auto_smooth=False)
+    finally:
+        bpy.utils.unregister_class(OperatorTpms)
+
+    cache_info = cached_tpms.cache_info()
+    assert (cache_info.hits, cache_info.misses) == (2, 1)
+    tpms = cached_tpms(
+        blender_tpms.tpms.Tpms,
+        surface="gyroid",
+        swap="XYZ",
+        cell_size=(1.0, 1.0, 1.0),
+        repeat_cell=(1, 1, 1),
+        resolution=10,
+        phase_shift=(0.0, 0.0, 0.0),
+        dtype="float64",
+    )
+    assert tpms.cache_misses["field"] == 1
+    assert tpms.cache_misses["lower_skeletal"] == 1
+    assert tpms.offset == 0.5
+
+
+def test_operator_disk_cache() -> None:
+    bpy.utils.register_class(OperatorTpms)
+    cached_tpms.cache_clear()
+    try:
+        bpy.ops.mesh.tpms_add(part="upper_skeletal", disk_cache=True)
+        cached_tpms.cache_clear()
+        bpy.ops.mesh.tpms_add(part="upper_skeletal", disk_cache=True)
+        bpy.ops.mesh.tpms_add(part="upper_skeletal", resolution=11)
+    finally:
+        bpy.utils.unregister_class(OperatorTpms)
+
+    assert len(list((cache_directory() / "geometry").iterdir())) == 1
+
+
+def test_operator_profile(caplog: pytest.LogCaptureFixture) -> None:
+    bpy.utils.register_class(OperatorTpms)
+    cached_tpms.cache_clear()
+    try:
+        with caplog.at_level("INFO", logger="blender_tpms.ui"):
+            assert bpy.ops.mesh.tpms_add(profile=True, resolution=12) == {"FINISHED"}
+    finally:
+        bpy.utils.unregister_class(OperatorTpms)
+
+    assert "polydata_to_mesh" in caplog.text
+    assert "sheet" in caplog.text
+
+
+def test_operator_expression() -> None:
+    bpy.utils.register_class(OperatorTpms)
+    cached_tpms.cache_clear()
+    try:
+        result = bpy.ops.mesh.tpms_add(expression="cos(x) + cos(y) + 0.5 * cos(z)")
+        with pytest.raises(RuntimeError, match="unknown name"):
+            bpy.ops.mesh.tpms_add(expression="cos(w)")
+    finally:
+        bpy.utils.unregister_class(OperatorTpms)
+
+    assert result == {"FINISHED"}
+
+
+def test_operator_graded() -> None:
+    bpy.utils.register_class(OperatorGradedTpms)
+    cached_tpms.cache_clear()
+    try:
+        result = bpy.ops.mesh.graded_tpms_add(
+            offset_grading="0.2 * x",
+            cell_size_grading="1 + 0.1 * z",
+            surface_blend="0.5",
+            resolution=12,
+        )
+    finally:
+        bpy.utils.unregister_class(OperatorGradedTpms)
+
+    assert result == {"FINISHED"}
+
+
+def test_operator_viewport_resolution() -> None:
+    lod.register()
+    bpy.utils.register_class(OperatorTpms)
+    cached_tpms.cache_clear()
+    try:
+        result = bpy.ops.mesh.tpms_add(
+            resolution=20,
+            viewport_resolution=5,
+            material=True,
+        )
+        obj = bpy.context.object
+        full_mesh, proxy_mesh = obj.tpms_lod.full_mesh, obj.tpms_lod.proxy_mesh
+        assert obj.data == proxy_mesh
+        assert len(proxy_mesh.vertices) < len(full_mesh.vertices)
+        assert proxy_mesh.materials[0] == full_mesh.materials[0]
+
+        lod.use_full_meshes(bpy.context.scene)
+        assert obj.data == full_mesh
+        lod.restore_meshes(bpy.context.scene)
+        assert obj.data == proxy_mesh
+        obj.tpms_lod.display = "full"
+        assert obj.data == full_mesh
+    finally:
+        bpy.utils.unregister_class(OperatorTpms)
+        lod.unregister()
+
+    assert result == {"FINISHED"}
+
+
+def test_operator_background() -> None:
+    lod.register()
+    bpy.utils.register_class(OperatorTpms)
+    bpy.utils.register_class(OperatorCancelTpmsJobs)
+    try:
+        n_objects = len(bpy.data.objects)
+        bpy.ops.mesh.tpms_add(background=True, resolution=200)
+        assert bpy.ops.mesh.tpms_cancel_jobs() == {"FINISHED"}
+        assert poll_jobs() is None
+
+        result = bpy.ops.mesh.tpms_add(
+            background=True,
+            resolution=12,
+            viewport_resolution=5,
+            material=True,
+            location=(1, 2, 3),
+        )
+        assert len(bpy.data.objects) == n_objects
+        while poll_jobs() is not None:
+            time.sleep(0.01)
+
+        obj = bpy.context.object
+        full_mesh = obj.tpms_lod.full_mesh
+        assert obj.data == obj.tpms_lod.proxy_mesh
+    finally:
+        bpy.utils.unregister_class(OperatorCancelTpmsJobs)
+        bpy.utils.unregister_class(OperatorTpms)
+        lod.unregister()
+
+    assert result == {"FINISHED"}
+    assert len(bpy.data.objects) == n_objects + 1
+    assert tuple(obj.location) == (1, 2, 3)
+    tpms = blender_tpms.tpms.Tpms(resolution=12, offset=0.3)
+    assert len(full_mesh.vertices) == tpms.sheet.n_points
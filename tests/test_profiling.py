@@ -0,0 +1,75 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+from blender_tpms.tpms.profiling import Profiler, nbytes, stage
+
+
+def test_profiler_nested_stages() -> None:
+    profiler = Profiler()
+    with profiler.activate():
+        for _ in range(2):
+            with stage("outer"), stage("inner"):
+                pass
+    with stage("inactive"):
+        pass
+
+    assert [record.path for record in profiler.stages] == [
+        "outer",
+        "outer/inner",
+        "outer",
+        "outer/inner",
+    ]
+    summary = profiler.summary()
+    assert [total["path"] for total in summary] == ["outer", "outer/inner"]
+    assert [total["calls"] for total in summary] == [2, 2]
+    assert summary[0]["seconds"] >= summary[1]["seconds"]
+    assert "inner" in profiler.report()
+
+
+def test_profiler_trace_memory() -> None:
+    profiler = Profiler(trace_memory=True)
+    with profiler.activate():
+        with stage("allocate"):
+            with stage("small"):
+                np.ones(1000)
+            array = np.ones(10**6)
+        with stage("free"):
+            del array
+
+    peaks = {record.path: record.peak_bytes for record in profiler.stages}
+    assert peaks["allocate"] >= 8 * 10**6
+    assert peaks["allocate/small"] < 8 * 10**6
+    assert peaks["free"] < 8 * 10**6
+
+
+def test_profiler_trace_memory_without_reset_peak(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.delattr(tracemalloc, "reset_peak")
+    profiler = Profiler(trace_memory=True)
+    with profiler.activate(), stage("allocate"):
+        np.ones(10**6)
+
+    assert profiler.stages[0].peak_bytes >= 8 * 10**6
+
+
+def test_nbytes() -> None:
+    array = np.ones(10)
+    assert nbytes(array) == 80
+    assert nbytes((array, array)) == 160
+    assert nbytes((array, None)) is None
+    assert nbytes("field") is None
+
+
+def test_profiler_exception() -> None:
+    profiler = Profiler(trace_memory=True)
+    with pytest.raises(ValueError, match="stage"), profiler.activate():
+        with stage("failing"):
+            err_msg = "stage"
+            raise ValueError(err_msg)
+
+    assert profiler.stages[0].seconds > 0
+    with profiler.activate(), stage("next"):
+        pass
+    assert profiler.stages[-1].path == "next"
@@ -4,6 +4,8 @@ from typing import Callable
 import numpy as np
 import pytest
 from blender_tpms.tpms import surfaces
+from blender_tpms.tpms.series import TrigSeries
+from numpy import cos, pi, sin
 
 
 @pytest.mark.parametrize(
@@ -13,3 +15,315 @@ from blender_tpms.tpms import surfaces
 def test_surfaces(surface_function: Callable) -> None:
     """Test all TPMS surfaces."""
     assert -np.inf < surface_function(0, 0, 0) < np.inf
+
+
+@pytest.mark.parametrize("name", [func[0] for func in getmembers(surfaces, isfunction)])
+def test_surfaces_reference(name: str) -> None:
+    """Test the series against the former hand-written surfaces.
+
+    The series sum the terms in another order, the values differ by a few
+    units in the last place.
+    """
+    x, y, z = np.random.default_rng(0).uniform(-2 * pi, 2 * pi, (3, 10, 11, 12))
+    np.testing.assert_allclose(
+        getattr(surfaces, name)(x, y, z),
+        REFERENCES[name](x, y, z),
+        rtol=0,
+        atol=1e-13,
+    )
+
+
+def test_series_parse() -> None:
+    series = TrigSeries.parse("-2 sin(2x) cos(z) + 0.5 + cos(z) sin(2x) - 0.5")
+
+    assert series.terms == ((-1.0, (("sin", 2), ("cos", 0), ("cos", 1))),)
+    for text in ("cos(x) +", "2 tan(x)", "cos(x) cos(x)", "sin(0y)"):
+        with pytest.raises(ValueError, match=r"term|factor"):
+            TrigSeries.parse(text)
+
+
+def test_series_dtype() -> None:
+    axes = np.meshgrid(*[np.linspace(0, 1, 4, dtype=np.float32)] * 3, sparse=True)
+    field = surfaces.SERIES["PN"](*axes)
+
+    assert field.dtype == np.float32
+    assert field.shape == (4, 4, 4)
+    assert TrigSeries.parse("0.5")(*axes).shape == (4, 4, 4)
+
+
+@pytest.mark.parametrize("name", ["gyroid", "pmy", "honeycomb_L", "PN"])
+def test_series_gradient(name: str) -> None:
+    series = surfaces.SERIES[name]
+    x, y, z = np.random.default_rng(0).uniform(-pi, pi, (3, 100))
+    step = 1e-6
+    gradient = series.gradient(x, y, z)
+    finite_differences = [
+        (series(x + step, y, z) - series(x - step, y, z)) / (2 * step),
+        (series(x, y + step, z) - series(x, y - step, z)) / (2 * step),
+        (series(x, y, z + step) - series(x, y, z - step)) / (2 * step),
+    ]
+
+    np.testing.assert_allclose(gradient, finite_differences, atol=1e-7)
+
+
+def _gyroid(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return sin(x) * cos(y) + sin(y) * cos(z) + sin(z) * cos(x)
+
+
+def _schwarzP(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return cos(x) + cos(y) + cos(z)
+
+
+def _schwarzD(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    a = sin(x) * sin(y) * sin(z)
+    b = sin(x) * cos(y) * cos(z)
+    c = cos(x) * sin(y) * cos(z)
+    d = cos(x) * cos(y) * sin(z)
+    return a + b + c + d
+
+
+def _neovius(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    a = 3 * cos(x) + cos(y) + cos(z)
+    b = 4 * cos(x) * cos(y) * cos(z)
+
+    return a + b
+
+
+def _schoenIWP(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    a = 2 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x))
+    b = cos(2 * x) + cos(2 * y) + cos(2 * z)
+
+    return a - b
+
+
+def _schoenFRD(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    a = 4 * cos(x) * cos(y) * cos(z)
+    b = cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x)
+    return a - b
+
+
+def _fischerKochS(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    a = cos(2 * x) * sin(y) * cos(z)
+    b = cos(x) * cos(2 * y) * sin(z)
+    c = sin(x) * cos(y) * cos(2 * z)
+
+    return a + b + c
+
+
+def _pmy(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    a = 2 * cos(x) * cos(y) * cos(z)
+    b = sin(2 * x) * sin(y)
+    c = sin(x) * sin(2 * z)
+    d = sin(2 * y) * sin(z)
+
+    return a + b + c + d
+
+
+def _honeycomb(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return sin(x) * cos(y + pi / 2.0) + sin(y + pi / 2.0) + cos(z)
+
+
+def _lidinoid(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        0.5
+        * (
+            sin(2 * x) * cos(y) * sin(z)
+            + sin(2 * y) * cos(z) * sin(x)
+            + sin(2 * z) * cos(x) * sin(y)
+        )
+        - 0.5
+        * (cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x))
+        + 0.3
+    )
+
+
+def _split_p(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        1.1
+        * (
+            sin(2 * x) * cos(y) * sin(z)
+            + sin(2 * y) * cos(z) * sin(x)
+            + sin(2 * z) * cos(x) * sin(y)
+        )
+        - 0.2
+        * (cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x))
+        - 0.4 * (cos(2 * x) + cos(2 * y) + cos(2 * z))
+    )
+
+
+def _honeycomb_gyroid(x: np.ndarray, y: np.ndarray, _: np.ndarray) -> np.ndarray:
+    return sin(x) * cos(y) + sin(y) + cos(x)
+
+
+def _honeycomb_primitive(x: np.ndarray, y: np.ndarray, _: np.ndarray) -> np.ndarray:
+    return cos(x) + cos(y)
+
+
+def _honeycomb_diamond(x: np.ndarray, y: np.ndarray, _: np.ndarray) -> np.ndarray:
+    return cos(x) * cos(y) + sin(x) * sin(y) + sin(x) * cos(y) + cos(x) * sin(y)
+
+
+def _honeycomb_I(x: np.ndarray, y: np.ndarray, _: np.ndarray) -> np.ndarray:
+    return cos(x) * cos(y) + cos(y) + cos(x)
+
+
+def _honeycomb_L(x: np.ndarray, y: np.ndarray, _: np.ndarray) -> np.ndarray:
+    return 1.1 * (sin(2 * x) * cos(y) + sin(2 * y) * sin(x) + cos(x) * sin(y)) - (
+        cos(2 * x) * cos(2 * y) + cos(2 * y) + cos(2 * x)
+    )
+
+
+def _SC(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        2 * (cos(x) + cos(y) + cos(z))
+        + cos(x) * cos(y)
+        + cos(y) * cos(z)
+        + cos(z) * cos(x)
+    )
+
+
+def _I(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x)
+
+
+def _P(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return sin(x) + sin(y) + sin(z)
+
+
+def _P_W(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    a = 4 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x))
+    b = 3 * cos(x) * cos(y) * cos(z)
+    return a - b
+
+
+def _double_gyroid(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return 2.75 * (
+        sin(2 * x) * sin(z) * cos(y)
+        + sin(2 * y) * sin(x) * cos(z)
+        + sin(2 * z) * sin(y) * cos(x)
+    ) - (cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x))
+
+
+def _Gprime(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        5
+        * (
+            sin(2 * x) * sin(z) * cos(y)
+            + sin(2 * y) * sin(x) * cos(z)
+            + sin(2 * z) * sin(y) * cos(x)
+        )
+        + cos(2 * x) * cos(2 * y)
+        + cos(2 * y) * cos(2 * z)
+        + cos(2 * z) * cos(2 * x)
+    )
+
+
+def _double_diamond(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        sin(2 * x) * sin(2 * y)
+        + sin(2 * y) * sin(2 * z)
+        + sin(2 * x) * sin(2 * z)
+        + cos(2 * x) * cos(2 * y) * cos(2 * z)
+    )
+
+
+def _Dprime(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        sin(x) * sin(y) * sin(z)
+        + cos(x) * cos(y) * cos(z)
+        - (cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x))
+        - 0.4
+    )
+
+
+def _doubleP(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return 0.5 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x)) + 0.2 * (
+        cos(2 * x) + cos(2 * y) + cos(2 * z)
+    )
+
+
+def _OCTO(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        4 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x))
+        - 2.8 * cos(x) * cos(y) * cos(z)
+        + (cos(x) + cos(y) + cos(z))
+        + 1.5
+    )
+
+
+def _PN(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        0.6 * (cos(x) * cos(y) * cos(z))
+        + 0.4 * (cos(x) + cos(y) + cos(z))
+        + 0.2 * (cos(2 * x) * cos(2 * y) * cos(2 * z))
+        + 0.2 * (cos(2 * x) + cos(2 * y) + cos(2 * z))
+        + 0.1 * (cos(3 * x) + cos(3 * y) + cos(3 * z))
+        + 0.2 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x))
+    )
+
+
+def _KP(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        0.6 * (cos(x) + cos(y) + cos(z))
+        + 0.7 * (cos(x) * cos(y) + cos(y) * cos(z) + cos(z) * cos(x))
+        - 0.9 * (cos(2 * x) * cos(2 * y) * cos(2 * z))
+        + 0.4
+    )
+
+
+def _FRD(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        8 * cos(x) * cos(y) * cos(z)
+        + cos(2 * x) * cos(2 * y) * cos(2 * z)
+        - cos(2 * x) * cos(2 * y)
+        + cos(2 * y) * cos(2 * z)
+        + cos(2 * z) * cos(2 * x)
+    )
+
+
+def _splitP(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (
+        1.1
+        * (
+            sin(2 * x) * sin(z) * cos(y)
+            + sin(2 * y) * sin(x) * cos(z)
+            + sin(2 * z) * sin(y) * cos(x)
+        )
+        - 0.2
+        * (cos(2 * x) * cos(2 * y) + cos(2 * y) * cos(2 * z) + cos(2 * z) * cos(2 * x))
+        - 0.4 * (cos(x) + cos(y) + cos(z))
+    )
+
+
+REFERENCES = {
+    "gyroid": _gyroid,
+    "schwarzP": _schwarzP,
+    "schwarzD": _schwarzD,
+    "neovius": _neovius,
+    "schoenIWP": _schoenIWP,
+    "schoenFRD": _schoenFRD,
+    "fischerKochS": _fischerKochS,
+    "pmy": _pmy,
+    "honeycomb": _honeycomb,
+    "lidinoid": _lidinoid,
+    "split_p": _split_p,
+    "honeycomb_gyroid": _honeycomb_gyroid,
+    "honeycomb_primitive": _honeycomb_primitive,
+    "honeycomb_diamond": _honeycomb_diamond,
+    "honeycomb_I": _honeycomb_I,
+    "honeycomb_L": _honeycomb_L,
+    "SC": _SC,
+    "I": _I,
+    "P": _P,
+    "P_W": _P_W,
+    "double_gyroid": _double_gyroid,
+    "Gprime": _Gprime,
+    "double_diamond": _double_diamond,
+    "Dprime": _Dprime,
+    "doubleP": _doubleP,
+    "OCTO": _OCTO,
+    "PN": _PN,
+    "KP": _KP,
+    "FRD": _FRD,
+    "splitP": _splitP,
+}
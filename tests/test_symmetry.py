@@ -0,0 +1,86 @@
+from inspect import getmembers, isfunction
+from typing import Callable
+
+import numpy as np
+import pytest
+from blender_tpms.tpms import Tpms, surfaces
+from blender_tpms.tpms.field import evaluate, evaluate_symmetric
+from blender_tpms.tpms.symmetry import (
+    SYMMETRIES,
+    maps_grid,
+    parse_symmetry,
+    symmetry_group,
+)
+
+SURFACES = [func[1] for func in getmembers(surfaces, isfunction)]
+
+
+def test_all_surfaces_tagged() -> None:
+    assert set(SYMMETRIES) == {func.__name__ for func in SURFACES}
+
+
+@pytest.mark.parametrize("surface_function", SURFACES)
+def test_symmetry_group(surface_function: Callable) -> None:
+    """Test that every operation of the group is a symmetry of the surface."""
+    xyz = np.random.default_rng(0).uniform(-2 * np.pi, 2 * np.pi, (3, 100))
+    field = surface_function(*xyz)
+
+    group = symmetry_group(surface_function)
+    assert len(set(group)) == len(group)
+    for permutation, signs, field_sign in group:
+        image = [sign * xyz[axis] for axis, sign in zip(permutation, signs)]
+        np.testing.assert_allclose(
+            surface_function(*image),
+            field_sign * field,
+            atol=1e-12,
+        )
+
+
+def test_parse_symmetry() -> None:
+    assert parse_symmetry(("-y,x, z", -1)) == ((1, 0, 2), (-1, 1, 1), -1)
+    with pytest.raises(ValueError, match="invalid symmetry"):
+        parse_symmetry(("x,x,z", 1))
+
+
+def test_maps_grid() -> None:
+    symmetric = np.linspace(-1.0, 1.0, 5)
+    shifted = symmetric + 0.1
+    transposition = parse_symmetry(("y,x,z", 1))
+    inversion = parse_symmetry(("-x,-y,-z", 1))
+
+    assert maps_grid(transposition, [symmetric, symmetric, shifted])
+    assert not maps_grid(transposition, [symmetric, shifted, shifted])
+    assert maps_grid(inversion, [symmetric, symmetric, symmetric])
+    assert not maps_grid(inversion, [symmetric, symmetric, shifted])
+
+
+@pytest.mark.parametrize("surface_function", SURFACES)
+@pytest.mark.parametrize(("n_points", "block_size"), [(7, 32), (40, 32), (41, 4)])
+def test_symmetric_evaluation(
+    surface_function: Callable,
+    n_points: int,
+    block_size: int,
+) -> None:
+    axes = [np.linspace(-np.pi, np.pi, n_points)] * 3
+    np.testing.assert_allclose(
+        evaluate_symmetric(surface_function, axes, block_size=block_size),
+        evaluate(surface_function, axes, evaluation="separable"),
+        atol=1e-12,
+    )
+
+
+def test_tpms_symmetric_evaluation() -> None:
+    """Test a grid where only part of the symmetries apply."""
+    kwargs = {
+        "surface": "schwarzP",
+        "swap": "ZXY",
+        "cell_size": (1.0, 1.0, 2.0),
+        "repeat_cell": (2, 2, 1),
+        "resolution": 9,
+        "phase_shift": (0.0, 0.0, 0.3),
+    }
+    np.testing.assert_allclose(
+        Tpms(evaluation="symmetric", **kwargs).grid["surface"],
+        Tpms(**kwargs).grid["surface"],
+        atol=1e-12,
+    )
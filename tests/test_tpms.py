@@ -1,4 +1,10 @@
-from blender_tpms.tpms import CylindricalTpms, SphericalTpms, Tpms
+from pathlib import Path
+
+import numpy as np
+import pytest
+from blender_tpms.tpms import CylindricalTpms, GradedTpms, Profiler, SphericalTpms, Tpms
+from blender_tpms.tpms import tpms as tpms_module
+from blender_tpms.tpms.tpms import trilinear_upsample
 
 
 def test_tpms() -> None:
@@ -25,3 +31,352 @@ def test_spherical_tpms() -> None:
     tpms = SphericalTpms()
 
     assert tpms.relative_density > 0
+
+
+def test_tpms_single_field_evaluation() -> None:
+    tpms = Tpms(offset=0.3)
+    _ = tpms.vtk_mesh
+    _ = tpms.relative_density
+    _ = tpms.vtk_mesh["surface"]
+
+    assert tpms.cache_misses["field"] == 1
+    assert tpms.cache_misses["sheet"] == 1
+    assert tpms.cache_hits["sheet"] > 0
+
+
+def test_tpms_cache_invalidation() -> None:
+    tpms = Tpms(offset=0.3)
+    density = tpms.relative_density
+
+    tpms.offset = 0.6
+    assert tpms.relative_density > density
+    assert tpms.cache_misses["field"] == 1
+    assert tpms.cache_misses["offset"] == 2
+
+    tpms.part = "lower_skeletal"
+    expected = Tpms(part="lower_skeletal", offset=0.6).relative_density
+    assert tpms.relative_density == expected
+    assert tpms.cache_misses["offset"] == 2
+
+    tpms.resolution = 10
+    _ = tpms.vtk_mesh
+    assert tpms.cache_misses["grid"] == 2
+    assert tpms.cache_misses["field"] == 2
+
+
+@pytest.mark.parametrize("part", ["sheet", "lower_skeletal", "upper_skeletal"])
+def test_tpms_tiling(part: str) -> None:
+    kwargs = {
+        "part": part,
+        "surface": "neovius",
+        "cell_size": (1.0, 1.5, 0.8),
+        "repeat_cell": (2, 3, 2),
+        "resolution": 12,
+        "offset": 0.5,
+        "phase_shift": (0.1, 0.0, 0.3),
+    }
+    monolithic = Tpms(**kwargs)
+    tiled = Tpms(tiling=True, **kwargs)
+
+    assert tiled.vtk_mesh.n_open_edges == 0
+    np.testing.assert_allclose(tiled.vtk_mesh.bounds, monolithic.vtk_mesh.bounds)
+    assert tiled.relative_density == pytest.approx(
+        monolithic.relative_density,
+        rel=1e-2,
+    )
+
+
+def test_tpms_tiling_errors() -> None:
+    with pytest.raises(ValueError, match="tiling"):
+        _ = CylindricalTpms(repeat_cell=2, tiling=True).sheet
+
+    with pytest.raises(TypeError, match="tiling"):
+        _ = Tpms(repeat_cell=2, offset=lambda x, _y, _z: x, tiling=True).sheet
+
+    with pytest.raises(ValueError, match="periodic over the cell"):
+        _ = Tpms(surface="cos(x) + cos(y) + 0.1 * z", repeat_cell=2, tiling=True).sheet
+
+
+@pytest.mark.parametrize("tpms_class", [Tpms, CylindricalTpms, SphericalTpms])
+def test_tpms_float32(tpms_class: type) -> None:
+    kwargs = {"part": "lower_skeletal", "repeat_cell": 2, "offset": 0.4}
+    tpms_64 = tpms_class(**kwargs)
+    tpms_32 = tpms_class(dtype="float32", **kwargs)
+
+    assert tpms_32.grid["surface"].dtype == np.float32
+    assert tpms_32.grid["lower_surface"].dtype == np.float32
+    assert tpms_32.vtk_mesh.points.dtype == np.float32
+    assert tpms_32.relative_density == pytest.approx(
+        tpms_64.relative_density,
+        rel=1e-5,
+    )
+
+
+def test_tpms_invalid_dtype() -> None:
+    with pytest.raises(ValueError, match="dtype"):
+        Tpms(dtype="int32")
+
+
+@pytest.mark.parametrize("slab_size", [1, 3, 16])
+@pytest.mark.parametrize("part", ["sheet", "skeletals", "surface"])
+def test_tpms_slabs(part: str, slab_size: int) -> None:
+    kwargs = {"part": part, "repeat_cell": (2, 1, 2), "resolution": 8, "offset": 0.5}
+    monolithic = Tpms(**kwargs).vtk_mesh
+    slabs = Tpms(slab_size=slab_size, **kwargs).vtk_mesh
+
+    assert slabs.n_points == monolithic.n_points
+    assert slabs.n_cells == monolithic.n_cells
+    assert slabs.n_open_edges == monolithic.n_open_edges
+    assert slabs.area == pytest.approx(monolithic.area)
+    if part != "surface":
+        assert slabs.volume == pytest.approx(monolithic.volume)
+
+
+def test_tpms_iter_chunks() -> None:
+    tpms = SphericalTpms(part="sheet", resolution=8, offset=0.5)
+    chunks = list(tpms.iter_chunks(slab_size=4))
+
+    assert len(chunks) > 1
+    n_vertices = 0
+    for chunk in chunks:
+        n_vertices += len(chunk.points)
+        assert chunk.faces.max() < n_vertices
+        assert len(chunk.point_data["surface"]) == len(chunk.points)
+
+    with pytest.raises(ValueError, match="slab_size"):
+        next(tpms.iter_chunks(slab_size=-1))
+
+
+def test_tpms_workers() -> None:
+    kwargs = {"part": "sheet", "resolution": 8, "offset": 0.5, "slab_size": 3}
+    sequential = SphericalTpms(**kwargs).vtk_mesh
+    parallel = SphericalTpms(workers=2, **kwargs).vtk_mesh
+
+    np.testing.assert_array_equal(parallel.points, sequential.points)
+    np.testing.assert_array_equal(parallel.faces, sequential.faces)
+    np.testing.assert_array_equal(parallel["surface"], sequential["surface"])
+
+    with pytest.raises(ValueError, match="workers"):
+        next(Tpms().iter_chunks(workers=-1))
+
+
+@pytest.mark.parametrize("shared_memory", [True, False])
+def test_shared_slab_mesh(monkeypatch: pytest.MonkeyPatch, shared_memory: bool) -> None:
+    monkeypatch.setattr(tpms_module, "_SHARED_MEMORY", shared_memory)
+    tpms = Tpms(resolution=8, offset=0.5)
+    slab = tpms._slab_mesh("sheet", 0, 4, 8)
+
+    shared = tpms_module._shared_slab_mesh(tpms, "sheet", 0, 4, 8)
+    assert (shared.name is not None) == shared_memory
+    received = tpms_module._from_shared_memory(shared)
+    np.testing.assert_array_equal(received.points, slab.points)
+    np.testing.assert_array_equal(received.faces, slab.faces)
+    assert received.point_data.keys() == slab.point_data.keys()
+    tpms_module._release_shared_memory(shared)
+
+
+@pytest.mark.parametrize("part", ["sheet", "lower_skeletal", "upper_skeletal"])
+@pytest.mark.parametrize("tpms_class", [Tpms, CylindricalTpms, SphericalTpms])
+def test_tpms_contour_extraction(part: str, tpms_class: type) -> None:
+    kwargs = {"part": part, "resolution": 20, "offset": 0.5}
+    clipped = tpms_class(**kwargs).vtk_mesh
+    contoured = tpms_class(extraction="contour", **kwargs).vtk_mesh
+
+    assert contoured.n_open_edges == 0
+    assert contoured.volume == pytest.approx(clipped.volume, rel=2e-2)
+
+
+@pytest.mark.parametrize("kwargs", [{"tiling": True}, {"slab_size": 4}])
+def test_tpms_contour_extraction_modes(kwargs: dict) -> None:
+    tpms = Tpms(part="sheet", resolution=15, offset=0.5, repeat_cell=2)
+    expected = tpms._replace(extraction="contour").vtk_mesh
+    mesh = tpms._replace(extraction="contour", **kwargs).vtk_mesh
+
+    assert mesh.n_open_edges == 0
+    assert mesh.volume == pytest.approx(expected.volume, rel=1e-2)
+
+    with pytest.raises(ValueError, match="extraction"):
+        Tpms(extraction="marching")
+
+
+@pytest.mark.parametrize("part", ["sheet", "lower_skeletal", "upper_skeletal"])
+@pytest.mark.parametrize(
+    ("tpms_class", "repeat_cell"),
+    [(Tpms, 1), (CylindricalTpms, (1, 3, 1)), (SphericalTpms, (1, 3, 3))],
+)
+def test_tpms_estimate_relative_density(
+    part: str,
+    tpms_class: type,
+    repeat_cell: int | tuple[int, int, int],
+) -> None:
+    tpms = tpms_class(part=part, resolution=30, offset=0.5, repeat_cell=repeat_cell)
+    density, error = tpms.estimate_relative_density()
+
+    assert 0 < error < 1e-2
+    assert density == pytest.approx(tpms.relative_density, abs=2e-3)
+    assert "sheet" not in tpms.cache_misses or part == "sheet"
+
+
+def test_tpms_estimate_relative_density_cache() -> None:
+    tpms = Tpms(part="sheet", offset=0.3)
+    density, _ = tpms.estimate_relative_density()
+    tpms.offset = 0.6
+
+    assert tpms.estimate_relative_density()[0] > density
+    assert tpms.cache_misses["field"] == 1
+    assert Tpms(part="surface").estimate_relative_density() == (0.0, 0.0)
+
+
+@pytest.mark.parametrize("part", ["sheet", "upper_skeletal", "skeletals"])
+@pytest.mark.parametrize("tpms_class", [Tpms, SphericalTpms])
+def test_tpms_fit_offset(
+    part: str,
+    tpms_class: type,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("BLENDER_TPMS_CACHE", str(tmp_path))
+    tpms = tpms_class(part=part, resolution=20, phase_shift=(0.1, 0.0, 0.2))
+    offset = tpms.fit_offset(0.25)
+
+    assert tpms.offset == offset
+    assert tpms.estimate_relative_density()[0] == pytest.approx(0.25, abs=1e-4)
+    assert tpms.cache_misses["field"] == 1
+
+
+def test_tpms_fit_offset_errors(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("BLENDER_TPMS_CACHE", str(tmp_path))
+    with pytest.raises(ValueError, match="no volume"):
+        Tpms(part="surface", resolution=10).fit_offset(0.3)
+    for density in (0, 1.2):
+        with pytest.raises(ValueError, match="between 0 and 1"):
+            Tpms(part="sheet", resolution=10).fit_offset(density)
+
+
+def test_tpms_fit_offset_flat_table(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("BLENDER_TPMS_CACHE", str(tmp_path))
+    offsets = np.linspace(-1, 1, 5)
+    monkeypatch.setattr(
+        tpms_module,
+        "offset_table",
+        lambda *_: (offsets, np.full_like(offsets, 0.5)),
+    )
+    tpms = Tpms(part="sheet", resolution=10, offset=0.1)
+    with np.errstate(all="raise"):
+        offset = tpms.fit_offset(0.3)
+
+    assert np.isfinite(offset)
+
+
+@pytest.mark.parametrize("extraction", ["clip", "contour"])
+def test_tpms_profiler(extraction: str) -> None:
+    profiler = Profiler()
+    tpms = Tpms(part="sheet", extraction=extraction, profiler=profiler)
+    tpms.sheet
+    tpms.sheet
+
+    paths = [total["path"] for total in profiler.summary()]
+    assert paths[0] == "sheet"
+    assert "sheet/offset/field/grid" in paths
+    extraction_stage = "contour" if extraction == "contour" else "clip_scalar"
+    assert f"sheet/{extraction_stage}" in paths
+    assert profiler.summary()[0]["calls"] == 1
+    assert profiler.summary()[0]["nbytes"] > 0
+
+
+def test_graded_tpms_uniform() -> None:
+    kwargs = {"part": "sheet", "repeat_cell": (2, 1, 1), "resolution": 10}
+    tpms = Tpms(**kwargs)
+    graded = GradedTpms(offset_grading=0.0, cell_size_grading=1.0, **kwargs)
+
+    np.testing.assert_allclose(graded.grid["surface"], tpms.grid["surface"], atol=1e-12)
+    assert graded.vtk_mesh.n_points == tpms.vtk_mesh.n_points
+
+
+def test_graded_tpms_control_points() -> None:
+    shapes = []
+
+    def grading(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        shapes.append(np.broadcast_shapes(x.shape, y.shape, z.shape))
+        return 0.2 + 0.1 * x
+
+    tpms = GradedTpms(
+        offset=0.3,
+        offset_grading=grading,
+        control_points=(4, 3, 2),
+        resolution=12,
+    )
+    tpms.sheet
+
+    assert shapes == [(4, 3, 2)]
+    lower = tpms.grid["lower_surface"] - tpms.grid["surface"]
+    np.testing.assert_allclose(2 * lower, 0.3 + 0.2 + 0.1 * tpms.grid.points[:, 0])
+
+
+def test_graded_tpms_errors() -> None:
+    with pytest.raises(ValueError, match="shape"):
+        GradedTpms(offset_grading=np.zeros((2, 2, 2))).sheet
+    with pytest.raises(ValueError, match="positive"):
+        GradedTpms(cell_size_grading="x").sheet
+    with pytest.raises(ValueError, match="blend_surface"):
+        GradedTpms(surface_blend=0.5)
+
+
+def test_graded_tpms_blend() -> None:
+    blended = GradedTpms(blend_surface="schwarzP", surface_blend=1.0, resolution=12)
+    schwarz_p = Tpms(surface="schwarzP", resolution=12)
+
+    np.testing.assert_allclose(blended.grid["surface"], schwarz_p.grid["surface"])
+
+
+@pytest.mark.parametrize("slab_size", [1, 5])
+def test_graded_tpms_slabs(slab_size: int) -> None:
+    kwargs = {
+        "part": "sheet",
+        "repeat_cell": (2, 1, 2),
+        "resolution": 8,
+        "offset_grading": "0.3 * x - 0.2 * z",
+        "cell_size_grading": "1 + 0.1 * y",
+    }
+    monolithic = GradedTpms(**kwargs).vtk_mesh
+    slabs = GradedTpms(slab_size=slab_size, **kwargs).vtk_mesh
+
+    assert slabs.n_points == monolithic.n_points
+    assert slabs.n_cells == monolithic.n_cells
+
+
+def test_trilinear_upsample() -> None:
+    controls = [np.linspace(-1, 1, 3), np.linspace(-1, 1, 4), np.array([0.0])]
+    x, y, z = np.meshgrid(*controls, indexing="ij")
+    linspaces = [np.linspace(-1, 1, 7), np.linspace(-1, 1, 9), np.linspace(-1, 1, 5)]
+
+    values = trilinear_upsample(2 * x - y + 0.5 + 0 * z, controls, linspaces)
+
+    fine_x, fine_y, _ = np.meshgrid(*linspaces, indexing="ij")
+    np.testing.assert_allclose(values, 2 * fine_x - fine_y + 0.5, atol=1e-12)
+
+
+def test_proxy_mesh() -> None:
+    tpms = Tpms(resolution=21, offset=0.4)
+    proxy = tpms.proxy_mesh(11)
+    coarse = Tpms(resolution=11, offset=0.4).sheet
+
+    assert tpms.cache_misses["field"] == 1
+    assert proxy.n_points == coarse.n_points
+    np.testing.assert_allclose(proxy.points, coarse.points)
+    assert tpms.proxy_mesh(21) is tpms.sheet
+    with pytest.raises(ValueError, match="at least"):
+        tpms.proxy_mesh(1)
+
+
+def test_proxy_mesh_mapped() -> None:
+    tpms = SphericalTpms(radius=1, cell_size=0.5, repeat_cell=(1, 4, 4), offset=0.4)
+    proxy = tpms.proxy_mesh(5, part="lower_skeletal")
+
+    assert 0 < proxy.n_points < tpms.lower_skeletal.n_points
+    np.testing.assert_allclose(proxy.bounds, tpms.lower_skeletal.bounds, atol=0.1)
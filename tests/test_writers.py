@@ -0,0 +1,109 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import pyvista as pv
+from blender_tpms.tpms import SphericalTpms, Tpms
+from blender_tpms.tpms.tpms import MeshChunk
+from blender_tpms.tpms.writers import PlyWriter, StlWriter, write_chunks
+
+
+@pytest.mark.parametrize("suffix", [".stl", ".ply"])
+def test_save(tmp_path: Path, suffix: str) -> None:
+    tpms = Tpms(part="lower_skeletal", resolution=12, repeat_cell=(1, 1, 2), offset=0.4)
+    path = tmp_path / f"lower_skeletal{suffix}"
+
+    n_vertices, n_triangles = tpms.save(path, slab_size=5)
+    mesh = pv.read(path)
+    assert (n_vertices, n_triangles) == (
+        tpms.lower_skeletal.n_points,
+        tpms.lower_skeletal.n_cells,
+    )
+    assert mesh.n_cells == n_triangles
+    assert mesh.volume == pytest.approx(tpms.lower_skeletal.volume, rel=1e-6)
+
+
+def test_save_density(tmp_path: Path) -> None:
+    kwargs = {"part": "lower_skeletal", "resolution": 10, "repeat_cell": (1, 4, 4)}
+    tpms = SphericalTpms(cell_size=0.5, offset=0.3, **kwargs)
+    tpms.save(tmp_path / "lower_skeletal.stl", slab_size=4)
+
+    density, _ = tpms.estimate_relative_density()
+    assert tpms.cache_misses["grid"] == 0
+    expected, _ = SphericalTpms(
+        cell_size=0.5,
+        offset=0.3,
+        **kwargs,
+    ).estimate_relative_density()
+    assert density == pytest.approx(expected, rel=1e-12)
+
+
+def signed_volume(mesh: pv.PolyData) -> float:
+    triangles = mesh.points[mesh.regular_faces]
+    return (
+        np.einsum(
+            "ij,ij->",
+            triangles[:, 0],
+            np.cross(triangles[:, 1], triangles[:, 2]),
+        )
+        / 6
+    )
+
+
+@pytest.mark.parametrize("suffix", [".stl", ".ply"])
+def test_save_outward_normals(tmp_path: Path, suffix: str) -> None:
+    tpms = Tpms(part="sheet", resolution=12, offset=0.4)
+    path = tmp_path / f"sheet{suffix}"
+
+    tpms.save(path, slab_size=5)
+    mesh = pv.read(path)
+    assert signed_volume(mesh) == pytest.approx(tpms.sheet.volume, rel=1e-3)
+
+
+def test_stl_normals(tmp_path: Path) -> None:
+    tpms = SphericalTpms(
+        radius=1,
+        repeat_cell=(1, 4, 4),
+        cell_size=0.5,
+        resolution=10,
+        offset=0.4,
+    )
+    tpms.save(tmp_path / "sheet.stl", slab_size=3)
+
+    data = np.fromfile(
+        tmp_path / "sheet.stl",
+        dtype=[("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("pad", "<u2")],
+        offset=84,
+    )
+    mesh = pv.read(tmp_path / "sheet.stl")
+    np.testing.assert_allclose(data["normal"], mesh.cell_normals, atol=1e-3)
+
+
+def test_ply_point_data(tmp_path: Path) -> None:
+    tpms = Tpms(resolution=10, offset=0.3)
+    chunks = list(tpms.iter_chunks(slab_size=3))
+    path = tmp_path / "sheet.ply"
+
+    write_chunks(chunks, path, point_data=("surface",))
+    content = path.read_bytes()
+    header, body = content.split(b"end_header\n")
+    assert b"property float surface" in header
+    n_vertices = sum(len(chunk.points) for chunk in chunks)
+    vertices = np.frombuffer(body, dtype="<f4", count=4 * n_vertices)
+    np.testing.assert_allclose(
+        vertices.reshape(-1, 4)[:, 3],
+        np.concatenate([chunk.point_data["surface"] for chunk in chunks]),
+        rtol=1e-6,
+    )
+
+
+def test_writer_errors(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="extension"):
+        write_chunks([], tmp_path / "mesh.obj")
+
+    points = np.eye(3)
+    chunk = MeshChunk(points, np.array([[0, 1, 2]]), {})
+    far_chunk = MeshChunk(points, np.array([[0, 4, 5]]), {})
+    for writer in (StlWriter(tmp_path / "mesh.stl"), PlyWriter(tmp_path / "mesh.ply")):
+        with writer, pytest.raises(ValueError, match="previous one"):
+            writer.write_chunks([chunk, chunk, far_chunk])